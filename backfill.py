@@ -0,0 +1,281 @@
+import asyncio
+import copy
+import logging
+import time
+import discord
+from datetime import datetime, timezone
+from discord.ext import commands
+from config import BACKFILL_SETTINGS
+from content_classifier import ContentClassifier
+from database import Database
+from guild_config import guild_configs
+from journal import journal
+from leaderboard import LeaderboardModule
+from progression import ProgressionModule
+from stat_buffer import rebuild_sketches
+from typing import Any, Dict, FrozenSet, Optional
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('message_count', 'reaction_count', 'subject_posts', 'subject_reactions', 'videos_shared')
+
+
+class BackfillRun:
+
+    def __init__(self, guild: discord.Guild, state: Dict[str, Any]):
+        self.guild = guild
+        self.guild_id = str(guild.id)
+        self.state = state
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+        self.status_message: Optional[discord.Message] = None
+        self.started = time.monotonic()
+        self.scanned = 0
+        self.last_flush = self.started
+        self.last_progress = self.started
+
+    def channels_done(self) -> int:
+        return sum(1 for channel in self.state['channels'].values() if channel['done'])
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.scanned / elapsed if elapsed > 0 else 0
+        return (f"{self.channels_done()}/{len(self.state['channels'])} channels, "
+                f"{self.state['messages']:,} messages scanned, {self.state['credited']:,} credited, "
+                f"{rate:,.0f} messages/s")
+
+
+class BackfillModule:
+
+    def __init__(self, bot: commands.Bot, progression: ProgressionModule, leaderboard: LeaderboardModule, classifier: ContentClassifier, settings: Dict = BACKFILL_SETTINGS):
+        self.bot = bot
+        self.progression = progression
+        self.leaderboard = leaderboard
+        self.classifier = classifier
+        self.settings = settings
+        self.runs: Dict[str, BackfillRun] = {}
+
+    def new_state(self, guild: discord.Guild) -> Dict[str, Any]:
+        before = guild.me.joined_at or datetime.now(timezone.utc)
+        return {'before': before.isoformat(), 'channels': {}, 'messages': 0, 'credited': 0}
+
+    async def discover(self, guild: discord.Guild) -> Dict[str, Any]:
+        targets = {}
+        for channel in guild.text_channels:
+            if not channel.permissions_for(guild.me).read_message_history:
+                continue
+            targets[str(channel.id)] = channel
+            for thread in channel.threads:
+                targets[str(thread.id)] = thread
+            if not self.settings['archived_threads']:
+                continue
+            try:
+                async for thread in channel.archived_threads(limit=None):
+                    targets[str(thread.id)] = thread
+            except discord.HTTPException as e:
+                logger.warning("Could not list archived threads in #%s: %s", channel.name, e, extra={'guild': guild.id})
+        return targets
+
+    def countable(self, guild: discord.Guild, user) -> bool:
+        if user.bot:
+            return False
+        return not self.settings['members_only'] or guild.get_member(user.id) is not None
+
+    async def message_deltas(self, guild: discord.Guild, message: discord.Message, subject_channels: FrozenSet[str]) -> Dict[str, Dict[str, Any]]:
+        deltas: Dict[str, Dict[str, Any]] = {}
+
+        def add(user, stat: str, amount: int):
+            entry = deltas.setdefault(str(user.id), {'discord_username': user.name})
+            entry[stat] = entry.get(stat, 0) + amount
+
+        author = message.author
+        subject_post = False
+        if self.countable(guild, author):
+            for stat, amount in self.classifier.classify_message(message, subject_channels).items():
+                add(author, stat, amount)
+            subject_post = 'subject_posts' in deltas[str(author.id)]
+
+        if not subject_post or not self.settings['fetch_reactors']:
+            return deltas
+
+        for reaction in message.reactions:
+            try:
+                async for user in reaction.users():
+                    if user.id != author.id and self.countable(guild, user):
+                        add(author, 'subject_reactions', 1)
+            except (discord.NotFound, discord.Forbidden):
+                continue
+
+        return deltas
+
+    def record(self, run: BackfillRun, channel_state: Dict[str, Any], message: discord.Message, deltas: Dict[str, Dict[str, Any]]):
+        seen_at = message.created_at.isoformat()
+        for user_id, counts in deltas.items():
+            entry = run.pending.get(user_id)
+            if entry is None:
+                entry = run.pending[user_id] = {'discord_username': counts['discord_username'], 'last_activity': seen_at}
+            elif seen_at > entry['last_activity']:
+                entry['last_activity'] = seen_at
+            for stat in COUNTERS:
+                if stat in counts:
+                    entry[stat] = entry.get(stat, 0) + counts[stat]
+
+        channel_state['cursor'] = str(message.id)
+        run.state['messages'] += 1
+        if 'message_count' in deltas.get(str(message.author.id), {}):
+            run.state['credited'] += 1
+        run.scanned += 1
+
+    def flush_due(self, run: BackfillRun) -> bool:
+        return len(run.pending) >= self.settings['flush_users'] or time.monotonic() - run.last_flush >= self.settings['flush_seconds']
+
+    async def flush(self, run: BackfillRun, finished: bool = False):
+        async with run.lock:
+            if not finished and not self.flush_due(run):
+                return
+
+            pending, run.pending = run.pending, {}
+            rows = [{'discord_user_id': user_id, **entry} for user_id, entry in pending.items()]
+            state = copy.deepcopy(run.state)
+            while not Database.apply_backfill(run.guild_id, rows, state, finished):
+                await asyncio.sleep(self.settings['retry_seconds'])
+            run.last_flush = time.monotonic()
+
+            for row in rows:
+                journal.record_increments(run.guild_id, row['discord_user_id'], {stat: row[stat] for stat in COUNTERS if row.get(stat)})
+            journal.flush()
+
+        if run.last_flush - run.last_progress >= self.settings['progress_seconds']:
+            run.last_progress = run.last_flush
+            await self.report(run, f"Backfilling history: {run.summary()}")
+
+    async def report(self, run: BackfillRun, content: str):
+        if run.status_message is None:
+            return
+        try:
+            await run.status_message.edit(content=content)
+        except discord.HTTPException as e:
+            logger.warning("Could not update backfill progress: %s", e, extra={'guild': run.guild_id})
+
+    async def scan_channel(self, run: BackfillRun, channel, semaphore: asyncio.Semaphore):
+        channel_state = run.state['channels'][str(channel.id)]
+        subject_channels = guild_configs.get(run.guild_id).subject_channels
+
+        async with semaphore:
+            cursor = channel_state['cursor']
+            before = discord.Object(id=int(cursor)) if cursor else datetime.fromisoformat(run.state['before'])
+            try:
+                async for message in channel.history(limit=None, before=before):
+                    deltas = await self.message_deltas(run.guild, message, subject_channels)
+                    self.record(run, channel_state, message, deltas)
+                    if self.flush_due(run):
+                        await self.flush(run)
+            except discord.Forbidden:
+                logger.warning("Missing access to history of #%s, skipping it", channel.name, extra={'guild': run.guild_id})
+            channel_state['done'] = True
+
+    async def run(self, run: BackfillRun):
+        try:
+            targets = await self.discover(run.guild)
+            channels = run.state['channels']
+            for channel_id in targets:
+                channels.setdefault(channel_id, {'cursor': None, 'done': False})
+            for channel_id, channel_state in channels.items():
+                if channel_id not in targets:
+                    channel_state['done'] = True
+
+            semaphore = asyncio.Semaphore(self.settings['concurrent_channels'])
+            tasks = [
+                asyncio.create_task(self.scan_channel(run, channel, semaphore))
+                for channel_id, channel in targets.items() if not channels[channel_id]['done']
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            await self.flush(run, finished=True)
+
+            await self.progression.refresh_scores(run.guild_id)
+            await rebuild_sketches(run.guild_id)
+            self.leaderboard.warm_global(run.guild_id)
+
+            elapsed = time.monotonic() - run.started
+            logger.info("Backfill finished after %d messages in %.0fs", run.state['messages'], elapsed, extra={'op': 'backfill', 'guild': run.guild_id})
+            await self.report(run, f"✅ Backfill finished in {elapsed / 60:.1f} minutes: {run.summary()}")
+        except asyncio.CancelledError:
+            await self.report(run, f"Backfill cancelled at {run.summary()}. Run `!backfill` to resume from the last checkpoint.")
+            raise
+        except Exception as e:
+            logger.error("Backfill failed: %s", e, extra={'op': 'backfill', 'guild': run.guild_id})
+            await self.report(run, f"❌ Backfill stopped at {run.summary()}: {e}. Run `!backfill` to resume from the last checkpoint.")
+        finally:
+            self.runs.pop(run.guild_id, None)
+
+    async def start(self, guild: discord.Guild, channel: discord.abc.Messageable) -> Optional[str]:
+        guild_id = str(guild.id)
+        if guild_id in self.runs:
+            return "A backfill is already running in this server, see `!backfill_status`."
+
+        previous = Database.get_backfill_run(guild_id)
+        if previous is None:
+            return "Could not read the backfill checkpoint, try again later."
+        if previous.get('finished'):
+            return f"History was already backfilled on {previous['updated_at'][:10]}."
+
+        state = previous.get('state') or self.new_state(guild)
+        run = self.runs[guild_id] = BackfillRun(guild, state)
+        action = "Resuming" if previous else "Starting"
+        run.status_message = await channel.send(f"{action} history backfill of messages before {state['before'][:10]}...")
+        run.task = asyncio.create_task(self.run(run))
+        return None
+
+    def cancel(self, guild_id: str) -> bool:
+        run = self.runs.get(guild_id)
+        if run is None or run.task is None:
+            return False
+        run.task.cancel()
+        return True
+
+    def status(self, guild_id: str) -> str:
+        run = self.runs.get(guild_id)
+        if run is not None:
+            return f"Backfill running: {run.summary()}"
+
+        previous = Database.get_backfill_run(guild_id)
+        if previous is None:
+            return "Could not read the backfill checkpoint, try again later."
+        if not previous:
+            return "History has not been backfilled yet, run `!backfill` to start."
+
+        state = previous['state']
+        done = sum(1 for channel in state['channels'].values() if channel['done'])
+        progress = f"{done}/{len(state['channels'])} channels, {state['messages']:,} messages scanned, {state['credited']:,} credited"
+        if previous['finished']:
+            return f"Backfill finished on {previous['updated_at'][:10]}: {progress}"
+        return f"Backfill paused at {progress}. Run `!backfill` to resume."
+
+
+def setup_backfill_commands(bot: commands.Bot, backfill: BackfillModule):
+
+    @bot.command(name='backfill')
+    @commands.has_permissions(administrator=True)
+    async def backfill_command(ctx):
+        error = await backfill.start(ctx.guild, ctx.channel)
+        if error:
+            await ctx.send(error)
+
+    @bot.command(name='backfill_status')
+    @commands.has_permissions(administrator=True)
+    async def backfill_status(ctx):
+        await ctx.send(backfill.status(str(ctx.guild.id)))
+
+    @bot.command(name='backfill_cancel')
+    @commands.has_permissions(administrator=True)
+    async def backfill_cancel(ctx):
+        if backfill.cancel(str(ctx.guild.id)):
+            await ctx.send("Cancelling the backfill, progress up to the last checkpoint is kept.")
+        else:
+            await ctx.send("No backfill is running in this server.")
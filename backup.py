@@ -0,0 +1,211 @@
+import csv
+import os
+import sys
+import time
+from database import Database
+from config import BACKUP_SETTINGS
+from journal import BASELINE_COLUMNS, journal
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+COLUMNS: Dict[str, type] = {
+    'guild_id': str,
+    'discord_user_id': str,
+    'discord_username': str,
+    'rank': int,
+    'elite_type': str,
+    'voice_time_seconds': int,
+    'message_count': int,
+    'invite_count': int,
+    'reaction_count': int,
+    'subject_posts': int,
+    'subject_reactions': int,
+    'voice_sessions_hosted': int,
+    'videos_shared': int,
+    'advisor_validations': int,
+    'wants_to_contribute': bool,
+    'is_immune_to_decay': bool,
+    'score': float,
+    'last_activity': str,
+    'created_at': str
+}
+
+REQUIRED_COLUMNS = ('guild_id', 'discord_user_id', 'discord_username')
+
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow'}
+
+
+def file_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported file type {extension or path}, use one of: {', '.join(FORMATS)}")
+
+    file_type = FORMATS[extension]
+    if file_type != 'csv' and pyarrow is None:
+        raise RuntimeError(f"pyarrow is required for {file_type} files: pip install pyarrow")
+    return file_type
+
+
+def arrow_schema():
+    types = {str: pyarrow.string(), int: pyarrow.int64(), float: pyarrow.float64(), bool: pyarrow.bool_()}
+    return pyarrow.schema([(column, types[kind]) for column, kind in COLUMNS.items()])
+
+
+def parse_csv_value(kind: type, value: str) -> Any:
+    if value == '':
+        return None
+    if kind is bool:
+        return value.lower() in ('true', 't', '1')
+    return kind(value)
+
+
+def iter_pages(guild_id: Optional[str] = None, page_size: int = BACKUP_SETTINGS['page_size']) -> Iterator[List[Dict[str, Any]]]:
+    after = None
+    while True:
+        page = Database.get_user_stats_page(after, guild_id, page_size)
+        if page is None:
+            raise RuntimeError(f"Reading user_stats failed after {after}")
+        if page:
+            yield [{column: row.get(column) for column in COLUMNS} for row in page]
+        if len(page) < page_size:
+            return
+        after = (page[-1]['guild_id'], page[-1]['discord_user_id'])
+
+
+def write_csv(path: str, pages: Iterator[List[Dict[str, Any]]]) -> int:
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(COLUMNS))
+        writer.writeheader()
+        for page in pages:
+            writer.writerows(page)
+            written += len(page)
+    return written
+
+
+def write_arrow(path: str, pages: Iterator[List[Dict[str, Any]]], file_type: str) -> int:
+    schema = arrow_schema()
+    group_rows = BACKUP_SETTINGS['row_group_rows']
+    written = 0
+    pending: List[Dict[str, Any]] = []
+
+    if file_type == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(path, schema, compression='zstd')
+    else:
+        writer = pyarrow.ipc.new_file(path, schema)
+
+    with writer:
+        for page in pages:
+            pending.extend(page)
+            if len(pending) >= group_rows:
+                writer.write_table(pyarrow.Table.from_pylist(pending, schema))
+                written += len(pending)
+                pending = []
+        if pending:
+            writer.write_table(pyarrow.Table.from_pylist(pending, schema))
+            written += len(pending)
+    return written
+
+
+def read_csv(path: str, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        check_columns(reader.fieldnames or [])
+        columns = [(column, kind) for column, kind in COLUMNS.items() if column in reader.fieldnames]
+
+        chunk = []
+        for line in reader:
+            chunk.append({column: parse_csv_value(kind, line[column]) for column, kind in columns})
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def read_arrow(path: str, chunk_size: int, file_type: str) -> Iterator[List[Dict[str, Any]]]:
+    if file_type == 'parquet':
+        parquet = pyarrow.parquet.ParquetFile(path)
+        check_columns(parquet.schema_arrow.names)
+        columns = [column for column in COLUMNS if column in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pylist()
+        return
+
+    with pyarrow.memory_map(path) as source:
+        reader = pyarrow.ipc.open_file(source)
+        check_columns(reader.schema.names)
+        columns = [column for column in COLUMNS if column in reader.schema.names]
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i).select(columns)
+            for offset in range(0, batch.num_rows, chunk_size):
+                yield batch.slice(offset, chunk_size).to_pylist()
+
+
+def check_columns(names: List[str]):
+    missing = [column for column in REQUIRED_COLUMNS if column not in names]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+
+def export_user_stats(path: str, guild_id: Optional[str] = None) -> int:
+    file_type = file_format(path)
+    pages = iter_pages(guild_id)
+    if file_type == 'csv':
+        return write_csv(path, pages)
+    return write_arrow(path, pages, file_type)
+
+
+def import_user_stats(path: str) -> Tuple[int, int]:
+    file_type = file_format(path)
+    chunk_size = BACKUP_SETTINGS['chunk_size']
+    chunks = read_csv(path, chunk_size) if file_type == 'csv' else read_arrow(path, chunk_size, file_type)
+
+    imported = failed = 0
+    guilds: Set[str] = set()
+    for chunk in chunks:
+        by_guild: Dict[str, List[Dict[str, Any]]] = {}
+        for row in chunk:
+            by_guild.setdefault(row['guild_id'], []).append(row)
+
+        for guild_id, rows in by_guild.items():
+            written = set(Database.upsert_user_stats_many(guild_id, rows, chunk_size))
+            for row in rows:
+                if row['discord_user_id'] in written:
+                    values = {column: row[column] for column in BASELINE_COLUMNS if row.get(column) is not None}
+                    journal.record_baseline(guild_id, row['discord_user_id'], values)
+            imported += len(written)
+            failed += len(rows) - len(written)
+            guilds.add(guild_id)
+
+    journal.close()
+    Database.delete_guild_sketches(list(guilds))
+    return imported, failed
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in ('export', 'import'):
+        print("Usage: python backup.py export <file.csv|file.parquet|file.arrow> [guild_id] | import <file>")
+        sys.exit(1)
+
+    command, path = sys.argv[1], sys.argv[2]
+    start = time.perf_counter()
+    try:
+        if command == 'export':
+            count = export_user_stats(path, sys.argv[3] if len(sys.argv) > 3 else None)
+            print(f"Exported {count} rows to {path} in {time.perf_counter() - start:.1f}s")
+        else:
+            count, failures = import_user_stats(path)
+            print(f"Imported {count} rows from {path} in {time.perf_counter() - start:.1f}s")
+            if failures:
+                print(f"{failures} rows failed to import, see the log for details")
+                sys.exit(1)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"{command.title()} failed: {e}")
+        sys.exit(1)
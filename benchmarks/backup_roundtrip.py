@@ -0,0 +1,89 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_KEY', 'bench.bench.bench')
+
+import backup
+import database
+from fakes import FakeSupabase
+
+
+def seed(client: FakeSupabase, rows: int, guilds: int, rng: random.Random):
+    batch = []
+    for i in range(rows):
+        row = database.Database.new_user_row(str(10 ** 17 + i), f"user{i}", str(rng.randrange(guilds)))
+        row.update({
+            'rank': rng.randrange(1, 6),
+            'message_count': rng.randrange(0, 5000),
+            'voice_time_seconds': rng.randrange(0, 10 ** 6),
+            'elite_type': rng.choice((None, None, 'solid', 'pillar')),
+            'score': round(rng.random() * 1000, 2),
+            'created_at': row['last_activity']
+        })
+        batch.append(row)
+        if len(batch) == 10000:
+            client.seed('user_stats', batch)
+            batch = []
+    client.seed('user_stats', batch)
+
+
+def measured(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, (peak - current) / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-trip user_stats through backup.py export and import")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--guilds', type=int, default=500)
+    parser.add_argument('--formats', nargs='+', default=['csv', 'parquet', 'arrow'])
+    args = parser.parse_args()
+
+    source = FakeSupabase()
+    database.supabase = source
+    start = time.perf_counter()
+    seed(source, args.rows, args.guilds, random.Random(5))
+    print(f"seeded {args.rows} rows in {time.perf_counter() - start:.1f}s\n")
+
+    print(f"{'format':<8} {'size MB':>8} {'export s':>9} {'peak MB':>8} {'import s':>9} {'peak MB':>8} {'round trips':>12} {'match':>6}")
+    for file_type in args.formats:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"user_stats.{file_type}")
+
+            database.supabase = source
+            source.reset_counters()
+            exported, export_s, export_mb = measured(backup.export_user_stats, path)
+            export_trips = source.round_trips
+
+            target = FakeSupabase()
+            database.supabase = target
+            (imported, failed), import_s, import_mb = measured(backup.import_user_stats, path)
+
+            original = source.tables['user_stats'].rows
+            restored = target.tables['user_stats'].rows
+            same = exported == imported == len(original) and not failed and all(
+                all(restored[key].get(column) == row.get(column) for column in backup.COLUMNS)
+                for key, row in original.items()
+            )
+            size = os.path.getsize(path) / 2 ** 20
+            print(f"{file_type:<8} {size:>8.1f} {export_s:>9.1f} {export_mb:>8.1f} {import_s:>9.1f} {import_mb:>8.1f} "
+                  f"{export_trips:>5} + {target.round_trips:<5} {'yes' if same else 'NO':>6}")
+
+    print("\npeak MB is transient memory: peak traced allocation minus what was still held afterwards")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from content_classifier import ContentClassifier
+
+
+def make_messages(rng: random.Random, count: int, length: int):
+    links = [
+        'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+        'https://youtu.be/dQw4w9WgXcQ',
+        'https://example.com/article',
+        'https://cdn.example.com/clip.mp4',
+        'http'
+    ]
+    alphabet = string.ascii_letters + '      '
+    messages = []
+    for _ in range(count):
+        words = ''.join(rng.choice(alphabet) for _ in range(length))
+        if rng.random() < 0.2:
+            words += ' ' + rng.choice(links)
+        messages.append(words)
+    return messages
+
+
+def run(classifier: ContentClassifier, messages, in_subject_channel: bool):
+    timings = []
+    for content in messages:
+        start = time.perf_counter_ns()
+        classifier.classify(content, (), in_subject_channel, False)
+        timings.append(time.perf_counter_ns() - start)
+
+    timings.sort()
+    return statistics.mean(timings), timings[len(timings) // 2], timings[int(len(timings) * 0.99)], timings[-1]
+
+
+def main(count: int = 20_000):
+    classifier = ContentClassifier()
+    rng = random.Random(42)
+
+    print(f"{'length':>8} {'mean':>10} {'p50':>10} {'p99':>10} {'max':>10}")
+    for length in (20, 200, 2000, 4000):
+        messages = make_messages(rng, count, length)
+        mean, p50, p99, worst = run(classifier, messages, in_subject_channel=True)
+        print(f"{length:>8} {mean / 1000:>8.2f}us {p50 / 1000:>8.2f}us {p99 / 1000:>8.2f}us {worst / 1000:>8.2f}us")
+
+    adversarial = {
+        'dots': 'http://' + 'a.' * 1995 + 'mp',
+        'schemes': 'http://' * 570,
+        'no-space': 'https://youtu.be/' + 'x' * 3980
+    }
+    for name, content in adversarial.items():
+        mean, p50, p99, worst = run(classifier, [content] * 1000, in_subject_channel=True)
+        print(f"{name:>8} {mean / 1000:>8.2f}us {p50 / 1000:>8.2f}us {p99 / 1000:>8.2f}us {worst / 1000:>8.2f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_KEY', 'bench.bench.bench')
+
+import bot as bot_module
+import database
+from config import DISPATCH_SETTINGS
+from decay import DecayModule
+from decay_model import utc_now
+from dispatch import RateLimitedQueue
+from fakes import FakeGuild, FakeSupabase
+from journal import iter_events, journal
+
+
+def seed_users(client: FakeSupabase, guild: FakeGuild, rng: random.Random):
+    now = utc_now()
+    rows = []
+    for user_id in range(guild.member_count):
+        row = database.Database.new_user_row(str(user_id), f"user{user_id}", str(guild.id))
+        row.update({
+            'rank': rng.choice([1, 2, 3, 3, 4, 5]),
+            'last_activity': (now - timedelta(days=rng.uniform(7, 90))).isoformat(),
+            'voice_time_seconds': rng.randrange(0, 20_000),
+            'message_count': rng.randrange(0, 400),
+            'reaction_count': rng.randrange(0, 200),
+            'videos_shared': rng.randrange(0, 30)
+        })
+        rows.append(row)
+    client.seed('user_stats', rows)
+
+
+async def run_pass(count: int, latency_ms: float):
+    client = FakeSupabase(latency_ms=latency_ms)
+    database.supabase = client
+    guild = FakeGuild(1, count)
+    seed_users(client, guild, random.Random(42))
+    ranks_before = {row['discord_user_id']: row['rank'] for row in client.tables['user_stats'].rows.values()}
+
+    role_updates = RateLimitedQueue('role update', DISPATCH_SETTINGS['role_updates_per_second'], count)
+    decay = DecayModule(bot_module.bot, bot_module.progression, bot_module.dispatcher, role_updates)
+
+    client.reset_counters()
+    start = time.perf_counter()
+    decaying, demoted = await decay.process_guild_decay(guild)
+    elapsed = time.perf_counter() - start
+    round_trips = Counter(client.by_operation)
+
+    role_jobs = 0
+    while not role_updates.queue.empty():
+        await role_updates.queue.get_nowait()()
+        role_jobs += 1
+    notifications = len(bot_module.dispatcher)
+    dropped = bot_module.dispatcher.dropped
+    bot_module.dispatcher.stop()
+
+    journal.flush()
+    rank_events = sum(1 for _, kind, _, _, _ in iter_events(journal.directory, str(guild.id)) if kind == 'rank')
+    history = list(client.tables.get('rank_history').rows.values()) if 'rank_history' in client.tables else []
+    rows = client.tables['user_stats'].rows.values()
+    changed = sum(1 for row in rows if row['rank'] != ranks_before[row['discord_user_id']])
+    assert changed == demoted == len(history) == rank_events == role_jobs, (changed, demoted, len(history), rank_events, role_jobs)
+
+    print(f"users:            {count:,}")
+    print(f"decaying:         {decaying:,}")
+    print(f"demoted:          {demoted:,} (stored ranks, rank_history rows, journal events and role updates agree)")
+    print(f"pass:             {elapsed:.3f}s at {latency_ms}ms per request")
+    print(f"requests:         {sum(round_trips.values())} ({', '.join(f'{name} {calls}' for name, calls in sorted(round_trips.items()))})")
+    print(f"notifications:    {notifications:,} queued, {dropped:,} dropped by the full notification queue")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decay pass with demotions against a fake Supabase")
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--latency-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    journal.directory = tempfile.mkdtemp(prefix='bench-journal-')
+    asyncio.run(run_pass(args.users, args.latency_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,549 @@
+import bisect
+import copy
+import time
+import httpx
+from collections import Counter
+
+PRIMARY_KEYS = {
+    'user_stats': ('guild_id', 'discord_user_id'),
+    'activity_daily': ('guild_id', 'discord_user_id', 'day'),
+    'guild_config': ('guild_id',),
+    'guild_sketches': ('guild_id', 'stat'),
+    'backfill_runs': ('guild_id',),
+    'leadership_roles': ('id',),
+    'promotion_requests': ('id',),
+}
+
+
+class FakeResult:
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeTable:
+
+    def __init__(self, name):
+        self.name = name
+        self.key = PRIMARY_KEYS.get(name, ('id',))
+        self.rows = {}
+        self.next_id = 1
+        self.version = 0
+        self.plan_cache = {}
+        self.sorted_keys = None
+
+    def row_key(self, row):
+        if self.key == ('id',) and 'id' not in row:
+            row['id'] = self.next_id
+            self.next_id += 1
+        return tuple(row.get(column) for column in self.key)
+
+    def put(self, row):
+        self.rows[self.row_key(row)] = row
+        self.version += 1
+
+    def scan_keyed(self, filters, limit):
+        if self.sorted_keys is None or self.sorted_keys[0] != self.version:
+            self.sorted_keys = (self.version, sorted(self.rows))
+        keys = self.sorted_keys[1]
+
+        prefix = []
+        for column in self.key:
+            values = [value for op, c, value in filters if op == 'eq' and c == column]
+            if not values:
+                break
+            prefix.append(values[0])
+        start = bisect.bisect_left(keys, tuple(prefix))
+        if len(prefix) < len(self.key):
+            column = self.key[len(prefix)]
+            for op, c, value in filters:
+                if c == column and op == 'gt':
+                    start = max(start, bisect.bisect_right(keys, (*prefix, value), key=lambda key: key[:len(prefix) + 1]))
+                elif c == column and op == 'gte':
+                    start = max(start, bisect.bisect_left(keys, (*prefix, value), key=lambda key: key[:len(prefix) + 1]))
+
+        matched = []
+        for i in range(start, len(keys)):
+            key = keys[i]
+            if key[:len(prefix)] != tuple(prefix) or (limit is not None and len(matched) >= limit):
+                break
+            row = self.rows[key]
+            if all(matches(row, op, column, value) for op, column, value in filters):
+                matched.append(row)
+        return matched
+
+    def scan(self, filters, order, limit=None):
+        if order and order == tuple((column, False) for column in self.key):
+            return self.scan_keyed(filters, limit)
+
+        cache_key = (tuple(filters), order)
+        cached = self.plan_cache.get(cache_key) if order else None
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+
+        eq = {column: value for op, column, value in filters if op == 'eq'}
+        if len(eq) == len(self.key) and all(column in eq for column in self.key):
+            row = self.rows.get(tuple(eq[column] for column in self.key))
+            candidates = [row] if row is not None else []
+        else:
+            candidates = self.rows.values()
+
+        matched = [row for row in candidates if all(matches(row, op, column, value) for op, column, value in filters)]
+        if order:
+            for column, desc in reversed(order):
+                matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            self.plan_cache[cache_key] = (self.version, matched)
+        return matched
+
+
+def split_terms(text):
+    terms, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            terms.append(text[start:i])
+            start = i + 1
+    terms.append(text[start:])
+    return terms
+
+
+def parse_filter(text):
+    if text.startswith(('and(', 'or(')):
+        op, _, inner = text.partition('(')
+        return op, None, tuple(parse_filter(term) for term in split_terms(inner[:-1]))
+    column, op, value = text.split('.', 2)
+    return op, column, value
+
+
+def coerce(current, value):
+    if isinstance(value, str) and isinstance(current, (int, float)) and not isinstance(current, bool):
+        return float(value)
+    return value
+
+
+def matches(row, op, column, value):
+    if op == 'and':
+        return all(matches(row, *term) for term in value)
+    if op == 'or':
+        return any(matches(row, *term) for term in value)
+
+    current = row.get(column)
+    value = coerce(current, value)
+    if op == 'eq':
+        return current == value
+    if op == 'neq':
+        return current != value
+    if op == 'in':
+        return current in value
+    if current is None:
+        return False
+    if op == 'lt':
+        return current < value
+    if op == 'lte':
+        return current <= value
+    if op == 'gt':
+        return current > value
+    if op == 'gte':
+        return current >= value
+    raise ValueError(f"Unsupported filter {op}")
+
+
+class FakeQuery:
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.action = 'select'
+        self.payload = None
+        self.filters = []
+        self.order_by = ()
+        self.bounds = None
+        self.count = None
+        self.single = False
+        self.on_conflict = None
+        self.ignore_duplicates = False
+
+    def select(self, columns='*', count=None):
+        self.action = 'select'
+        self.count = count
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self.action, self.payload = 'upsert', rows
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values):
+        self.action, self.payload = 'update', values
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(('eq', column, value))
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(('neq', column, value))
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(('lt', column, value))
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(('lte', column, value))
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(('gt', column, value))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(('gte', column, value))
+        return self
+
+    def or_(self, filters):
+        self.filters.append(parse_filter(f"or({filters})"))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(('in', column, frozenset(values)))
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by += ((column, desc),)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end + 1)
+        return self
+
+    def limit(self, count):
+        self.bounds = (0, count)
+        return self
+
+    def maybe_single(self):
+        self.single = True
+        return self
+
+    def execute(self):
+        self.client.round_trip(self.table.name, self.action)
+        return getattr(self, f"execute_{self.action}")()
+
+    def execute_select(self):
+        rows = self.table.scan(self.filters, self.order_by, self.bounds[1] if self.bounds and self.bounds[0] == 0 else None)
+        start, end = self.bounds or (0, len(rows))
+        end = min(end, start + self.client.max_rows)
+        data = [dict(row) for row in rows[start:end]]
+
+        if self.single:
+            if not data:
+                return None
+            return FakeResult(data[0])
+        return FakeResult(data, len(rows) if self.count else None)
+
+    def execute_insert(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        inserted = []
+        for row in rows:
+            row = copy.deepcopy(row)
+            key = self.table.row_key(row)
+            if key in self.table.rows:
+                raise Exception(f"duplicate key value violates unique constraint on {self.table.name}")
+            self.table.put(row)
+            self.client.columns_written += len(row)
+            inserted.append(dict(row))
+        return FakeResult(inserted)
+
+    def execute_upsert(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        written = []
+        for row in rows:
+            row = copy.deepcopy(row)
+            key = self.table.row_key(row)
+            existing = self.table.rows.get(key)
+            if existing is not None:
+                if self.ignore_duplicates:
+                    continue
+                row = {**existing, **row}
+            self.table.put(row)
+            self.client.columns_written += len(row)
+            written.append(dict(row))
+        return FakeResult(written)
+
+    def execute_update(self):
+        updated = []
+        for row in list(self.table.scan(self.filters, None)):
+            row.update(copy.deepcopy(self.payload))
+            self.client.columns_written += len(self.payload)
+            updated.append(dict(row))
+        if updated:
+            self.table.version += 1
+        return FakeResult(updated)
+
+    def execute_delete(self):
+        deleted = []
+        for row in list(self.table.scan(self.filters, None)):
+            del self.table.rows[self.table.row_key(row)]
+            deleted.append(row)
+        if deleted:
+            self.table.version += 1
+        return FakeResult(deleted)
+
+
+class FakeRpc:
+
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.client.round_trip('rpc', self.name)
+        return FakeResult(getattr(self.client, f"rpc_{self.name}")(**copy.deepcopy(self.params)))
+
+
+class FakeSupabase:
+
+    def __init__(self, latency_ms=0.0, max_rows=1000):
+        self.latency = latency_ms / 1000
+        self.max_rows = max_rows
+        self.tables = {}
+        self.round_trips = 0
+        self.by_operation = Counter()
+        self.columns_written = 0
+        self.down = False
+
+    def table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(name)
+        return FakeQuery(self, self.tables[name])
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
+
+    def rpc_apply_backfill(self, p_guild_id, p_rows, p_state, p_finished=False):
+        users = self.table('user_stats').table
+        for row in p_rows:
+            key = (p_guild_id, row['discord_user_id'])
+            existing = users.rows.get(key)
+            if existing is None:
+                existing = {
+                    'guild_id': p_guild_id,
+                    'discord_user_id': row['discord_user_id'],
+                    'discord_username': row['discord_username'],
+                    'rank': 1,
+                    'last_activity': row['last_activity'],
+                    'score': 0
+                }
+            for column in ('message_count', 'reaction_count', 'subject_posts', 'subject_reactions', 'videos_shared'):
+                existing[column] = existing.get(column, 0) + row.get(column, 0)
+            users.put(existing)
+        self.table('backfill_runs').table.put({'guild_id': p_guild_id, 'state': p_state, 'finished': p_finished, 'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S')})
+        return len(p_rows)
+
+    def rpc_apply_activity(self, p_guild_id, p_rows):
+        users = self.table('user_stats').table
+        applied = []
+        for row in p_rows:
+            existing = users.rows.get((p_guild_id, row['discord_user_id']))
+            if existing is None:
+                continue
+            existing.update(row)
+            self.columns_written += len(row)
+            applied.append({'discord_user_id': row['discord_user_id']})
+        if applied:
+            users.version += 1
+        return applied
+
+    def rpc_demote_many(self, p_guild_id, p_user_ids, p_from_rank, p_to_rank):
+        users = self.table('user_stats').table
+        history = self.table('rank_history').table
+        demoted = []
+        for user_id in p_user_ids:
+            row = users.rows.get((p_guild_id, user_id))
+            if row is None or row.get('rank') != p_from_rank:
+                continue
+            row['rank'] = p_to_rank
+            self.columns_written += 1
+            history.put({
+                'guild_id': p_guild_id,
+                'discord_user_id': user_id,
+                'action': 'demote',
+                'from_rank': p_from_rank,
+                'to_rank': p_to_rank
+            })
+            demoted.append({'discord_user_id': user_id})
+        if demoted:
+            users.version += 1
+        return demoted
+
+    def round_trip(self, table, action):
+        self.round_trips += 1
+        self.by_operation[f"{table}.{action}"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.down:
+            raise httpx.ConnectError("connection refused")
+
+    def seed(self, table, rows):
+        for row in rows:
+            self.table(table).table.put(row)
+
+    def reset_counters(self):
+        self.round_trips = 0
+        self.by_operation.clear()
+        self.columns_written = 0
+
+
+class FakeRole:
+
+    def __init__(self, role_id, name):
+        self.id = role_id
+        self.name = name
+
+
+class FakeChannel:
+
+    def __init__(self, channel_id, name, guild=None):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.parent = None
+        self.sent = 0
+
+    async def send(self, content=None, embed=None, **kwargs):
+        self.sent += 1
+
+
+class FakeUser:
+    bot = False
+
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.display_name = self.name
+
+
+class FakeMember(FakeUser):
+
+    def __init__(self, member_id, guild):
+        super().__init__(member_id)
+        self.guild = guild
+        self.roles = []
+        self.mention = f"<@{member_id}>"
+
+    async def add_roles(self, *roles):
+        self.roles.extend(roles)
+
+    async def remove_roles(self, *roles):
+        self.roles = [role for role in self.roles if role not in roles]
+
+    async def send(self, content=None, embed=None, **kwargs):
+        pass
+
+
+class FakeInvite:
+
+    def __init__(self, code, uses, inviter):
+        self.code = code
+        self.uses = uses
+        self.inviter = inviter
+
+
+class FakeGuild:
+
+    def __init__(self, guild_id, member_count):
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+        self.member_count = member_count
+        self.roles = []
+        self.text_channels = [
+            FakeChannel(guild_id * 1000 + 1, 'general', self),
+            FakeChannel(guild_id * 1000 + 2, 'subjects', self),
+            FakeChannel(guild_id * 1000 + 3, 'welcome', self),
+        ]
+        self.voice_channel = FakeChannel(guild_id * 1000 + 4, 'voice', self)
+        self.members = {}
+        self.inviter = FakeUser(guild_id * 1000 + 5)
+        self.invite_uses = 0
+
+    def member(self, member_id):
+        member = self.members.get(member_id)
+        if member is None:
+            member = self.members[member_id] = FakeMember(member_id, self)
+        return member
+
+    def get_member(self, member_id):
+        if member_id < self.member_count:
+            return self.member(member_id)
+        return self.members.get(member_id)
+
+    async def fetch_member(self, member_id):
+        return self.get_member(member_id)
+
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    async def create_role(self, name, **kwargs):
+        role = FakeRole(len(self.roles) + 1, name)
+        self.roles.append(role)
+        return role
+
+    def get_channel(self, channel_id):
+        return next((channel for channel in self.text_channels if channel.id == channel_id), None)
+
+    async def invites(self):
+        return [FakeInvite('bench', self.invite_uses, self.inviter)]
+
+
+class FakeMessage:
+
+    def __init__(self, message_id, author, channel, content, attachments=()):
+        self.id = message_id
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.attachments = list(attachments)
+        self.reference = None
+        self.type = None
+        self._state = None
+
+
+class FakeVoiceState:
+
+    def __init__(self, channel=None):
+        self.channel = channel
+
+
+class FakeReactionPayload:
+
+    def __init__(self, guild_id, message_id, member):
+        self.guild_id = guild_id
+        self.message_id = message_id
+        self.member = member
+        self.user_id = member.id
+
+
+class FakeContext:
+
+    def __init__(self, guild, author):
+        self.guild = guild
+        self.author = author
+        self.sent = 0
+
+    async def send(self, content=None, embed=None, **kwargs):
+        self.sent += 1
@@ -0,0 +1,101 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_KEY', 'bench.bench.bench')
+
+import bot as bot_module
+import database
+from fakes import FakeSupabase
+from guild_config import guild_configs
+from topk import top_scores
+
+
+def seed(client: FakeSupabase, guilds: int, members: int, shared: int, rng: random.Random):
+    for guild_id in range(1, guilds + 1):
+        rows = []
+        user_ids = set(rng.sample(range(shared), members // 10)) | {shared + guild_id * members + i for i in range(members - members // 10)}
+        for user_id in user_ids:
+            row = database.Database.new_user_row(str(user_id), f"user{user_id}", str(guild_id))
+            row['message_count'] = int(rng.paretovariate(1.2) * 10)
+            row['score'] = guild_configs.get(str(guild_id)).score(row)
+            rows.append(row)
+        client.seed('user_stats', rows)
+
+
+def exact_top(client: FakeSupabase, k: int):
+    best = {}
+    for row in client.tables['user_stats'].rows.values():
+        current = best.get(row['discord_user_id'])
+        if current is None or row['score'] > current:
+            best[row['discord_user_id']] = row['score']
+    return sorted(best.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+def served_top():
+    return [(entry['discord_user_id'], entry['score']) for entry in top_scores.top()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Global leaderboard from merged per-guild top-K lists")
+    parser.add_argument('--guilds', type=int, default=50)
+    parser.add_argument('--members', type=int, default=500)
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    client = FakeSupabase(latency_ms=args.latency_ms)
+    database.supabase = client
+    seed(client, args.guilds, args.members, args.members * 5, rng)
+    leaderboard = bot_module.leaderboard
+
+    client.reset_counters()
+    start = time.perf_counter()
+    for guild_id in range(1, args.guilds + 1):
+        leaderboard.warm_global(str(guild_id))
+    warm_s = time.perf_counter() - start
+    rows_read = sum(len(top_scores._guilds[guild_id]) for guild_id in top_scores.guilds())
+    print(f"warm: {args.guilds} guilds in {warm_s:.2f}s, {client.round_trips} round trips, {rows_read} rows read")
+
+    start = time.perf_counter()
+    leaderboard.global_rows()
+    print(f"first merge: {(time.perf_counter() - start) * 1000:.2f}ms")
+    assert served_top() == exact_top(client, top_scores.k)
+
+    users = list(client.tables['user_stats'].rows.values())
+    client.reset_counters()
+    merge_ms, reloads = [], 0
+    for i in range(args.updates):
+        if i % 50 == 0:
+            row = rng.choice(top_scores.top())
+            deltas = {'message_count': -rng.randrange(50, 500)}
+        else:
+            row = rng.choice(users)
+            deltas = {'message_count': rng.randrange(1, 40)}
+        database.Database.increment_stats_many(row['guild_id'], {row['discord_user_id']: (None, deltas)})
+        if i % 100 == 0:
+            reloads += len(top_scores.stale())
+            for guild_id in top_scores.stale():
+                leaderboard.warm_global(guild_id)
+            start = time.perf_counter()
+            leaderboard.global_rows()
+            merge_ms.append((time.perf_counter() - start) * 1000)
+            assert served_top() == exact_top(client, top_scores.k), i
+
+    print(f"{args.updates} updates, {len(merge_ms)} reads: {reloads} guild reloads, "
+          f"mean merge {sum(merge_ms) / len(merge_ms):.2f}ms, top-{top_scores.k} matched a full scan every time")
+
+    client.reset_counters()
+    start = time.perf_counter()
+    rows_read = sum(len(database.Database.get_all_users_in_guild(str(guild_id))) for guild_id in range(1, args.guilds + 1))
+    print(f"naive refresh: {time.perf_counter() - start:.2f}s, {client.round_trips} round trips, {rows_read} rows read")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_KEY', 'bench.bench.bench')
+
+import discord
+import bot as bot_module
+import database
+from backfill import COUNTERS, BackfillModule
+from config import BACKFILL_SETTINGS
+from fakes import FakeSupabase, FakeUser
+from guild_config import guild_configs
+from journal import journal
+
+JOINED_AT = datetime(2024, 6, 1, tzinfo=timezone.utc)
+PAGE_SIZE = 100
+
+
+class Permissions:
+    read_message_history = True
+
+
+class Attachment:
+
+    def __init__(self, filename, content_type):
+        self.filename = filename
+        self.content_type = content_type
+
+
+class Reaction:
+
+    def __init__(self, users, latency):
+        self.users_list = users
+        self.count = len(users)
+        self.me = False
+        self.latency = latency
+
+    async def users(self):
+        await asyncio.sleep(self.latency)
+        for user in self.users_list:
+            yield user
+
+
+class Message:
+
+    def __init__(self, message_id, author, channel, content, attachments, reactions):
+        self.id = message_id
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.attachments = attachments
+        self.reactions = reactions
+        self.reference = None
+        self.created_at = discord.utils.snowflake_time(message_id)
+
+
+class StatusMessage:
+
+    def __init__(self):
+        self.content = None
+        self.edits = 0
+
+    async def edit(self, content=None):
+        self.content = content
+        self.edits += 1
+
+
+class StatusChannel:
+
+    def __init__(self):
+        self.message = StatusMessage()
+
+    async def send(self, content=None, **kwargs):
+        self.message.content = content
+        return self.message
+
+
+class HistoryChannel:
+
+    def __init__(self, channel_id, name, guild, messages, page_latency, reaction_latency):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.parent = None
+        self.threads = []
+        self.count = messages
+        self.page_latency = page_latency
+        self.reaction_latency = reaction_latency
+        self.first_id = discord.utils.time_snowflake(JOINED_AT - timedelta(days=365))
+        self.step = (discord.utils.time_snowflake(JOINED_AT) - self.first_id) // max(messages, 1)
+        self.pages = 0
+
+    def permissions_for(self, member):
+        return Permissions()
+
+    async def archived_threads(self, limit=None):
+        return
+        yield
+
+    def message_id(self, index):
+        return self.first_id + index * self.step
+
+    def message(self, index):
+        rng = random.Random(self.id * 1_000_003 + index)
+        author = self.guild.users[min(int(rng.paretovariate(1.1)) - 1, len(self.guild.users) - 1)]
+        content = rng.choice(self.guild.contents)
+        attachments = [Attachment('clip.mp4', 'video/mp4')] if rng.random() < 0.02 else []
+        reactions = []
+        if rng.random() < 0.05:
+            reactions.append(Reaction(rng.sample(self.guild.users, rng.randint(1, 3)), self.reaction_latency))
+        return Message(self.message_id(index), author, self, content, attachments, reactions)
+
+    async def history(self, limit=None, before=None):
+        before_id = before.id if isinstance(before, discord.Object) else discord.utils.time_snowflake(before)
+        index = min(self.count, (before_id - self.first_id + self.step - 1) // self.step) - 1
+        while index >= 0:
+            if (self.count - 1 - index) % PAGE_SIZE == 0:
+                self.pages += 1
+                await asyncio.sleep(self.page_latency)
+            yield self.message(index)
+            index -= 1
+
+
+class HistoryGuild:
+
+    def __init__(self, guild_id, channels, messages, users, page_latency, reaction_latency):
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+        self.users = [FakeUser(user_id) for user_id in range(1, users + 1)]
+        for user in self.users[50::97]:
+            user.bot = True
+        self.departed = {user.id for user in self.users[5::50]}
+        self.contents = [
+            "hello there",
+            "check this https://youtube.com/watch?v=abc",
+            "a long subject post " * 10,
+            "ok"
+        ]
+        self.me = FakeUser(0)
+        self.me.joined_at = JOINED_AT
+        names = ['subjects'] + [f"channel{i}" for i in range(1, channels)]
+        self.text_channels = [
+            HistoryChannel(guild_id * 1000 + i, name, self, messages // channels, page_latency, reaction_latency)
+            for i, name in enumerate(names)
+        ]
+
+    def get_member(self, user_id):
+        return None if user_id in self.departed else user_id
+
+
+async def expected_totals(module, guild):
+    subject_channels = guild_configs.get(str(guild.id)).subject_channels
+    totals = {}
+    for channel in guild.text_channels:
+        for index in range(channel.count):
+            deltas = await module.message_deltas(guild, channel.message(index), subject_channels)
+            for user_id, counts in deltas.items():
+                entry = totals.setdefault(user_id, {})
+                for stat in COUNTERS:
+                    if stat in counts:
+                        entry[stat] = entry.get(stat, 0) + counts[stat]
+    return totals
+
+
+def stored_totals(client, guild_id):
+    return {
+        row['discord_user_id']: {stat: row[stat] for stat in COUNTERS if row.get(stat)}
+        for row in client.tables['user_stats'].rows.values() if row['guild_id'] == guild_id
+    }
+
+
+def new_module():
+    return BackfillModule(bot_module.bot, bot_module.progression, bot_module.leaderboard, bot_module.classifier, BACKFILL_SETTINGS)
+
+
+async def run_once(guild, client, interrupt_after=None):
+    module = new_module()
+    status = StatusChannel()
+    error = await module.start(guild, status)
+    assert error is None, error
+    run = module.runs[str(guild.id)]
+
+    if interrupt_after is not None:
+        while run.state['messages'] < interrupt_after and not run.task.done():
+            await asyncio.sleep(0.01)
+        run.task.cancel()
+    try:
+        await run.task
+    except asyncio.CancelledError:
+        pass
+    return run, status.message
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Historical message backfill against simulated channel history")
+    parser.add_argument('--channels', type=int, default=16)
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--page-ms', type=float, default=50.0)
+    parser.add_argument('--reaction-ms', type=float, default=50.0)
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    journal.directory = tempfile.mkdtemp(prefix='bench-journal-')
+    BACKFILL_SETTINGS['flush_seconds'] = 5
+    BACKFILL_SETTINGS['progress_seconds'] = 5
+    expected = None
+
+    for concurrency in args.concurrency:
+        client = FakeSupabase(latency_ms=args.latency_ms)
+        database.supabase = client
+        BACKFILL_SETTINGS['concurrent_channels'] = concurrency
+        guild = HistoryGuild(1, args.channels, args.messages, args.users, args.page_ms / 1000, args.reaction_ms / 1000)
+        if expected is None:
+            expected = await expected_totals(new_module(), HistoryGuild(1, args.channels, args.messages, args.users, 0, 0))
+
+        start = time.perf_counter()
+        run, status = await run_once(guild, client)
+        elapsed = time.perf_counter() - start
+        assert stored_totals(client, str(guild.id)) == expected
+        print(f"concurrency {concurrency}: {run.state['messages']:,} messages in {elapsed:.1f}s "
+              f"({run.state['messages'] / elapsed:,.0f}/s, {run.state['messages'] / elapsed * 3600 / 1e6:.1f}M/hour), "
+              f"{client.by_operation['rpc.apply_backfill']} checkpoints, totals matched")
+        print(f"  {status.content}")
+
+    client = FakeSupabase(latency_ms=args.latency_ms)
+    database.supabase = client
+    BACKFILL_SETTINGS['concurrent_channels'] = max(args.concurrency)
+    guild = HistoryGuild(1, args.channels, args.messages, args.users, args.page_ms / 1000, args.reaction_ms / 1000)
+    for attempt, fraction in enumerate((0.3, 0.7), 1):
+        run, status = await run_once(guild, client, int(args.messages * fraction))
+        checkpoint = client.tables['backfill_runs'].rows.get((str(guild.id),))
+        saved = checkpoint['state']['messages'] if checkpoint else 0
+        print(f"interrupt {attempt}: cancelled at {run.state['messages']:,} messages, checkpoint at {saved:,}")
+    run, status = await run_once(guild, client)
+    assert stored_totals(client, str(guild.id)) == expected
+    print(f"resumed: finished at {run.state['messages']:,} messages, totals matched a single uninterrupted run")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_KEY', 'bench.bench.bench')
+
+import onboarding as onboarding_module
+from dispatch import NotificationDispatcher, RateLimitedQueue
+from onboarding import OnboardingModule
+
+
+class CountingDatabase:
+    round_trips = 0
+    rows = 0
+
+    @staticmethod
+    def create_user_stats_many(guild_id, users, chunk_size=500):
+        CountingDatabase.round_trips += (len(users) + chunk_size - 1) // chunk_size
+        CountingDatabase.rows += len(users)
+        return True
+
+
+class FakeStatBuffer:
+
+    def __init__(self):
+        self.invites = 0
+
+    def add(self, user_id, username, guild_id, stat_name, amount=1):
+        self.invites += amount
+
+
+class FakeUser:
+    bot = False
+
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = f"inviter{user_id}"
+
+
+class FakeInvite:
+
+    def __init__(self, code, uses, inviter):
+        self.code = code
+        self.uses = uses
+        self.inviter = inviter
+
+
+class FakeRole:
+
+    def __init__(self, role_id, name):
+        self.id = role_id
+        self.name = name
+
+
+class FakeChannel:
+
+    def __init__(self, channel_id, name):
+        self.id = channel_id
+        self.name = name
+        self.sent = []
+
+    async def send(self, embed=None):
+        self.sent.append(embed.title)
+
+
+class FakeGuild:
+
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+        self.roles = [FakeRole(1, 'Viewer')]
+        self.text_channels = [FakeChannel(i, f"channel{i}") for i in range(200)] + [FakeChannel(999, 'welcome')]
+        self.inviters = [FakeUser(i) for i in range(5)]
+        self.uses = {f"code{i}": 0 for i in range(5)}
+        self.invite_fetches = 0
+
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    def get_channel(self, channel_id):
+        return next((c for c in self.text_channels if c.id == channel_id), None)
+
+    async def invites(self):
+        self.invite_fetches += 1
+        return [FakeInvite(code, uses, self.inviters[i]) for i, (code, uses) in enumerate(self.uses.items())]
+
+
+class FakeMember:
+
+    def __init__(self, member_id, guild):
+        self.id = member_id
+        self.name = f"member{member_id}"
+        self.guild = guild
+        self.roles = []
+
+    async def add_roles(self, role):
+        self.roles.append(role)
+
+
+async def storm(joins_per_second: int, seconds: int, window: float):
+    onboarding_module.Database = CountingDatabase
+    CountingDatabase.round_trips = CountingDatabase.rows = 0
+
+    dispatcher = NotificationDispatcher()
+    role_updates = RateLimitedQueue('role update', 1000, 100_000)
+    stat_buffer = FakeStatBuffer()
+    onboarding = OnboardingModule(None, dispatcher, stat_buffer, role_updates)
+
+    guild = FakeGuild(1)
+    await onboarding.snapshot_invites(guild)
+
+    total = joins_per_second * seconds
+    per_window = int(joins_per_second * window)
+    flush_timings = []
+    joined = 0
+    while joined < total:
+        for _ in range(min(per_window, total - joined)):
+            member = FakeMember(joined, guild)
+            guild.uses[f"code{joined % 5}"] += 1
+            onboarding.enqueue_join(member)
+            joined += 1
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await onboarding.join_flush_task()
+        flush_timings.append(time.perf_counter() - start)
+
+    welcome_channel = onboarding.get_welcome_channel(guild)
+    flush_timings.sort()
+    print(f"{joins_per_second:>6}/s x {seconds}s: {total} joins, "
+          f"{CountingDatabase.round_trips} db round trips, "
+          f"{guild.invite_fetches} invite fetches, "
+          f"{stat_buffer.invites} invites credited, "
+          f"{len(dispatcher)} welcome messages queued, "
+          f"{len(role_updates)} role updates queued, "
+          f"p50 flush {flush_timings[len(flush_timings) // 2] * 1000:.2f}ms, "
+          f"max flush {flush_timings[-1] * 1000:.2f}ms")
+    dispatcher.stop()
+    assert welcome_channel.name == 'welcome'
+
+
+async def main():
+    window = onboarding_module.ONBOARDING_SETTINGS['burst_window_seconds']
+    for joins_per_second in (1, 10, 100, 1000):
+        await storm(joins_per_second, 60, window)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from journal import ActivityJournal, list_segments, rebuild_counters
+
+
+def main(events: int = 2_000_000, users: int = 50_000, guilds: int = 4):
+    rng = random.Random(42)
+    stats = ['message_count', 'reaction_count', 'voice_time_seconds', 'videos_shared', 'subject_posts']
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal = ActivityJournal(directory, segment_max_bytes=16 * 1024 * 1024)
+
+        start = time.perf_counter()
+        for _ in range(events):
+            guild_id = str(rng.randrange(guilds))
+            user_id = str(100_000 + rng.randrange(users))
+            roll = rng.random()
+            if roll < 0.98:
+                journal.record_increments(guild_id, user_id, {rng.choice(stats): 1})
+            elif roll < 0.995:
+                journal.append('decay', guild_id, user_id, {'message_count': rng.randrange(100)})
+            else:
+                journal.append('rank', guild_id, user_id, {'rank': rng.randrange(1, 6)})
+        journal.close()
+        write_elapsed = time.perf_counter() - start
+
+        segments = list_segments(directory)
+        size = sum(os.path.getsize(path) for path in segments)
+
+        start = time.perf_counter()
+        counters, replayed = rebuild_counters(directory)
+        replay_elapsed = time.perf_counter() - start
+
+    print(f"events:           {events}")
+    print(f"segments:         {len(segments)} ({size / 1024 / 1024:.1f} MiB, {size / events:.1f} bytes/event)")
+    print(f"append:           {events / write_elapsed:,.0f} events/s")
+    print(f"replay:           {replayed / replay_elapsed:,.0f} events/s ({replay_elapsed:.2f}s)")
+    print(f"rebuilt users:    {len(counters)}")
+
+
+if __name__ == '__main__':
+    main()
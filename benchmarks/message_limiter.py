@@ -0,0 +1,68 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config import MESSAGE_RATE_SETTINGS
+from message_limiter import MessageRateLimiter
+
+
+def check_cost(users: int, checks: int, rng: random.Random):
+    limiter = MessageRateLimiter({**MESSAGE_RATE_SETTINGS, 'max_users': users})
+    keys = [(1, rng.randrange(users * 3)) for _ in range(checks)]
+
+    start = time.perf_counter()
+    now = 0.0
+    for key in keys:
+        now += 0.001
+        limiter.allow(key, now)
+    elapsed = time.perf_counter() - start
+    print(f"{checks:,} checks over {users * 3:,} users into {users:,} slots: "
+          f"{elapsed / checks * 1e9:.0f}ns per check, {len(limiter):,} slots in use")
+
+    tracemalloc.start()
+    limiter = MessageRateLimiter({**MESSAGE_RATE_SETTINGS, 'max_users': users})
+    for user_id in range(users * 2):
+        limiter.allow((1, 10**17 + user_id), float(user_id))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"memory with every slot taken: {current / 1024 / 1024:.1f}MB")
+
+
+def flood(users: int, minutes: int, rng: random.Random):
+    limiter = MessageRateLimiter({**MESSAGE_RATE_SETTINGS, 'max_users': users})
+    spammer = (1, -1)
+    sent = credited = normal_sent = normal_credited = 0
+
+    for second in range(minutes * 60):
+        for i in range(10):
+            sent += 1
+            credited += limiter.allow(spammer, second + i / 10)
+        for _ in range(users // 30):
+            normal_sent += 1
+            normal_credited += limiter.allow((1, rng.randrange(users * 3)), second + 0.95)
+
+    allowed = MESSAGE_RATE_SETTINGS['burst'] + MESSAGE_RATE_SETTINGS['messages_per_minute'] * minutes
+    print(f"flood for {minutes} minutes with {normal_sent:,} other messages churning the slots: "
+          f"spammer credited {credited:,} of {sent:,} (limit {allowed:,}), "
+          f"other users credited {normal_credited / normal_sent:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-user message rate limiter cost and behaviour")
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--checks', type=int, default=2_000_000)
+    parser.add_argument('--minutes', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    check_cost(args.users, args.checks, rng)
+    flood(args.users, args.minutes, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import migrate
+
+SCHEMA = 'query_plan_bench'
+BASELINE_VERSION = '0003'
+
+QUERIES = {
+    'get_user_stats': (
+        "select * from user_stats where discord_user_id = %(user)s and guild_id = %(guild)s"
+    ),
+    'get_users_by_rank': (
+        "select * from user_stats where guild_id = %(guild)s and rank = 5"
+    ),
+    'get_inactive_users': (
+        "select * from user_stats where guild_id = %(guild)s and last_activity < %(cutoff)s "
+        "and is_immune_to_decay = false order by last_activity, discord_user_id limit 1000"
+    ),
+    'get_pending_promotion_request': (
+        "select * from promotion_requests where discord_user_id = %(user)s and guild_id = %(guild)s and status = 'pending'"
+    ),
+    'is_leader': (
+        "select * from leadership_roles where discord_user_id = %(user)s and guild_id = %(guild)s"
+    ),
+    'get_daily_rollups': (
+        "select * from activity_daily where guild_id = %(guild)s and day >= %(since)s "
+        "order by day, discord_user_id limit 1000"
+    )
+}
+
+
+def seed(conn, guilds: int, members: int, days: int):
+    with conn.transaction():
+        conn.execute(
+            "insert into user_stats (guild_id, discord_user_id, discord_username, rank, message_count, "
+            "voice_time_seconds, is_immune_to_decay, last_activity) "
+            "select 'g' || g, 'u' || u, 'user' || u, 1 + (hashint4(g * 7919 + u) & 2147483647) %% 5, "
+            "u %% 2000, u %% 36000, (u %% 10 = 0), now() - ((u %% 90) || ' days')::interval "
+            "from generate_series(1, %s) g, generate_series(1, %s) u",
+            (guilds, members)
+        )
+        conn.execute(
+            "insert into promotion_requests (guild_id, discord_user_id, current_rank, target_rank, validations_needed, status) "
+            "select 'g' || g, 'u' || u, 3, 4, 2, case when u %% 5 = 0 then 'pending' else 'approved' end "
+            "from generate_series(1, %s) g, generate_series(1, %s, 10) u",
+            (guilds, members)
+        )
+        conn.execute(
+            "insert into leadership_roles (guild_id, discord_user_id, role_type) "
+            "select 'g' || g, 'u' || u, case when u = 1 then 'ruler' else 'advisor' end "
+            "from generate_series(1, %s) g, generate_series(1, 5) u",
+            (guilds,)
+        )
+        conn.execute(
+            "insert into activity_daily (guild_id, discord_user_id, day, message_count) "
+            "select 'g' || g, 'u' || u, current_date - d, 1 "
+            "from generate_series(1, %s) g, generate_series(1, %s, 20) u, generate_series(0, %s) d",
+            (guilds, members, days - 1)
+        )
+    conn.execute("analyze")
+
+
+def plan_summary(plan: dict) -> str:
+    nodes = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        label = node['Node Type']
+        if 'Index Name' in node:
+            label += f" {node['Index Name']}"
+        nodes.append(label)
+        stack.extend(reversed(node.get('Plans', [])))
+    return ' > '.join(nodes)
+
+
+def measure(conn, params: dict, repeats: int) -> dict:
+    results = {}
+    for name, sql in QUERIES.items():
+        explained = conn.execute(f"explain (analyze, buffers, format json) {sql}", params).fetchone()[0][0]
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        results[name] = {
+            'plan': plan_summary(explained['Plan']),
+            'buffers': explained['Plan'].get('Shared Hit Blocks', 0) + explained['Plan'].get('Shared Read Blocks', 0),
+            'p50_ms': statistics.median(timings)
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare query plans and latency before and after the access path indexes")
+    parser.add_argument('--guilds', type=int, default=20)
+    parser.add_argument('--members', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=28)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    migrations = migrate.load_migrations(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'migrations'))
+    params = {
+        'guild': f"g{args.guilds // 2 or 1}",
+        'user': f"u{args.members // 2 or 1}",
+        'cutoff': datetime.now(timezone.utc) - timedelta(days=14),
+        'since': date.today() - timedelta(days=7)
+    }
+
+    with migrate.connect(args.database_url) as conn:
+        conn.execute(f"drop schema if exists {SCHEMA} cascade")
+        conn.execute(f"create schema {SCHEMA}")
+        conn.execute(f"set search_path to {SCHEMA}, public")
+        try:
+            migrate.migrate(conn, migrations, BASELINE_VERSION)
+            start = time.perf_counter()
+            seed(conn, args.guilds, args.members, args.days)
+            print(f"Seeded {args.guilds} guilds x {args.members} members in {time.perf_counter() - start:.1f}s\n")
+
+            before = measure(conn, params, args.repeats)
+            migrate.migrate(conn, migrations)
+            conn.execute("analyze")
+            after = measure(conn, params, args.repeats)
+        finally:
+            conn.rollback()
+            conn.execute(f"drop schema if exists {SCHEMA} cascade")
+            conn.commit()
+
+    print(f"{'query':<32}{'before ms':>10}{'after ms':>10}{'buffers':>16}")
+    for name in QUERIES:
+        b, a = before[name], after[name]
+        print(f"{name:<32}{b['p50_ms']:>10.3f}{a['p50_ms']:>10.3f}{b['buffers']:>8} > {a['buffers']:<6}")
+        print(f"  before: {b['plan']}")
+        print(f"  after:  {a['plan']}")
+
+
+if __name__ == '__main__':
+    main()
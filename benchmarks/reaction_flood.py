@@ -0,0 +1,71 @@
+import os
+import random
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+class CountingStatBuffer:
+
+    def __init__(self):
+        self.calls = 0
+
+    def add(self, user_id, username, guild_id, stat_name, amount=1):
+        self.calls += 1
+
+
+class FakeGuild:
+
+    def __init__(self, guild_id):
+        self.id = guild_id
+
+    def get_member(self, user_id):
+        return None
+
+
+class FakeBot:
+
+    def __init__(self, guilds):
+        self.guilds = {g.id: g for g in guilds}
+
+    def get_guild(self, guild_id):
+        return self.guilds.get(guild_id)
+
+
+def main(events: int = 1_000_000, subject_posts: int = 50_000, members: int = 10_000):
+    sys.modules['stat_buffer'] = types.SimpleNamespace(StatBuffer=CountingStatBuffer)
+    from reactions import ReactionModule
+
+    guild = FakeGuild(1)
+    stat_buffer = CountingStatBuffer()
+    module = ReactionModule(FakeBot([guild]), stat_buffer)
+
+    rng = random.Random(42)
+    post_ids = [10_000_000 + i for i in range(subject_posts)]
+    for message_id in post_ids:
+        module.register_subject_post(message_id, rng.randrange(members))
+
+    flood = []
+    for _ in range(events):
+        if rng.random() < 0.3:
+            message_id = rng.choice(post_ids)
+        else:
+            message_id = rng.randrange(1, 10_000_000)
+        flood.append((message_id, rng.randrange(members), 1 if rng.random() < 0.9 else -1))
+
+    start = time.perf_counter()
+    for message_id, user_id, amount in flood:
+        module.handle_reaction(1, message_id, user_id, None, amount)
+    elapsed = time.perf_counter() - start
+
+    print(f"reactions:        {events}")
+    print(f"indexed posts:    {len(module.subject_posts)}")
+    print(f"stat increments:  {stat_buffer.calls}")
+    print(f"elapsed:          {elapsed:.3f}s")
+    print(f"throughput:       {events / elapsed:,.0f} reactions/s")
+
+
+if __name__ == '__main__':
+    main()
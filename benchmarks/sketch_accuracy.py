@@ -0,0 +1,91 @@
+import bisect
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config import SKETCH_SETTINGS
+from sketches import QuantileSketch
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+def make_values(rng: random.Random, count: int):
+    return [0 if rng.random() < 0.3 else round(rng.lognormvariate(4, 1.5), 2) for _ in range(count)]
+
+
+def new_sketch() -> QuantileSketch:
+    return QuantileSketch(SKETCH_SETTINGS['relative_accuracy'], SKETCH_SETTINGS['max_buckets'])
+
+
+def exact_quantile(ordered, q: float) -> float:
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def worst_errors(sketch: QuantileSketch, values, probes):
+    ordered = sorted(values)
+    quantile_error = 0.0
+    for q in QUANTILES:
+        exact = exact_quantile(ordered, q)
+        if exact:
+            quantile_error = max(quantile_error, abs(sketch.quantile(q) - exact) / exact)
+
+    rank_error = 0.0
+    for value in probes:
+        exact = (len(ordered) - bisect.bisect_right(ordered, value)) / len(ordered)
+        rank_error = max(rank_error, abs(sketch.fraction_above(value) - exact))
+    return quantile_error, rank_error
+
+
+def main(members: int = 100_000, updates: int = 200_000, shards: int = 8):
+    rng = random.Random(7)
+    values = make_values(rng, members)
+    probes = rng.sample(values, 1000)
+
+    start = time.perf_counter()
+    sketch = new_sketch()
+    for value in values:
+        sketch.add(value)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{'phase':<10} {'members':>8} {'buckets':>8} {'bytes':>8} {'max q err':>10} {'max rank err':>13}")
+
+    def report(phase: str, current: QuantileSketch, current_values):
+        quantile_error, rank_error = worst_errors(current, current_values, probes)
+        size = len(json.dumps(current.to_dict()))
+        print(f"{phase:<10} {current.count:>8} {len(current.buckets):>8} {size:>8} {quantile_error:>9.2%} {rank_error:>12.3%}")
+
+    report('build', sketch, values)
+
+    start = time.perf_counter()
+    for _ in range(updates):
+        i = rng.randrange(members)
+        old = values[i]
+        values[i] = round(old + rng.expovariate(0.2), 2)
+        sketch.remove(old)
+        sketch.add(values[i])
+    update_us = (time.perf_counter() - start) * 1e6 / updates
+    report('updated', sketch, values)
+
+    merged = new_sketch()
+    for shard in range(shards):
+        part = new_sketch()
+        for value in values[shard::shards]:
+            part.add(value)
+        merged.merge(part)
+    report('merged', merged, values)
+
+    restored = QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict())), SKETCH_SETTINGS['max_buckets'])
+    start = time.perf_counter()
+    for value in probes:
+        restored.fraction_above(value)
+    lookup_us = (time.perf_counter() - start) * 1e6 / len(probes)
+
+    print(f"\nbuild {build_ms:.0f}ms, update {update_us:.2f}us, top% lookup {lookup_us:.2f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_KEY', 'bench.bench.bench')
+
+import bot as bot_module
+import database
+from fakes import (
+    FakeContext, FakeGuild, FakeMessage, FakeReactionPayload, FakeSupabase, FakeUser, FakeVoiceState
+)
+from guild_config import guild_configs
+from journal import journal
+
+SCENARIOS = ('on_message', 'on_reaction_add', 'on_voice_state_update', 'on_member_join', 'leaderboard', 'decay', 'outage')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+CHAT = "anyone around for the study session tonight?"
+VIDEO = "check this out https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+SUBJECT = "Notes on spaced repetition: " + "the interval between reviews should grow as recall improves. " * 4
+
+
+def seed_guild(client: FakeSupabase, guild: FakeGuild, rng: random.Random):
+    now = datetime.now(timezone.utc)
+    rows = []
+    for user_id in range(guild.member_count):
+        row = database.Database.new_user_row(str(user_id), f"user{user_id}", str(guild.id))
+        inactive_days = rng.choice((0, 1, 3, 10, 30, 90))
+        row.update({
+            'rank': rng.choice((1, 2, 2, 3, 3, 4, 5)),
+            'voice_time_seconds': rng.randrange(0, 36000),
+            'message_count': rng.randrange(0, 2000),
+            'reaction_count': rng.randrange(0, 300),
+            'invite_count': rng.randrange(0, 20),
+            'videos_shared': rng.randrange(0, 30),
+            'last_activity': (now - timedelta(days=inactive_days)).isoformat()
+        })
+        row['score'] = guild_configs.get(str(guild.id)).score(row)
+        rows.append(row)
+    client.seed('user_stats', rows)
+
+
+def drain(queue):
+    while not queue.queue.empty():
+        queue.queue.get_nowait()
+
+
+def flush_stats() -> float:
+    start = time.perf_counter()
+    bot_module.stat_buffer.flush()
+    bot_module.stat_buffer.flush_rollups()
+    return time.perf_counter() - start
+
+
+async def timed(latencies, handler, *args):
+    start = time.perf_counter()
+    await handler(*args)
+    latencies.append(time.perf_counter() - start)
+
+
+async def run_on_message(guild, events, rng):
+    general, subjects = guild.text_channels[0], guild.text_channels[1]
+    latencies = []
+    for i in range(events):
+        author = guild.member(rng.randrange(guild.member_count))
+        roll = rng.random()
+        if roll < 0.1:
+            message = FakeMessage(10_000_000 + i, author, subjects, SUBJECT)
+        elif roll < 0.2:
+            message = FakeMessage(10_000_000 + i, author, general, VIDEO)
+        else:
+            message = FakeMessage(10_000_000 + i, author, general, CHAT)
+        await timed(latencies, bot_module.bot.on_message, message)
+    return latencies, flush_stats()
+
+
+async def run_on_reaction_add(guild, events, rng):
+    posts = [20_000_000 + i for i in range(100)]
+    for message_id in posts:
+        bot_module.reactions.register_subject_post(message_id, rng.randrange(guild.member_count))
+
+    latencies = []
+    for i in range(events):
+        message_id = posts[i % len(posts)] if rng.random() < 0.3 else 30_000_000 + i
+        member = guild.member(rng.randrange(guild.member_count))
+        await timed(latencies, bot_module.bot.on_raw_reaction_add, FakeReactionPayload(guild.id, message_id, member))
+    return latencies, flush_stats()
+
+
+async def run_on_voice_state_update(guild, events, rng):
+    empty, joined = FakeVoiceState(), FakeVoiceState(guild.voice_channel)
+    latencies = []
+    for i in range(events // 2):
+        member = guild.member(rng.randrange(guild.member_count))
+        await timed(latencies, bot_module.bot.on_voice_state_update, member, empty, joined)
+        bot_module.voice_sessions[f"{guild.id}_{member.id}"] -= timedelta(minutes=rng.randrange(1, 120))
+        await timed(latencies, bot_module.bot.on_voice_state_update, member, joined, empty)
+    return latencies, flush_stats()
+
+
+async def run_on_member_join(guild, events, rng):
+    onboarding = bot_module.onboarding
+    await onboarding.snapshot_invites(guild)
+
+    latencies = []
+    batch = 100
+    for start in range(0, events, batch):
+        for member_id in range(guild.member_count + start, guild.member_count + min(start + batch, events)):
+            guild.invite_uses += 1
+            await timed(latencies, bot_module.bot.on_member_join, guild.member(member_id))
+
+        flush_start = time.perf_counter()
+        await onboarding.join_flush_task()
+        latencies[-1] += time.perf_counter() - flush_start
+
+    drain(bot_module.role_updates)
+    bot_module.dispatcher.stop()
+    return latencies, flush_stats()
+
+
+async def run_leaderboard(guild, events, rng):
+    command = bot_module.bot.get_command('leaderboard')
+    ctx = FakeContext(guild, guild.member(0))
+    latencies = []
+    for i in range(events):
+        await timed(latencies, command.callback, ctx, 'week' if i % 2 else 'all')
+    return latencies, 0.0
+
+
+async def run_decay(guild, events, rng):
+    latencies = []
+    for _ in range(events):
+        await timed(latencies, bot_module.decay.process_guild_decay, guild)
+        drain(bot_module.role_updates)
+    return latencies, 0.0
+
+
+async def run_outage(guild, events, rng):
+    database.supabase.down = True
+    latencies, flush_seconds = await run_on_message(guild, events, rng)
+    database.supabase.down = False
+    database.breaker.opened_at -= database.breaker.reset_timeout
+    flush_stats()
+    flush_stats()
+    return latencies, flush_seconds
+
+
+RUNNERS = {
+    'on_message': (run_on_message, 1),
+    'on_reaction_add': (run_on_reaction_add, 1),
+    'on_voice_state_update': (run_on_voice_state_update, 1),
+    'on_member_join': (run_on_member_join, 1),
+    'leaderboard': (run_leaderboard, 0.01),
+    'decay': (run_decay, 0.0015),
+    'outage': (run_outage, 1),
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_scenario(name, size, events, latency_ms, seed):
+    client = FakeSupabase(latency_ms)
+    database.supabase = client
+    guild_configs.invalidate()
+
+    rng = random.Random(seed)
+    guild = FakeGuild(size, size)
+    seed_guild(client, guild, rng)
+    bot_module.bot.get_guild = lambda guild_id: guild if guild_id == guild.id else None
+
+    runner, scale = RUNNERS[name]
+    count = max(1, int(events * scale))
+    client.reset_counters()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies, flush_seconds = await runner(guild, count, rng)
+    elapsed = time.perf_counter() - start
+
+    units = size * count if name == 'decay' else count
+    return {
+        'scenario': name,
+        'members': size,
+        'events': units,
+        'events_per_second': units / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'flush_ms': flush_seconds * 1000,
+        'round_trips': client.round_trips,
+        'round_trips_per_event': client.round_trips / units,
+        'round_trips_by_operation': dict(client.by_operation),
+        'columns_written_per_event': client.columns_written / units,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_results(results, baseline=None):
+    previous = {(r['scenario'], r['members']): r for r in baseline['results']} if baseline else {}
+    print(f"{'scenario':<24}{'members':>9}{'events/s':>13}{'p50 ms':>10}{'p99 ms':>10}{'flush ms':>10}{'rt/event':>10}{'cols/event':>12}")
+    for result in results:
+        line = (f"{result['scenario']:<24}{result['members']:>9}{result['events_per_second']:>13,.0f}"
+                f"{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}{result['flush_ms']:>10.1f}"
+                f"{result['round_trips_per_event']:>10.3f}{result.get('columns_written_per_event', 0):>12.3f}")
+        before = previous.get((result['scenario'], result['members']))
+        if before:
+            change = (result['events_per_second'] / before['events_per_second'] - 1) * 100
+            line += f"   {change:+.1f}% events/s, p99 {before['p99_ms']:.3f} -> {result['p99_ms']:.3f}"
+        print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the activity tracking hot paths against a fake Supabase.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--events', type=int, default=2_000)
+    parser.add_argument('--latency-ms', type=float, default=1.0)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="where to save results (default: benchmarks/results/<revision>.json)")
+    parser.add_argument('--compare', help="previous results file to compare against")
+    args = parser.parse_args()
+
+    journal.directory = tempfile.mkdtemp(prefix='bench-journal-')
+    bot_module.stat_buffer.spool.path = os.path.join(tempfile.mkdtemp(prefix='bench-spool-'), 'stats.jsonl')
+    bot_module.bot._connection.user = FakeUser(0)
+
+    results = []
+    for size in args.sizes:
+        for name in args.scenarios:
+            results.append(await run_scenario(name, size, args.events, args.latency_ms, args.seed))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    revision = git_revision()
+    output = args.output or os.path.join(RESULTS_DIR, f"{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'revision': revision,
+            'recorded_at': datetime.now(timezone.utc).isoformat(),
+            'latency_ms': args.latency_ms,
+            'events': args.events,
+            'seed': args.seed,
+            'results': results
+        }, f, indent=2)
+    print(f"\nresults saved to {output}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
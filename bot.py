@@ -1,18 +1,39 @@
+import logging
 import discord
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
 from datetime import datetime
 
-from database import Database
-from config import RANKS, SCORING
+import database
+from database import Database, stale_notice
+from config import RANKS, ROLLUP_SETTINGS, DISPATCH_SETTINGS
 from onboarding import OnboardingModule, setup_onboarding_commands
 from progression import ProgressionModule, setup_progression_commands
 from elite_system import EliteSystemModule, setup_elite_commands
 from decay import DecayModule, setup_decay_commands
 from leadership import LeadershipModule, setup_leadership_commands
+from dispatch import NotificationDispatcher, RateLimitedQueue
+from reactions import ReactionModule
+from stat_buffer import StatBuffer
+from content_classifier import ContentClassifier
+from message_limiter import MessageRateLimiter
+from rollups import rollups
+from guild_config import guild_configs, setup_guild_config_commands
+from config_reload import ConfigReloader, setup_config_reload_commands
+from metrics import metrics
+from logs import setup_logging, shutdown_logging
+from profiling import Profiler, setup_profiling_commands
+from leaderboard import LeaderboardModule, setup_leaderboard_commands
+from sketches import setup_sketch_commands
+from topk import top_scores
+from backfill import BackfillModule, setup_backfill_commands
+from journal import journal
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
+setup_logging()
 
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 
@@ -23,53 +44,83 @@ intents.voice_states = True
 intents.invites = True
 intents.reactions = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+
+class ActivityBot(commands.Bot):
+
+    async def close(self):
+        if self.is_closed():
+            return
+
+        onboarding.cog_unload()
+        decay.cog_unload()
+        config_reloader.cog_unload()
+        role_updates.stop()
+        dispatcher.stop()
+        stat_buffer.cog_unload()
+        journal.close()
+        await metrics.stop_server()
+        await super().close()
+        shutdown_logging()
+
+
+bot = ActivityBot(command_prefix='!', intents=intents)
 
 voice_sessions = {}
-guild_invites = {}
 
-onboarding = OnboardingModule(bot)
+dispatcher = NotificationDispatcher()
+role_updates = RateLimitedQueue('role update', DISPATCH_SETTINGS['role_updates_per_second'], DISPATCH_SETTINGS['queue_size'])
+stat_buffer = StatBuffer(bot)
+onboarding = OnboardingModule(bot, dispatcher, stat_buffer, role_updates)
 progression = ProgressionModule(bot)
+leaderboard = LeaderboardModule(bot, progression)
 elite_system = EliteSystemModule(bot)
-decay = DecayModule(bot)
+decay = DecayModule(bot, progression, dispatcher, role_updates)
 leadership = LeadershipModule(bot)
+classifier = ContentClassifier()
+message_limiter = MessageRateLimiter()
+reactions = ReactionModule(bot, stat_buffer)
+backfill = BackfillModule(bot, progression, leaderboard, classifier)
+config_reloader = ConfigReloader(bot)
+profiler = Profiler(bot)
+
+guild_configs.scoring_listeners.append(progression.schedule_refresh)
+
+
+@bot.event
+async def setup_hook():
+    role_updates.start()
+    stat_buffer.start_tasks()
+    onboarding.start_tasks()
+    decay.start_tasks()
+    config_reloader.start_tasks()
+    await metrics.start_server()
 
 
 @bot.event
 async def on_ready():
-    print(f'{bot.user} has connected to Discord!')
-    print(f'Bot is in {len(bot.guilds)} guilds')
+    logger.info("%s has connected to Discord", bot.user)
+    logger.info("Bot is in %d guilds", len(bot.guilds))
 
     for guild in bot.guilds:
-        try:
-            guild_invites[guild.id] = await guild.invites()
-        except discord.Forbidden:
-            print(f"Cannot fetch invites for {guild.name} - missing permissions")
-            guild_invites[guild.id] = []
+        stat_buffer.warm_rollups(str(guild.id))
+        await stat_buffer.warm_sketches(str(guild.id))
+        leaderboard.warm_global(str(guild.id))
+        await onboarding.snapshot_invites(guild)
 
 
 @bot.event
-async def on_member_join(member: discord.Member):
-    await onboarding.welcome_member(member)
+async def on_guild_join(guild: discord.Guild):
+    leaderboard.warm_global(str(guild.id))
 
-    guild = member.guild
 
-    try:
-        new_invites = await guild.invites()
-        old_invites = guild_invites.get(guild.id, [])
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    top_scores.drop(str(guild.id))
 
-        for new_invite in new_invites:
-            for old_invite in old_invites:
-                if new_invite.code == old_invite.code and new_invite.uses > old_invite.uses:
-                    inviter = new_invite.inviter
-                    if inviter and not inviter.bot:
-                        Database.increment_stat(str(inviter.id), inviter.name, str(guild.id), 'invite_count')
-                        print(f"{inviter.name} invited {member.name}")
-                    break
 
-        guild_invites[guild.id] = new_invites
-    except discord.Forbidden:
-        print(f"Cannot track invites for {guild.name} - missing permissions")
+@bot.event
+async def on_member_join(member: discord.Member):
+    onboarding.enqueue_join(member)
 
 
 @bot.event
@@ -83,7 +134,7 @@ async def on_voice_state_update(member, before, after):
 
     if before.channel is None and after.channel is not None:
         voice_sessions[session_key] = datetime.utcnow()
-        print(f"{member.name} joined voice channel")
+        logger.debug("%s joined voice channel", member.name, extra={'guild': guild_id, 'user': user_id})
 
     elif before.channel is not None and after.channel is None:
         if session_key in voice_sessions:
@@ -91,20 +142,9 @@ async def on_voice_state_update(member, before, after):
             duration = (datetime.utcnow() - join_time).total_seconds()
             del voice_sessions[session_key]
 
-            user_stats = Database.get_user_stats(user_id, guild_id)
-            if user_stats:
-                current_time = user_stats.get('voice_time_seconds', 0)
-                Database.update_user_stats(user_id, guild_id, {
-                    'voice_time_seconds': current_time + int(duration),
-                    'discord_username': member.name
-                })
-            else:
-                Database.create_user_stats(user_id, member.name, guild_id)
-                Database.update_user_stats(user_id, guild_id, {
-                    'voice_time_seconds': int(duration)
-                })
+            stat_buffer.add(user_id, member.name, guild_id, 'voice_time_seconds', int(duration))
 
-            print(f"{member.name} left voice channel after {int(duration)} seconds")
+            logger.debug("%s left voice channel after %d seconds", member.name, int(duration), extra={'guild': guild_id, 'user': user_id})
 
 
 @bot.event
@@ -117,32 +157,73 @@ async def on_message(message):
         await bot.process_commands(message)
         return
 
+    if not message_limiter.allow((message.guild.id, message.author.id)):
+        await bot.process_commands(message)
+        return
+
     user_id = str(message.author.id)
     username = message.author.name
     guild_id = str(message.guild.id)
 
-    Database.increment_stat(user_id, username, guild_id, 'message_count')
+    deltas = classifier.classify_message(message, guild_configs.get(guild_id).subject_channels)
+    stat_buffer.add_many(user_id, username, guild_id, deltas)
+
+    if 'subject_posts' in deltas:
+        reactions.register_subject_post(message.id, message.author.id)
 
     await bot.process_commands(message)
 
 
 @bot.event
-async def on_reaction_add(reaction, user):
-    if user.bot:
+async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
+    if payload.guild_id is None:
+        return
+
+    member = payload.member
+    if member is None or member.bot:
+        return
+
+    reactions.handle_reaction(payload.guild_id, payload.message_id, member.id, member.name, 1)
+
+
+@bot.event
+async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
+    if payload.guild_id is None:
         return
 
-    if not reaction.message.guild:
+    guild = bot.get_guild(payload.guild_id)
+    member = guild.get_member(payload.user_id) if guild else None
+    if member is not None and member.bot:
         return
 
-    user_id = str(user.id)
-    guild_id = str(reaction.message.guild.id)
+    username = member.name if member else None
+    reactions.handle_reaction(payload.guild_id, payload.message_id, payload.user_id, username, -1)
+
 
-    Database.increment_stat(user_id, user.name, guild_id, 'reaction_count')
+@bot.event
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    reactions.forget_subject_post(payload.message_id)
 
 
 @bot.event
 async def on_invite_create(invite):
-    guild_invites[invite.guild.id] = await invite.guild.invites()
+    await onboarding.snapshot_invites(invite.guild)
+
+
+@bot.event
+async def on_guild_channel_create(channel):
+    guild_configs.invalidate_channels(channel.guild.id)
+
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    if before.name != after.name:
+        guild_configs.invalidate_channels(after.guild.id)
+
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    guild_configs.invalidate_channels(channel.guild.id)
 
 
 @bot.command(name='stats')
@@ -153,7 +234,7 @@ async def stats(ctx, member: discord.Member = None):
     user_id = str(member.id)
     guild_id = str(ctx.guild.id)
 
-    user_stats = Database.get_user_stats(user_id, guild_id)
+    user_stats = Database.get_user_stats(user_id, guild_id, allow_stale=True)
 
     if not user_stats:
         await ctx.send(f"No stats found for {member.display_name}")
@@ -177,6 +258,14 @@ async def stats(ctx, member: discord.Member = None):
     score = progression.calculate_user_score(user_stats)
     embed.add_field(name="Overall Score", value=f"{score} pts", inline=False)
 
+    standing = progression.get_standing(guild_id, score)
+    if standing:
+        embed.add_field(name="Standing", value=standing, inline=False)
+
+    window_days = ROLLUP_SETTINGS['leaderboard_days']
+    window_score = progression.calculate_user_score(rollups.window_totals(guild_id, user_id, window_days), guild_id)
+    embed.add_field(name=f"Last {window_days} Days", value=f"{window_score} pts", inline=False)
+
     embed.add_field(name="Voice Time", value=f"{voice_hours:.2f} hours", inline=True)
     embed.add_field(name="Messages", value=str(user_stats.get('message_count', 0)), inline=True)
     embed.add_field(name="Invites", value=str(user_stats.get('invite_count', 0)), inline=True)
@@ -191,27 +280,10 @@ async def stats(ctx, member: discord.Member = None):
     if user_stats.get('is_immune_to_decay', False):
         embed.add_field(name="Decay Immunity", value="✅ Immune", inline=True)
 
-    await ctx.send(embed=embed)
+    if user_stats.get('stale_at'):
+        embed.set_footer(text=stale_notice(user_stats['stale_at']))
 
-
-@bot.command(name='add_video')
-async def add_video(ctx):
-    user_id = str(ctx.author.id)
-    guild_id = str(ctx.guild.id)
-
-    Database.increment_stat(user_id, ctx.author.name, guild_id, 'videos_shared')
-
-    await ctx.send(f"{ctx.author.mention} video recorded! (+{SCORING['video_per_count']} points)")
-
-
-@bot.command(name='add_subject')
-async def add_subject(ctx):
-    user_id = str(ctx.author.id)
-    guild_id = str(ctx.guild.id)
-
-    Database.increment_stat(user_id, ctx.author.name, guild_id, 'subject_posts')
-
-    await ctx.send(f"{ctx.author.mention} subject post recorded! (+{SCORING['subject_post_per_count']} points)")
+    await ctx.send(embed=embed)
 
 
 @bot.command(name='add_session')
@@ -219,9 +291,10 @@ async def add_session(ctx):
     user_id = str(ctx.author.id)
     guild_id = str(ctx.guild.id)
 
-    Database.increment_stat(user_id, ctx.author.name, guild_id, 'voice_sessions_hosted')
+    stat_buffer.add(user_id, ctx.author.name, guild_id, 'voice_sessions_hosted')
 
-    await ctx.send(f"{ctx.author.mention} voice session recorded! (+{SCORING['voice_session_hosted']} points)")
+    points = guild_configs.get(guild_id).scoring['voice_session_hosted']
+    await ctx.send(f"{ctx.author.mention} voice session recorded! (+{points} points)")
 
 
 @bot.command(name='ranks')
@@ -255,15 +328,13 @@ async def help_bot(ctx):
         value="`!stats [@user]` - View user statistics\n"
               "`!progress [@user]` - View promotion progress\n"
               "`!contribute` - Request to become a Learner\n"
-              "`!add_video` - Log a shared video\n"
-              "`!add_subject` - Log a subject post\n"
               "`!add_session` - Log a hosted voice session",
         inline=False
     )
 
     embed.add_field(
         name="Leaderboards",
-        value="`!leaderboard [all|voice|messages|invites]` - View rankings\n"
+        value="`!leaderboard [all|week|voice|messages|invites|global]` - View rankings, page with the buttons\n"
               "`!ranks` - View all rank information",
         inline=False
     )
@@ -293,7 +364,17 @@ async def help_bot(ctx):
               "`!assign_ruler @user` - Assign Ruler role\n"
               "`!remove_advisor @user` - Remove Advisor\n"
               "`!remove_ruler @user` - Remove Ruler\n"
-              "`!force_decay` - Run decay check manually",
+              "`!force_decay` - Run decay check manually\n"
+              "`!config_show` - Show this server's settings\n"
+              "`!config_set <section> <key> <value>` - Override a setting\n"
+              "`!config_reset [section]` - Restore default settings\n"
+              "`!reload_config` - Reload scoring and promotion rules from config.py\n"
+              "`!refresh_scores` - Recompute stored leaderboard scores\n"
+              "`!distribution [stat]` - Show percentiles of a stat in this server\n"
+              "`!backfill` - Credit message history from before the bot joined (resumable)\n"
+              "`!backfill_status` / `!backfill_cancel` - Show or pause the history backfill\n"
+              "`!profile <command|on_event> [count] [memory]` - Profile the next invocations\n"
+              "`!profile_status` / `!profile_stop <name>` - Show or cancel profiling",
         inline=False
     )
 
@@ -302,10 +383,27 @@ async def help_bot(ctx):
 
 setup_onboarding_commands(bot, onboarding)
 setup_progression_commands(bot, progression)
+setup_leaderboard_commands(bot, leaderboard)
+setup_sketch_commands(bot)
+setup_backfill_commands(bot, backfill)
 setup_elite_commands(bot, elite_system)
 setup_decay_commands(bot, decay)
 setup_leadership_commands(bot, leadership)
+setup_guild_config_commands(bot)
+setup_config_reload_commands(bot, config_reloader)
+
+metrics.instrument_bot(bot)
+setup_profiling_commands(bot, profiler)
+metrics.gauge('queue_depth', lambda: len(role_updates), queue='role_updates')
+metrics.gauge('queue_depth', lambda: len(dispatcher), queue='notifications')
+metrics.gauge('queue_depth', lambda: sum(len(members) for members in onboarding.pending_joins.values()), queue='pending_joins')
+metrics.gauge('pending_stat_users', lambda: len(stat_buffer.pending))
+metrics.gauge('spooled_stat_entries', lambda: stat_buffer.spool.entries)
+metrics.gauge('database_circuit_open', lambda: int(database.breaker.state != database.breaker.CLOSED))
+metrics.gauge('voice_sessions', lambda: len(voice_sessions))
+metrics.gauge('subject_post_index_size', lambda: len(reactions.subject_posts))
+metrics.gauge('message_limiter_users', lambda: len(message_limiter))
 
 
 if __name__ == '__main__':
-    bot.run(DISCORD_TOKEN)
+    bot.run(DISCORD_TOKEN, log_handler=None)
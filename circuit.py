@@ -0,0 +1,97 @@
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+
+    def ready_to_probe(self) -> bool:
+        return self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout
+
+    def available(self) -> bool:
+        return self.state != self.OPEN or self.ready_to_probe()
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN:
+            if not self.ready_to_probe():
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.probing = False
+            logger.info("%s circuit half-open, probing", self.name, extra={'op': 'circuit'})
+
+        if self.probing:
+            self.rejected += 1
+            return False
+
+        self.probing = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.probing = False
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            logger.warning("%s circuit closed after %d rejected calls", self.name, self.rejected, extra={'op': 'circuit'})
+            self.rejected = 0
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+            logger.warning("%s circuit opened after %d failures", self.name, self.failures, extra={'op': 'circuit'})
+
+    def guard(self):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+
+class StaleCache:
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (value, datetime.now(timezone.utc))
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def update(self, key: Hashable, changes: dict):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries[key] = ({**entry[0], **changes}, datetime.now(timezone.utc))
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, datetime]]:
+        return self._entries.get(key)
@@ -108,8 +108,14 @@ SCORING = {
 DECAY_SETTINGS = {
     'inactive_days': 7,
     'decay_percentage': 10,
+    'decay_period_hours': 24,
+    'decaying_stats': ['voice_time_seconds', 'message_count', 'reaction_count', 'videos_shared'],
+    'decay_pass_enabled': True,
     'check_interval_hours': 24,
-    'immune_ranks': [5, 6, 7]
+    'immune_ranks': [5, 6, 7],
+    'demotion_floor_rank': 2,
+    'demotion_max_voice_hours': 0.5,
+    'demotion_max_messages': 10
 }
 
 ELITE_TYPES = {
@@ -126,3 +132,170 @@ ELITE_TYPES = {
         'description': 'Exceptional Elite member'
     }
 }
+
+REACTION_SETTINGS = {
+    'subject_post_index_size': 50000
+}
+
+MESSAGE_RATE_SETTINGS = {
+    'messages_per_minute': 20,
+    'burst': 10,
+    'max_users': 100000,
+    'eviction_probes': 8
+}
+
+CONTENT_SETTINGS = {
+    'subject_channels': ['subjects', 'topics'],
+    'subject_min_length': 200,
+    'max_videos_per_message': 3,
+    'video_domains': [
+        'youtube.com/watch',
+        'youtube.com/shorts/',
+        'youtube.com/live/',
+        'youtu.be/',
+        'vimeo.com/',
+        'clips.twitch.tv/',
+        'twitch.tv/videos/',
+        'tiktok.com/',
+        'streamable.com/'
+    ],
+    'video_extensions': ['mp4', 'webm', 'mov', 'mkv', 'avi']
+}
+
+STAT_BUFFER_SETTINGS = {
+    'flush_interval_seconds': 10,
+    'spool_path': 'spool/stats.jsonl',
+    'baseline_page_size': 1000,
+    'known_usernames_size': 50000
+}
+
+JOURNAL_SETTINGS = {
+    'directory': 'journal',
+    'segment_max_bytes': 64 * 1024 * 1024,
+    'fsync': False
+}
+
+ROLLUP_SETTINGS = {
+    'days': 28,
+    'leaderboard_days': 7,
+    'stats': [
+        'voice_time_seconds',
+        'message_count',
+        'invite_count',
+        'reaction_count',
+        'subject_posts',
+        'subject_reactions',
+        'voice_sessions_hosted',
+        'videos_shared'
+    ]
+}
+
+DISPATCH_SETTINGS = {
+    'queue_size': 50000,
+    'role_updates_per_second': 5,
+    'notification_queue_size': 10000,
+    'max_retries': 3,
+    'retry_backoff_seconds': 2,
+    'routes': {
+        'dm': {'rate_per_second': 1, 'burst': 5},
+        'channel': {'rate_per_second': 1, 'burst': 5}
+    }
+}
+
+ONBOARDING_SETTINGS = {
+    'welcome_channels': ['welcome', 'general', 'lobby'],
+    'burst_window_seconds': 3,
+    'individual_welcome_limit': 3,
+    'welcome_names_shown': 5
+}
+
+CONFIG_RELOAD_SETTINGS = {
+    'watch_file': True,
+    'poll_seconds': 5
+}
+
+METRICS_SETTINGS = {
+    'enabled': True,
+    'host': '127.0.0.1',
+    'port': 9108,
+    'slow_call_ms': 250,
+    'slow_call_samples': 200
+}
+
+LOGGING_SETTINGS = {
+    'level': 'INFO',
+    'discord_level': 'WARNING',
+    'json': False,
+    'file': None,
+    'file_max_bytes': 16 * 1024 * 1024,
+    'file_backups': 3,
+    'dedup_window_seconds': 60,
+    'dedup_max_keys': 1000
+}
+
+DATABASE_SETTINGS = {
+    'request_timeout_seconds': 5,
+    'failure_threshold': 3,
+    'reset_timeout_seconds': 30,
+    'user_cache_size': 20000,
+    'guild_cache_size': 50,
+    'activity_granularity_seconds': 900
+}
+
+PROFILING_SETTINGS = {
+    'directory': 'profiles',
+    'max_invocations': 20,
+    'top_frames': 30,
+    'summary_frames': 5,
+    'tracemalloc_frames': 10,
+    'reports_kept': 20
+}
+
+LEADERBOARD_SETTINGS = {
+    'page_size': 10,
+    'page_cache_seconds': 30,
+    'cached_pages': 500,
+    'view_timeout_seconds': 300,
+    'global_top_k': 100,
+    'score_refresh_page_size': 1000
+}
+
+SKETCH_SETTINGS = {
+    'relative_accuracy': 0.02,
+    'max_buckets': 512,
+    'persist_interval_seconds': 300,
+    'rebuild_after_days': 7,
+    'rebuild_page_size': 1000,
+    'stats': [
+        'score',
+        'voice_time_seconds',
+        'message_count',
+        'invite_count',
+        'reaction_count',
+        'subject_posts',
+        'voice_sessions_hosted',
+        'videos_shared'
+    ]
+}
+
+BACKUP_SETTINGS = {
+    'page_size': 1000,
+    'chunk_size': 500,
+    'row_group_rows': 50000
+}
+
+BACKFILL_SETTINGS = {
+    'concurrent_channels': 4,
+    'flush_users': 500,
+    'flush_seconds': 30,
+    'progress_seconds': 30,
+    'retry_seconds': 10,
+    'fetch_reactors': True,
+    'archived_threads': True,
+    'members_only': True
+}
+
+MIGRATION_SETTINGS = {
+    'directory': 'migrations',
+    'table': 'schema_migrations'
+}
@@ -0,0 +1,134 @@
+import logging
+import os
+import runpy
+import config
+from discord.ext import commands, tasks
+from config import RANKS, CONFIG_RELOAD_SETTINGS
+from guild_config import guild_configs
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RELOADABLE_TABLES = ('SCORING', 'PROMOTION_REQUIREMENTS')
+
+
+def load_config_tables(path: str) -> Dict[str, Any]:
+    namespace = runpy.run_path(path)
+    return {name: namespace.get(name) for name in RELOADABLE_TABLES}
+
+
+def is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_config_tables(tables: Dict[str, Any]) -> List[str]:
+    errors = []
+
+    scoring = tables.get('SCORING')
+    if not isinstance(scoring, dict):
+        errors.append("SCORING must be a dict")
+    else:
+        for key in config.SCORING:
+            if key not in scoring:
+                errors.append(f"SCORING is missing `{key}`")
+        for key, value in scoring.items():
+            if not is_number(value) or value < 0:
+                errors.append(f"SCORING `{key}` must be a non-negative number")
+
+    promotion = tables.get('PROMOTION_REQUIREMENTS')
+    if not isinstance(promotion, dict):
+        errors.append("PROMOTION_REQUIREMENTS must be a dict")
+        return errors
+
+    for rank, info in promotion.items():
+        if rank not in RANKS:
+            errors.append(f"PROMOTION_REQUIREMENTS has unknown rank {rank!r}")
+            continue
+        if not isinstance(info, dict) or not isinstance(info.get('requirements'), dict):
+            errors.append(f"PROMOTION_REQUIREMENTS[{rank}] needs a `requirements` dict")
+            continue
+        if info.get('to_rank') != rank or info.get('from_rank') != rank - 1:
+            errors.append(f"PROMOTION_REQUIREMENTS[{rank}] must go from rank {rank - 1} to {rank}")
+        for key, value in info['requirements'].items():
+            if key == 'description':
+                continue
+            if isinstance(value, bool):
+                continue
+            if not is_number(value) or value < 0:
+                errors.append(f"PROMOTION_REQUIREMENTS[{rank}] `{key}` must be a non-negative number")
+
+    return errors
+
+
+def apply_config_tables(tables: Dict[str, Any]) -> List[str]:
+    changed = [name for name in RELOADABLE_TABLES if tables[name] != getattr(config, name)]
+    for name in changed:
+        setattr(config, name, tables[name])
+
+    if changed:
+        guild_configs.invalidate()
+    if 'SCORING' in changed:
+        guild_configs.scoring_changed()
+
+    return changed
+
+
+class ConfigReloader:
+
+    def __init__(self, bot: commands.Bot, path: Optional[str] = None):
+        self.bot = bot
+        self.path = path or config.__file__
+        self.mtime = self.read_mtime()
+
+    def start_tasks(self):
+        if CONFIG_RELOAD_SETTINGS['watch_file']:
+            self.watch_task.start()
+
+    def cog_unload(self):
+        self.watch_task.cancel()
+
+    def read_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def reload(self) -> Tuple[bool, str]:
+        self.mtime = self.read_mtime()
+
+        try:
+            tables = load_config_tables(self.path)
+        except Exception as e:
+            return False, f"Could not load {os.path.basename(self.path)}: {e}"
+
+        errors = validate_config_tables(tables)
+        if errors:
+            return False, "Config not reloaded:\n" + '\n'.join(f"- {error}" for error in errors)
+
+        changed = apply_config_tables(tables)
+        if not changed:
+            return True, "Config reloaded, no scoring or promotion changes."
+        return True, f"Config reloaded: {', '.join(changed)} updated."
+
+    @tasks.loop(seconds=CONFIG_RELOAD_SETTINGS['poll_seconds'])
+    async def watch_task(self):
+        mtime = self.read_mtime()
+        if mtime is None or mtime == self.mtime:
+            return
+
+        success, message = self.reload()
+        if not success:
+            logger.warning("%s", message, extra={'op': 'reload_config'})
+
+    @watch_task.before_loop
+    async def before_watch_task(self):
+        await self.bot.wait_until_ready()
+
+
+def setup_config_reload_commands(bot: commands.Bot, reloader: ConfigReloader):
+
+    @bot.command(name='reload_config')
+    @commands.has_permissions(administrator=True)
+    async def reload_config(ctx):
+        success, message = reloader.reload()
+        await ctx.send(message if success else f"❌ {message}")
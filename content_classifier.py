@@ -0,0 +1,71 @@
+import re
+from config import CONTENT_SETTINGS
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+
+class ContentClassifier:
+
+    def __init__(self, settings: Dict = CONTENT_SETTINGS):
+        self.subject_channels = frozenset(name.lower() for name in settings['subject_channels'])
+        self.subject_min_length = settings['subject_min_length']
+        self.max_videos = settings['max_videos_per_message']
+
+        self.video_domains = tuple(domain.lower() for domain in settings['video_domains'])
+        self.video_extensions = tuple(f".{ext.lower()}" for ext in settings['video_extensions'])
+        self.url_pattern = re.compile(r"https?://(?:www\.|m\.)?([^\s<>?#]+)[^\s<>]*", re.IGNORECASE)
+
+    def is_video_url(self, location: str) -> bool:
+        location = location.lower()
+        return location.startswith(self.video_domains) or location.endswith(self.video_extensions)
+
+    def count_video_links(self, content: str) -> int:
+        if 'http' not in content:
+            return 0
+
+        return len({match.group(0) for match in self.url_pattern.finditer(content) if self.is_video_url(match.group(1))})
+
+    def is_video_filename(self, filename: str) -> bool:
+        return filename.lower().endswith(self.video_extensions)
+
+    def count_video_attachments(self, attachments: Iterable[Tuple[str, Optional[str]]]) -> int:
+        count = 0
+        for filename, content_type in attachments:
+            if content_type and content_type.startswith('video/'):
+                count += 1
+            elif self.is_video_filename(filename):
+                count += 1
+        return count
+
+    def is_subject_channel(self, channel_name: Optional[str], parent_name: Optional[str] = None, subject_channels: Optional[FrozenSet[str]] = None) -> bool:
+        subject_channels = self.subject_channels if subject_channels is None else subject_channels
+        if channel_name and channel_name.lower() in subject_channels:
+            return True
+        return bool(parent_name) and parent_name.lower() in subject_channels
+
+    def classify(self, content: str, attachments: Iterable[Tuple[str, Optional[str]]], in_subject_channel: bool, is_reply: bool, is_thread_starter: bool = False) -> Dict[str, int]:
+        deltas = {'message_count': 1}
+
+        videos = min(self.count_video_links(content) + self.count_video_attachments(attachments), self.max_videos)
+        if videos:
+            deltas['videos_shared'] = videos
+
+        if in_subject_channel and not is_reply:
+            if is_thread_starter or len(content) >= self.subject_min_length:
+                deltas['subject_posts'] = 1
+
+        return deltas
+
+    def classify_message(self, message, subject_channels: Optional[FrozenSet[str]] = None) -> Dict[str, int]:
+        channel = message.channel
+        parent = getattr(channel, 'parent', None)
+        in_subject_channel = self.is_subject_channel(getattr(channel, 'name', None), getattr(parent, 'name', None), subject_channels)
+
+        attachments = [(a.filename, a.content_type) for a in message.attachments]
+
+        return self.classify(
+            message.content,
+            attachments,
+            in_subject_channel,
+            message.reference is not None,
+            parent is not None and channel.id == message.id
+        )
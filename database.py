@@ -1,104 +1,363 @@
+import httpx
+import logging
 import os
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+from circuit import CircuitBreaker, CircuitOpenError, StaleCache
+from config import DATABASE_SETTINGS
+from guild_config import guild_configs
+from decay_model import apply_decay_projection, parse_timestamp, project_decay, utc_now
+from journal import journal
+from metrics import metrics
+from sketches import sketches
+from topk import top_scores
 
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = create_client(
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    options=ClientOptions(postgrest_client_timeout=DATABASE_SETTINGS['request_timeout_seconds'])
+)
+
+logger = logging.getLogger(__name__)
+
+OUTAGE_CODES = {'502', '503', '504', 'PGRST000', 'PGRST001', 'PGRST002', 'PGRST003'}
+
+breaker = CircuitBreaker('database', DATABASE_SETTINGS['failure_threshold'], DATABASE_SETTINGS['reset_timeout_seconds'])
+user_cache = StaleCache(DATABASE_SETTINGS['user_cache_size'])
+guild_cache = StaleCache(DATABASE_SETTINGS['guild_cache_size'])
+
+
+def is_outage(error: Exception) -> bool:
+    if isinstance(error, (httpx.TransportError, CircuitOpenError)):
+        return True
+    return str(getattr(error, 'code', '')) in OUTAGE_CODES
+
+
+def execute(query):
+    breaker.guard()
+    try:
+        result = query.execute()
+    except Exception as e:
+        if is_outage(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    breaker.record_success()
+    return result
+
+
+def mark_stale(row: Dict[str, Any], fetched_at: datetime) -> Dict[str, Any]:
+    return {**row, 'stale_at': fetched_at.isoformat()}
+
+
+def stale_notice(stale_at: str) -> str:
+    cached_at = datetime.fromisoformat(stale_at).strftime('%Y-%m-%d %H:%M UTC')
+    return f"⚠️ Database unavailable - showing data cached at {cached_at}"
 
 
 class Database:
 
     @staticmethod
-    def get_user_stats(discord_user_id: str, guild_id: str) -> Optional[Dict[str, Any]]:
+    def available() -> bool:
+        return breaker.available()
+
+    @staticmethod
+    def get_user_stats(discord_user_id: str, guild_id: str, apply_decay: bool = True, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
         try:
-            result = supabase.table('user_stats').select('*').eq('discord_user_id', discord_user_id).eq('guild_id', guild_id).maybeSingle().execute()
+            result = execute(supabase.table('user_stats').select('*').eq('discord_user_id', discord_user_id).eq('guild_id', guild_id).maybe_single())
+            if result is None:
+                return None
+            if result.data:
+                user_cache.put((guild_id, discord_user_id), result.data)
+            if result.data and apply_decay:
+                return apply_decay_projection(result.data)
             return result.data
         except Exception as e:
-            print(f"Error fetching user stats: {e}")
+            cached = user_cache.get((guild_id, discord_user_id)) if allow_stale and is_outage(e) else None
+            if cached:
+                row = mark_stale(*cached)
+                return apply_decay_projection(row) if apply_decay else row
+            logger.error("Error fetching user stats: %s", e, extra={'op': 'get_user_stats', 'guild': guild_id, 'user': discord_user_id})
             return None
 
     @staticmethod
-    def create_user_stats(discord_user_id: str, username: str, guild_id: str) -> Optional[Dict[str, Any]]:
+    def new_user_row(discord_user_id: str, username: str, guild_id: str) -> Dict[str, Any]:
+        return {
+            'discord_user_id': discord_user_id,
+            'discord_username': username,
+            'guild_id': guild_id,
+            'rank': 1,
+            'voice_time_seconds': 0,
+            'message_count': 0,
+            'invite_count': 0,
+            'reaction_count': 0,
+            'subject_posts': 0,
+            'subject_reactions': 0,
+            'voice_sessions_hosted': 0,
+            'videos_shared': 0,
+            'wants_to_contribute': False,
+            'advisor_validations': 0,
+            'last_activity': datetime.utcnow().isoformat(),
+            'is_immune_to_decay': False
+        }
+
+    @staticmethod
+    def create_user_stats_many(guild_id: str, users: List[Tuple[str, str]], chunk_size: int = 500) -> bool:
         try:
-            result = supabase.table('user_stats').insert({
-                'discord_user_id': discord_user_id,
-                'discord_username': username,
-                'guild_id': guild_id,
-                'rank': 1,
-                'voice_time_seconds': 0,
-                'message_count': 0,
-                'invite_count': 0,
-                'reaction_count': 0,
-                'subject_posts': 0,
-                'subject_reactions': 0,
-                'voice_sessions_hosted': 0,
-                'videos_shared': 0,
-                'wants_to_contribute': False,
-                'advisor_validations': 0,
-                'last_activity': datetime.utcnow().isoformat(),
-                'is_immune_to_decay': False
-            }).execute()
-            return result.data[0] if result.data else None
+            for i in range(0, len(users), chunk_size):
+                rows = [Database.new_user_row(user_id, username, guild_id) for user_id, username in users[i:i + chunk_size]]
+                execute(supabase.table('user_stats').upsert(rows, on_conflict='guild_id,discord_user_id', ignore_duplicates=True))
+            return True
         except Exception as e:
-            print(f"Error creating user stats: {e}")
-            return None
+            logger.error("Error creating user stats in bulk: %s", e, extra={'op': 'create_user_stats_many', 'guild': guild_id})
+            return False
 
     @staticmethod
     def update_user_stats(discord_user_id: str, guild_id: str, updates: Dict[str, Any]) -> bool:
         try:
-            updates['last_activity'] = datetime.utcnow().isoformat()
-            supabase.table('user_stats').update(updates).eq('discord_user_id', discord_user_id).eq('guild_id', guild_id).execute()
+            execute(supabase.table('user_stats').update(updates).eq('discord_user_id', discord_user_id).eq('guild_id', guild_id))
+            user_cache.update((guild_id, discord_user_id), updates)
             return True
         except Exception as e:
-            print(f"Error updating user stats: {e}")
+            logger.error("Error updating user stats: %s", e, extra={'op': 'update_user_stats', 'guild': guild_id, 'user': discord_user_id})
             return False
 
     @staticmethod
-    def increment_stat(discord_user_id: str, username: str, guild_id: str, stat_name: str, amount: int = 1) -> bool:
+    def get_user_stats_many(guild_id: str, discord_user_ids: List[str], apply_decay: bool = True, chunk_size: int = 200) -> Optional[Dict[str, Dict[str, Any]]]:
+        users = {}
         try:
-            user_stats = Database.get_user_stats(discord_user_id, guild_id)
+            for i in range(0, len(discord_user_ids), chunk_size):
+                result = execute(supabase.table('user_stats').select('*').eq('guild_id', guild_id).in_('discord_user_id', discord_user_ids[i:i + chunk_size]))
+                for row in result.data or []:
+                    user_cache.put((guild_id, row['discord_user_id']), row)
+                    users[row['discord_user_id']] = apply_decay_projection(row) if apply_decay else row
+            return users
+        except Exception as e:
+            logger.error("Error fetching user stats in bulk: %s", e, extra={'op': 'get_user_stats_many', 'guild': guild_id})
+            return None
 
-            if not user_stats:
-                user_stats = Database.create_user_stats(discord_user_id, username, guild_id)
-                if not user_stats:
-                    return False
+    @staticmethod
+    def upsert_user_stats_many(guild_id: str, rows: List[Dict[str, Any]], chunk_size: int = 500) -> List[str]:
+        groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(frozenset(row), []).append(row)
+
+        written = []
+        for group in groups.values():
+            for i in range(0, len(group), chunk_size):
+                chunk = group[i:i + chunk_size]
+                try:
+                    execute(supabase.table('user_stats').upsert(chunk, on_conflict='guild_id,discord_user_id'))
+                except Exception as e:
+                    logger.error("Error upserting user stats: %s", e, extra={'op': 'upsert_user_stats_many', 'guild': guild_id})
+                    continue
+                for row in chunk:
+                    user_cache.update((guild_id, row['discord_user_id']), row)
+                    written.append(row['discord_user_id'])
+        return written
+
+    @staticmethod
+    def update_user_stats_many(guild_id: str, discord_user_ids: List[str], updates: Dict[str, Any], chunk_size: int = 200) -> List[str]:
+        updated = []
+        for i in range(0, len(discord_user_ids), chunk_size):
+            chunk = discord_user_ids[i:i + chunk_size]
+            try:
+                execute(supabase.table('user_stats').update(updates).eq('guild_id', guild_id).in_('discord_user_id', chunk))
+            except Exception as e:
+                logger.error("Error updating user stats in bulk: %s", e, extra={'op': 'update_user_stats_many', 'guild': guild_id})
+                continue
+            for user_id in chunk:
+                user_cache.update((guild_id, user_id), updates)
+            updated.extend(chunk)
+        return updated
 
-            current_value = user_stats.get(stat_name, 0)
-            updates = {
-                stat_name: current_value + amount,
-                'discord_username': username
-            }
+    @staticmethod
+    def activity_row(guild_id: str, discord_user_id: str, user_stats: Dict[str, Any], username: Optional[str], deltas: Dict[str, int], now: datetime) -> Dict[str, Any]:
+        decayed = project_decay(user_stats, now)
+        if decayed:
+            user_stats = {**user_stats, **decayed}
+
+        row = {'discord_user_id': discord_user_id, **decayed}
+        if username and username != user_stats.get('discord_username'):
+            row['discord_username'] = username
+        for stat_name, amount in deltas.items():
+            row[stat_name] = max(user_stats.get(stat_name, 0) + amount, 0)
+        if decayed:
+            journal.record_decay(guild_id, discord_user_id, {stat_name: row[stat_name] for stat_name in decayed})
+
+        last_activity = parse_timestamp(user_stats.get('last_activity'))
+        if last_activity is None or (now - last_activity).total_seconds() >= DATABASE_SETTINGS['activity_granularity_seconds']:
+            row['last_activity'] = now.isoformat()
+        row['score'] = guild_configs.get(guild_id).score({**user_stats, **row})
+        return row
+
+    @staticmethod
+    def apply_activity(guild_id: str, rows: List[Dict[str, Any]], chunk_size: int = 500) -> List[str]:
+        written = []
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            try:
+                result = execute(supabase.rpc('apply_activity', {'p_guild_id': guild_id, 'p_rows': chunk}))
+            except Exception as e:
+                logger.error("Error writing activity: %s", e, extra={'op': 'apply_activity', 'guild': guild_id})
+                continue
+            applied = {row['discord_user_id'] for row in result.data or []}
+            for row in chunk:
+                if row['discord_user_id'] in applied:
+                    user_cache.update((guild_id, row['discord_user_id']), row)
+                    written.append(row['discord_user_id'])
+        return written
+
+    @staticmethod
+    def increment_stats_many(guild_id: str, entries: Dict[str, Tuple[Optional[str], Dict[str, int]]], chunk_size: int = 200) -> List[str]:
+        written = []
+        user_ids = list(entries)
+        for i in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[i:i + chunk_size]
+            current = Database.get_user_stats_many(guild_id, chunk, apply_decay=False, chunk_size=chunk_size)
+            if current is None:
+                continue
+
+            now = utc_now()
+            rows, new_rows = [], []
+            for user_id in chunk:
+                username, deltas = entries[user_id]
+                if user_id in current:
+                    rows.append(Database.activity_row(guild_id, user_id, current[user_id], username, deltas, now))
+                else:
+                    row = Database.new_user_row(user_id, username or user_id, guild_id)
+                    row.update({stat_name: max(amount, 0) for stat_name, amount in deltas.items()})
+                    row['last_activity'] = now.isoformat()
+                    row['score'] = guild_configs.get(guild_id).score(row)
+                    new_rows.append(row)
 
-            return Database.update_user_stats(discord_user_id, guild_id, updates)
+            applied = Database.apply_activity(guild_id, rows)
+            by_id = {row['discord_user_id']: row for row in rows}
+            for user_id in applied:
+                sketches.observe(guild_id, current[user_id], by_id[user_id])
+                top_scores.observe(guild_id, current[user_id], by_id[user_id])
+            written.extend(applied)
+
+            if new_rows:
+                try:
+                    execute(supabase.table('user_stats').insert(new_rows))
+                    for row in new_rows:
+                        sketches.observe(guild_id, None, row)
+                        top_scores.observe(guild_id, None, row)
+                    written.extend(row['discord_user_id'] for row in new_rows)
+                except Exception as e:
+                    logger.error("Error creating user stats: %s", e, extra={'op': 'increment_stats_many', 'guild': guild_id})
+        return written
+
+    @staticmethod
+    def transition_rank(discord_user_id: str, guild_id: str, action: str, to_rank: Optional[int] = None, expected_rank: Optional[int] = None, elite_type: Optional[str] = None, max_slots: Optional[int] = None) -> Dict[str, Any]:
+        try:
+            result = execute(supabase.rpc('transition_rank', {
+                'p_guild_id': guild_id,
+                'p_user_id': discord_user_id,
+                'p_action': action,
+                'p_to_rank': to_rank,
+                'p_expected_rank': expected_rank,
+                'p_elite_type': elite_type,
+                'p_max_slots': max_slots
+            }))
+            outcome = result.data or {'ok': False, 'error': 'no_result'}
+            if outcome.get('ok'):
+                changes = {'rank': outcome['rank'], 'is_immune_to_decay': outcome['rank'] >= 5}
+                if elite_type:
+                    changes['elite_type'] = elite_type
+                user_cache.update((guild_id, discord_user_id), changes)
+            return outcome
         except Exception as e:
-            print(f"Error incrementing stat {stat_name}: {e}")
-            return False
+            logger.error("Error transitioning rank (%s): %s", action, e, extra={'op': 'transition_rank', 'guild': guild_id, 'user': discord_user_id})
+            return {'ok': False, 'error': 'database_error'}
 
     @staticmethod
-    def get_all_users_in_guild(guild_id: str) -> List[Dict[str, Any]]:
+    def get_all_users_in_guild(guild_id: str, allow_stale: bool = False, apply_decay: bool = True, page_size: int = 1000) -> List[Dict[str, Any]]:
         try:
-            result = supabase.table('user_stats').select('*').eq('guild_id', guild_id).execute()
-            return result.data if result.data else []
+            rows = []
+            while True:
+                result = execute(supabase.table('user_stats').select('*').eq('guild_id', guild_id).order('discord_user_id').range(len(rows), len(rows) + page_size - 1))
+                page = result.data or []
+                rows.extend(page)
+                if len(page) < page_size:
+                    break
+            guild_cache.put(guild_id, rows)
+            if not apply_decay:
+                return rows
+            return [apply_decay_projection(row) for row in rows]
         except Exception as e:
-            print(f"Error fetching all users: {e}")
+            cached = guild_cache.get(guild_id) if allow_stale and is_outage(e) else None
+            if cached:
+                rows, fetched_at = cached
+                return [apply_decay_projection(mark_stale(row, fetched_at)) for row in rows]
+            logger.error("Error fetching all users: %s", e, extra={'op': 'get_all_users_in_guild', 'guild': guild_id})
             return []
 
+    @staticmethod
+    def get_leaderboard_page(guild_id: str, column: str, limit: int, after: Optional[Tuple[Any, str]] = None, before: Optional[Tuple[Any, str]] = None, inclusive: bool = False) -> Optional[List[Dict[str, Any]]]:
+        try:
+            query = supabase.table('user_stats').select('*').eq('guild_id', guild_id)
+            if before is not None:
+                value, user_id = before
+                query = query.gte(column, value).or_(f"{column}.gt.{value},and({column}.eq.{value},discord_user_id.lt.{user_id})")
+                result = execute(query.order(column).order('discord_user_id', desc=True).limit(limit))
+                return list(reversed(result.data or []))
+
+            if after is not None:
+                value, user_id = after
+                query = query.lte(column, value).or_(f"{column}.lt.{value},and({column}.eq.{value},discord_user_id.{'gte' if inclusive else 'gt'}.{user_id})")
+            result = execute(query.order(column, desc=True).order('discord_user_id').limit(limit))
+            return result.data or []
+        except Exception as e:
+            logger.error("Error fetching leaderboard page: %s", e, extra={'op': 'get_leaderboard_page', 'guild': guild_id})
+            return None
+
+    @staticmethod
+    def get_user_stats_page(after: Optional[Tuple[str, str]] = None, guild_id: Optional[str] = None, limit: int = 1000) -> Optional[List[Dict[str, Any]]]:
+        try:
+            query = supabase.table('user_stats').select('*')
+            if guild_id is not None:
+                query = query.eq('guild_id', guild_id)
+                if after is not None:
+                    query = query.gt('discord_user_id', after[1])
+            elif after is not None:
+                last_guild, last_user = after
+                query = query.gte('guild_id', last_guild).or_(f"guild_id.gt.{last_guild},and(guild_id.eq.{last_guild},discord_user_id.gt.{last_user})")
+            result = execute(query.order('guild_id').order('discord_user_id').limit(limit))
+            return result.data or []
+        except Exception as e:
+            logger.error("Error fetching user stats page: %s", e, extra={'op': 'get_user_stats_page', 'guild': guild_id})
+            return None
+
+    @staticmethod
+    def count_ranked_ahead(guild_id: str, column: str, value: Any, discord_user_id: str) -> Optional[int]:
+        try:
+            result = execute(supabase.table('user_stats').select('discord_user_id', count='exact').eq('guild_id', guild_id).gte(column, value).or_(f"{column}.gt.{value},and({column}.eq.{value},discord_user_id.lt.{discord_user_id})").limit(1))
+            return result.count
+        except Exception as e:
+            logger.error("Error counting leaderboard position: %s", e, extra={'op': 'count_ranked_ahead', 'guild': guild_id, 'user': discord_user_id})
+            return None
+
     @staticmethod
     def get_users_by_rank(guild_id: str, rank: int) -> List[Dict[str, Any]]:
         try:
-            result = supabase.table('user_stats').select('*').eq('guild_id', guild_id).eq('rank', rank).execute()
-            return result.data if result.data else []
+            result = execute(supabase.table('user_stats').select('*').eq('guild_id', guild_id).eq('rank', rank))
+            return [apply_decay_projection(row) for row in result.data] if result.data else []
         except Exception as e:
-            print(f"Error fetching users by rank: {e}")
+            logger.error("Error fetching users by rank: %s", e, extra={'op': 'get_users_by_rank', 'guild': guild_id})
             return []
 
     @staticmethod
     def create_promotion_request(discord_user_id: str, guild_id: str, current_rank: int, target_rank: int, validations_needed: int) -> Optional[Dict[str, Any]]:
         try:
-            result = supabase.table('promotion_requests').insert({
+            result = execute(supabase.table('promotion_requests').insert({
                 'discord_user_id': discord_user_id,
                 'guild_id': guild_id,
                 'current_rank': current_rank,
@@ -106,28 +365,28 @@ class Database:
                 'validations_received': 0,
                 'validations_needed': validations_needed,
                 'status': 'pending'
-            }).execute()
+            }))
             return result.data[0] if result.data else None
         except Exception as e:
-            print(f"Error creating promotion request: {e}")
+            logger.error("Error creating promotion request: %s", e, extra={'op': 'create_promotion_request', 'guild': guild_id, 'user': discord_user_id})
             return None
 
     @staticmethod
     def get_pending_promotion_request(discord_user_id: str, guild_id: str) -> Optional[Dict[str, Any]]:
         try:
-            result = supabase.table('promotion_requests').select('*').eq('discord_user_id', discord_user_id).eq('guild_id', guild_id).eq('status', 'pending').maybeSingle().execute()
-            return result.data
+            result = execute(supabase.table('promotion_requests').select('*').eq('discord_user_id', discord_user_id).eq('guild_id', guild_id).eq('status', 'pending').maybe_single())
+            return result.data if result else None
         except Exception as e:
-            print(f"Error fetching promotion request: {e}")
+            logger.error("Error fetching promotion request: %s", e, extra={'op': 'get_pending_promotion_request', 'guild': guild_id, 'user': discord_user_id})
             return None
 
     @staticmethod
     def update_promotion_request(request_id: str, updates: Dict[str, Any]) -> bool:
         try:
-            supabase.table('promotion_requests').update(updates).eq('id', request_id).execute()
+            execute(supabase.table('promotion_requests').update(updates).eq('id', request_id))
             return True
         except Exception as e:
-            print(f"Error updating promotion request: {e}")
+            logger.error("Error updating promotion request: %s", e, extra={'op': 'update_promotion_request'})
             return False
 
     @staticmethod
@@ -142,7 +401,7 @@ class Database:
                 'advisor_validations': current_validations + 1
             })
         except Exception as e:
-            print(f"Error adding validation: {e}")
+            logger.error("Error adding validation: %s", e, extra={'op': 'add_validation', 'guild': guild_id, 'user': discord_user_id})
             return False
 
     @staticmethod
@@ -151,51 +410,162 @@ class Database:
             query = supabase.table('leadership_roles').select('*').eq('guild_id', guild_id)
             if role_type:
                 query = query.eq('role_type', role_type)
-            result = query.execute()
+            result = execute(query)
             return result.data if result.data else []
         except Exception as e:
-            print(f"Error fetching leadership roles: {e}")
+            logger.error("Error fetching leadership roles: %s", e, extra={'op': 'get_leadership_roles', 'guild': guild_id})
             return []
 
     @staticmethod
-    def assign_leadership_role(discord_user_id: str, guild_id: str, role_type: str) -> bool:
+    def is_leader(discord_user_id: str, guild_id: str) -> bool:
         try:
-            supabase.table('leadership_roles').insert({
-                'discord_user_id': discord_user_id,
-                'guild_id': guild_id,
-                'role_type': role_type
-            }).execute()
+            result = execute(supabase.table('leadership_roles').select('*').eq('discord_user_id', discord_user_id).eq('guild_id', guild_id))
+            return len(result.data) > 0 if result.data else False
+        except Exception as e:
+            logger.error("Error checking leadership status: %s", e, extra={'op': 'is_leader', 'guild': guild_id, 'user': discord_user_id})
+            return False
+
+    @staticmethod
+    def upsert_daily_rollups(rows: List[Dict[str, Any]]) -> bool:
+        if not rows:
+            return True
+
+        try:
+            execute(supabase.table('activity_daily').upsert(rows, on_conflict='guild_id,discord_user_id,day'))
             return True
         except Exception as e:
-            print(f"Error assigning leadership role: {e}")
+            logger.error("Error upserting daily rollups: %s", e, extra={'op': 'upsert_daily_rollups'})
             return False
 
     @staticmethod
-    def remove_leadership_role(discord_user_id: str, guild_id: str, role_type: str) -> bool:
+    def get_daily_rollups(guild_id: str, since_day: str, page_size: int = 1000) -> List[Dict[str, Any]]:
+        rows = []
         try:
-            supabase.table('leadership_roles').delete().eq('discord_user_id', discord_user_id).eq('guild_id', guild_id).eq('role_type', role_type).execute()
+            while True:
+                result = execute(supabase.table('activity_daily').select('*').eq('guild_id', guild_id).gte('day', since_day).order('day').order('discord_user_id').range(len(rows), len(rows) + page_size - 1))
+                page = result.data or []
+                rows.extend(page)
+                if len(page) < page_size:
+                    return rows
+        except Exception as e:
+            logger.error("Error fetching daily rollups: %s", e, extra={'op': 'get_daily_rollups', 'guild': guild_id})
+            return rows
+
+    @staticmethod
+    def get_guild_sketches(guild_id: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            result = execute(supabase.table('guild_sketches').select('*').eq('guild_id', guild_id))
+            return result.data or []
+        except Exception as e:
+            logger.error("Error fetching guild sketches: %s", e, extra={'op': 'get_guild_sketches', 'guild': guild_id})
+            return None
+
+    @staticmethod
+    def upsert_guild_sketches(rows: List[Dict[str, Any]]) -> bool:
+        if not rows:
+            return True
+
+        try:
+            updated_at = datetime.utcnow().isoformat()
+            execute(supabase.table('guild_sketches').upsert([{**row, 'updated_at': updated_at} for row in rows], on_conflict='guild_id,stat'))
             return True
         except Exception as e:
-            print(f"Error removing leadership role: {e}")
+            logger.error("Error upserting guild sketches: %s", e, extra={'op': 'upsert_guild_sketches'})
             return False
 
     @staticmethod
-    def is_leader(discord_user_id: str, guild_id: str) -> bool:
+    def delete_guild_sketches(guild_ids: List[str]) -> bool:
+        if not guild_ids:
+            return True
+
         try:
-            result = supabase.table('leadership_roles').select('*').eq('discord_user_id', discord_user_id).eq('guild_id', guild_id).execute()
-            return len(result.data) > 0 if result.data else False
+            execute(supabase.table('guild_sketches').delete().in_('guild_id', guild_ids))
+            return True
         except Exception as e:
-            print(f"Error checking leadership status: {e}")
+            logger.error("Error deleting guild sketches: %s", e, extra={'op': 'delete_guild_sketches'})
             return False
 
     @staticmethod
-    def get_inactive_users(guild_id: str, days: int) -> List[Dict[str, Any]]:
+    def get_backfill_run(guild_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            result = execute(supabase.table('backfill_runs').select('*').eq('guild_id', guild_id).maybe_single())
+            return result.data if result and result.data else {}
+        except Exception as e:
+            logger.error("Error fetching backfill run: %s", e, extra={'op': 'get_backfill_run', 'guild': guild_id})
+            return None
+
+    @staticmethod
+    def apply_backfill(guild_id: str, rows: List[Dict[str, Any]], state: Dict[str, Any], finished: bool = False) -> bool:
+        try:
+            execute(supabase.rpc('apply_backfill', {
+                'p_guild_id': guild_id,
+                'p_rows': rows,
+                'p_state': state,
+                'p_finished': finished
+            }))
+            return True
+        except Exception as e:
+            logger.error("Error applying backfill: %s", e, extra={'op': 'apply_backfill', 'guild': guild_id})
+            return False
+
+    @staticmethod
+    def get_guild_config(guild_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            result = execute(supabase.table('guild_config').select('overrides').eq('guild_id', guild_id).maybe_single())
+            return result.data.get('overrides') or {} if result and result.data else {}
+        except Exception as e:
+            logger.error("Error fetching guild config: %s", e, extra={'op': 'get_guild_config', 'guild': guild_id})
+            return None
+
+    @staticmethod
+    def upsert_guild_config(guild_id: str, overrides: Dict[str, Any]) -> bool:
+        try:
+            execute(supabase.table('guild_config').upsert({
+                'guild_id': guild_id,
+                'overrides': overrides,
+                'updated_at': datetime.utcnow().isoformat()
+            }, on_conflict='guild_id'))
+            return True
+        except Exception as e:
+            logger.error("Error saving guild config: %s", e, extra={'op': 'upsert_guild_config', 'guild': guild_id})
+            return False
+
+    @staticmethod
+    def get_inactive_users(guild_id: str, days: int, page_size: int = 1000) -> List[Dict[str, Any]]:
+        users = []
         try:
             from datetime import timedelta
             cutoff_date = (datetime.utcnow() - timedelta(days=days)).isoformat()
 
-            result = supabase.table('user_stats').select('*').eq('guild_id', guild_id).lt('last_activity', cutoff_date).eq('is_immune_to_decay', False).execute()
-            return result.data if result.data else []
+            while True:
+                result = execute(supabase.table('user_stats').select('*').eq('guild_id', guild_id).lt('last_activity', cutoff_date).eq('is_immune_to_decay', False).order('last_activity').order('discord_user_id').range(len(users), len(users) + page_size - 1))
+                page = result.data or []
+                users.extend(apply_decay_projection(row) for row in page)
+                if len(page) < page_size:
+                    return users
         except Exception as e:
-            print(f"Error fetching inactive users: {e}")
-            return []
+            logger.error("Error fetching inactive users: %s", e, extra={'op': 'get_inactive_users', 'guild': guild_id})
+            return users
+
+    @staticmethod
+    def demote_many(guild_id: str, discord_user_ids: List[str], from_rank: int, to_rank: int, chunk_size: int = 200) -> List[str]:
+        demoted = []
+        for i in range(0, len(discord_user_ids), chunk_size):
+            chunk = discord_user_ids[i:i + chunk_size]
+            try:
+                result = execute(supabase.rpc('demote_many', {
+                    'p_guild_id': guild_id,
+                    'p_user_ids': chunk,
+                    'p_from_rank': from_rank,
+                    'p_to_rank': to_rank
+                }))
+            except Exception as e:
+                logger.error("Error demoting users in bulk: %s", e, extra={'op': 'demote_many', 'guild': guild_id})
+                continue
+            for row in result.data or []:
+                user_id = row['discord_user_id']
+                user_cache.update((guild_id, user_id), {'rank': to_rank})
+                demoted.append(user_id)
+        return demoted
+
+metrics.instrument_class(Database, 'db')
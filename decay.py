@@ -1,22 +1,38 @@
+import logging
 import discord
 from discord.ext import commands, tasks
-from database import Database
+from database import Database, stale_notice
+from journal import journal
+from dispatch import NotificationDispatcher, RateLimitedQueue
+from progression import ProgressionModule
+from decay_model import DECAYING_STATS, apply_decay_projection, decay_factor, evaluate_demotions, is_decay_immune, parse_timestamp, utc_now
 from config import DECAY_SETTINGS, RANKS
-from datetime import datetime, timedelta
+from guild_config import guild_configs
+from datetime import timedelta
+from functools import partial
+from typing import Optional
+
+logger = logging.getLogger(__name__)
 
 
 class DecayModule:
 
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, progression: ProgressionModule, dispatcher: NotificationDispatcher, role_updates: RateLimitedQueue):
         self.bot = bot
-        self.decay_task.start()
+        self.progression = progression
+        self.dispatcher = dispatcher
+        self.role_updates = role_updates
+
+    def start_tasks(self):
+        if DECAY_SETTINGS['decay_pass_enabled']:
+            self.decay_task.start()
 
     def cog_unload(self):
         self.decay_task.cancel()
 
     @tasks.loop(hours=DECAY_SETTINGS['check_interval_hours'])
     async def decay_task(self):
-        print(f"Running decay check at {datetime.utcnow()}")
+        logger.info("Running decay check")
 
         for guild in self.bot.guilds:
             await self.process_guild_decay(guild)
@@ -25,103 +41,56 @@ class DecayModule:
     async def before_decay_task(self):
         await self.bot.wait_until_ready()
 
-    async def process_guild_decay(self, guild: discord.Guild):
+    async def process_guild_decay(self, guild: discord.Guild) -> tuple[int, int]:
         guild_id = str(guild.id)
-        inactive_days = DECAY_SETTINGS['inactive_days']
-
-        inactive_users = Database.get_inactive_users(guild_id, inactive_days)
-
-        if not inactive_users:
-            return
-
-        decay_percentage = DECAY_SETTINGS['decay_percentage']
-
-        for user in inactive_users:
-            user_id = user['discord_user_id']
-
-            if user.get('is_immune_to_decay', False):
-                continue
-
-            if user.get('rank', 1) in DECAY_SETTINGS['immune_ranks']:
-                continue
-
-            await self.apply_decay(user_id, guild_id, decay_percentage)
-
-        print(f"Processed decay for {len(inactive_users)} users in {guild.name}")
-
-    async def apply_decay(self, user_id: str, guild_id: str, decay_percentage: int):
-        user_stats = Database.get_user_stats(user_id, guild_id)
-
-        if not user_stats:
-            return
-
-        decay_factor = (100 - decay_percentage) / 100
-
-        new_stats = {
-            'voice_time_seconds': int(user_stats.get('voice_time_seconds', 0) * decay_factor),
-            'message_count': int(user_stats.get('message_count', 0) * decay_factor),
-            'reaction_count': int(user_stats.get('reaction_count', 0) * decay_factor),
-            'videos_shared': int(user_stats.get('videos_shared', 0) * decay_factor),
-        }
-
-        Database.update_user_stats(user_id, guild_id, new_stats)
+        settings = guild_configs.get(guild_id).decay
+        inactive_users = Database.get_inactive_users(guild_id, settings['inactive_days'])
 
-        print(f"Applied {decay_percentage}% decay to user {user_id}")
+        decaying = [user for user in inactive_users if not is_decay_immune(user, settings)]
 
-    async def check_demotion(self, user_id: str, guild_id: str):
-        user_stats = Database.get_user_stats(user_id, guild_id)
+        demoted = 0
+        for new_rank, user_ids in evaluate_demotions(decaying, settings).items():
+            updated = Database.demote_many(guild_id, user_ids, new_rank + 1, new_rank)
+            journal.record_rank_many(guild_id, updated, new_rank)
+            for user_id in updated:
+                await self.role_updates.put(partial(self.apply_demotion, guild, user_id, new_rank))
+                demoted += 1
 
-        if not user_stats:
-            return
+        await self.progression.refresh_scores(guild_id, decaying)
 
-        current_rank = user_stats.get('rank', 1)
+        logger.info("%d users in %s are decaying, %d demoted", len(decaying), guild.name, demoted, extra={'op': 'process_guild_decay', 'guild': guild_id})
+        return len(decaying), demoted
 
-        if current_rank <= 2:
+    async def apply_demotion(self, guild: discord.Guild, user_id: str, new_rank: int):
+        member = await self.get_member(guild, user_id)
+        if not member:
             return
 
-        if user_stats.get('is_immune_to_decay', False):
-            return
-
-        from progression import ProgressionModule
-        progression = ProgressionModule(self.bot)
-
-        eligible, _, _ = progression.check_promotion_eligibility(user_stats)
+        await self.progression.update_user_roles(member, new_rank)
+        self.notify_demotion(member, new_rank)
 
-        voice_hours = user_stats.get('voice_time_seconds', 0) / 3600
-        messages = user_stats.get('message_count', 0)
-
-        if voice_hours < 0.5 and messages < 10 and current_rank > 2:
-            new_rank = current_rank - 1
-            Database.update_user_stats(user_id, guild_id, {'rank': new_rank})
-
-            member = await self.get_member(user_id, guild_id)
-            if member:
-                await self.notify_demotion(member, new_rank)
-
-    async def get_member(self, user_id: str, guild_id: str) -> discord.Member:
-        guild = self.bot.get_guild(int(guild_id))
-        if not guild:
-            return None
+    async def get_member(self, guild: discord.Guild, user_id: str) -> Optional[discord.Member]:
+        member = guild.get_member(int(user_id))
+        if member:
+            return member
 
         try:
-            member = await guild.fetch_member(int(user_id))
-            return member
+            return await guild.fetch_member(int(user_id))
         except discord.NotFound:
             return None
 
-    async def notify_demotion(self, member: discord.Member, new_rank: int):
-        try:
-            embed = discord.Embed(
-                title="Rank Update",
-                description=f"Due to inactivity, you have been demoted to **{RANKS[new_rank]['name']}**.\n\n"
-                           f"Stay active to maintain and improve your rank!",
-                color=discord.Color.orange()
-            )
-            await member.send(embed=embed)
-        except discord.Forbidden:
-            print(f"Cannot send DM to {member.name}")
+    def notify_demotion(self, member: discord.Member, new_rank: int):
+        self.dispatcher.send_dm(
+            member,
+            "Rank Update",
+            f"Due to inactivity, you have been demoted to **{RANKS[new_rank]['name']}**.\n"
+            f"Stay active to maintain and improve your rank!",
+            discord.Color.orange()
+        )
+
+    def get_decay_info_embed(self, guild: discord.Guild) -> discord.Embed:
+        settings = guild_configs.get(str(guild.id)).decay
 
-    def get_decay_info_embed(self) -> discord.Embed:
         embed = discord.Embed(
             title="Point Decay System",
             description="Inactive users will experience point decay to encourage consistent participation.",
@@ -130,23 +99,23 @@ class DecayModule:
 
         embed.add_field(
             name="Inactivity Period",
-            value=f"{DECAY_SETTINGS['inactive_days']} days",
+            value=f"{settings['inactive_days']} days",
             inline=True
         )
 
         embed.add_field(
             name="Decay Rate",
-            value=f"{DECAY_SETTINGS['decay_percentage']}% per check",
+            value=f"{settings['decay_percentage']}% per {settings['decay_period_hours']} hours of inactivity",
             inline=True
         )
 
         embed.add_field(
-            name="Check Frequency",
-            value=f"Every {DECAY_SETTINGS['check_interval_hours']} hours",
+            name="Applied",
+            value="Continuously, based on time since your last activity",
             inline=True
         )
 
-        immune_ranks = ', '.join([RANKS[r]['name'] for r in DECAY_SETTINGS['immune_ranks']])
+        immune_ranks = ', '.join([RANKS[r]['name'] for r in settings['immune_ranks'] if r in RANKS])
         embed.add_field(
             name="Immune Ranks",
             value=immune_ranks,
@@ -166,7 +135,7 @@ def setup_decay_commands(bot: commands.Bot, decay: DecayModule):
 
     @bot.command(name='decay_info')
     async def decay_info(ctx):
-        embed = decay.get_decay_info_embed()
+        embed = decay.get_decay_info_embed(ctx.guild)
         await ctx.send(embed=embed)
 
     @bot.command(name='decay_status')
@@ -174,24 +143,21 @@ def setup_decay_commands(bot: commands.Bot, decay: DecayModule):
         if member is None:
             member = ctx.author
 
-        user_stats = Database.get_user_stats(str(member.id), str(ctx.guild.id))
+        user_stats = Database.get_user_stats(str(member.id), str(ctx.guild.id), apply_decay=False, allow_stale=True)
 
         if not user_stats:
             await ctx.send(f"No stats found for {member.display_name}")
             return
 
-        is_immune = user_stats.get('is_immune_to_decay', False)
-        last_activity = user_stats.get('last_activity')
-
-        if last_activity:
-            last_active = datetime.fromisoformat(last_activity.replace('Z', '+00:00'))
-            days_inactive = (datetime.utcnow().replace(tzinfo=last_active.tzinfo) - last_active).days
-        else:
-            days_inactive = 0
+        settings = guild_configs.get(str(ctx.guild.id)).decay
+        is_immune = is_decay_immune(user_stats, settings)
+        last_active = parse_timestamp(user_stats.get('last_activity'))
+        now = utc_now()
+        days_inactive = (now - last_active).days if last_active else 0
 
         embed = discord.Embed(
             title=f"Decay Status - {member.display_name}",
-            color=discord.Color.green() if is_immune or days_inactive < DECAY_SETTINGS['inactive_days'] else discord.Color.red()
+            color=discord.Color.green() if is_immune or days_inactive < settings['inactive_days'] else discord.Color.red()
         )
 
         embed.add_field(
@@ -206,18 +172,36 @@ def setup_decay_commands(bot: commands.Bot, decay: DecayModule):
             inline=True
         )
 
-        if not is_immune and days_inactive >= DECAY_SETTINGS['inactive_days']:
+        if not is_immune:
+            projection_days = settings['inactive_days']
+            current = apply_decay_projection(user_stats, now)
+            projected = apply_decay_projection(user_stats, now + timedelta(days=projection_days))
+            lines = [
+                f"{stat_name.replace('_', ' ').title()}: {current.get(stat_name, 0)} → {projected.get(stat_name, 0)}"
+                for stat_name in DECAYING_STATS
+            ]
             embed.add_field(
-                name="Warning",
-                value=f"You are inactive and will lose {DECAY_SETTINGS['decay_percentage']}% of your points!",
+                name=f"Now → In {projection_days} Days Without Activity",
+                value='\n'.join(lines),
                 inline=False
             )
 
+            factor = decay_factor(user_stats, now)
+            if factor < 1.0:
+                embed.add_field(
+                    name="Warning",
+                    value=f"You are inactive and have lost {(1 - factor) * 100:.1f}% of your points so far!",
+                    inline=False
+                )
+
+        if user_stats.get('stale_at'):
+            embed.set_footer(text=stale_notice(user_stats['stale_at']))
+
         await ctx.send(embed=embed)
 
     @bot.command(name='force_decay')
     @commands.has_permissions(administrator=True)
     async def force_decay(ctx):
         await ctx.send("Starting manual decay check...")
-        await decay.process_guild_decay(ctx.guild)
-        await ctx.send("Decay check completed!")
+        decaying, demoted = await decay.process_guild_decay(ctx.guild)
+        await ctx.send(f"Decay check completed! {decaying} users are decaying, {demoted} demoted.")
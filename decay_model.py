@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+from config import DECAY_SETTINGS
+from guild_config import guild_configs
+from typing import Any, Dict, Iterable, List, Optional
+
+DECAYING_STATS = tuple(DECAY_SETTINGS['decaying_stats'])
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def guild_decay_settings(user_stats: Dict[str, Any]) -> Dict[str, Any]:
+    return guild_configs.get(user_stats.get('guild_id')).decay
+
+
+def is_decay_immune(user_stats: Dict[str, Any], settings: Optional[Dict[str, Any]] = None) -> bool:
+    if user_stats.get('is_immune_to_decay', False):
+        return True
+    settings = settings or guild_decay_settings(user_stats)
+    return user_stats.get('rank', 1) in settings['immune_ranks']
+
+
+def decay_start(user_stats: Dict[str, Any], settings: Optional[Dict[str, Any]] = None) -> Optional[datetime]:
+    last_activity = parse_timestamp(user_stats.get('last_activity'))
+    if last_activity is None:
+        return None
+    settings = settings or guild_decay_settings(user_stats)
+    return last_activity + timedelta(days=settings['inactive_days'])
+
+
+def decay_factor(user_stats: Dict[str, Any], now: Optional[datetime] = None, settings: Optional[Dict[str, Any]] = None) -> float:
+    settings = settings or guild_decay_settings(user_stats)
+    if is_decay_immune(user_stats, settings):
+        return 1.0
+
+    start = decay_start(user_stats, settings)
+    now = now or utc_now()
+    if start is None or now <= start:
+        return 1.0
+
+    periods = (now - start).total_seconds() / (settings['decay_period_hours'] * 3600)
+    return (1 - settings['decay_percentage'] / 100) ** periods
+
+
+def project_decay(user_stats: Dict[str, Any], now: Optional[datetime] = None, settings: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    factor = decay_factor(user_stats, now, settings)
+    if factor >= 1.0:
+        return {}
+
+    return {stat_name: int(user_stats.get(stat_name, 0) * factor + 0.5) for stat_name in DECAYING_STATS}
+
+
+def apply_decay_projection(user_stats: Dict[str, Any], now: Optional[datetime] = None, settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    projected = project_decay(user_stats, now, settings)
+    if not projected:
+        return user_stats
+
+    return {**user_stats, **projected}
+
+
+def evaluate_demotions(users: Iterable[Dict[str, Any]], settings: Optional[Dict[str, Any]] = None) -> Dict[int, List[str]]:
+    settings = settings or guild_configs.get(None).decay
+    floor_rank = settings['demotion_floor_rank']
+    max_voice_seconds = settings['demotion_max_voice_hours'] * 3600
+    max_messages = settings['demotion_max_messages']
+
+    demotions: Dict[int, List[str]] = {}
+    for user in users:
+        rank = user.get('rank', 1)
+        if rank <= floor_rank or is_decay_immune(user, settings):
+            continue
+
+        if user.get('voice_time_seconds', 0) < max_voice_seconds and user.get('message_count', 0) < max_messages:
+            demotions.setdefault(rank - 1, []).append(user['discord_user_id'])
+
+    return demotions
@@ -0,0 +1,206 @@
+import logging
+import asyncio
+import discord
+import time
+from collections import deque
+from config import DISPATCH_SETTINGS
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class RateLimitedQueue:
+
+    def __init__(self, name: str, rate_per_second: float, max_size: int):
+        self.name = name
+        self.interval = 1 / rate_per_second
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.worker: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    def start(self):
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+
+    def submit(self, job: Job) -> bool:
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("%s queue is full, dropped job (%d dropped so far)", self.name, self.dropped, extra={'op': 'submit'})
+            return False
+
+    async def put(self, job: Job):
+        await self.queue.put(job)
+
+    def __len__(self) -> int:
+        return self.queue.qsize()
+
+    async def run(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await job()
+            except discord.HTTPException as e:
+                logger.warning("%s job failed: %s", self.name, e, extra={'op': self.name})
+            except Exception:
+                logger.exception("Unexpected error in %s job", self.name, extra={'op': self.name})
+            finally:
+                self.queue.task_done()
+
+            await asyncio.sleep(self.interval)
+
+
+class TokenBucket:
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def acquire_delay(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+
+class Notification:
+
+    __slots__ = ('route', 'target', 'title', 'lines', 'color', 'embed')
+
+    def __init__(self, route: str, target, title: Optional[str] = None, color: Optional[discord.Color] = None, embed: Optional[discord.Embed] = None):
+        self.route = route
+        self.target = target
+        self.title = title
+        self.lines: List[str] = []
+        self.color = color
+        self.embed = embed
+
+    def build_embed(self) -> discord.Embed:
+        if self.embed is not None:
+            return self.embed
+
+        return discord.Embed(title=self.title, description='\n\n'.join(self.lines), color=self.color)
+
+
+class NotificationDispatcher:
+
+    def __init__(self, settings: Dict = DISPATCH_SETTINGS):
+        self.max_size = settings['notification_queue_size']
+        self.max_retries = settings['max_retries']
+        self.retry_backoff = settings['retry_backoff_seconds']
+        self.route_settings = settings['routes']
+        self.pending: Dict[Hashable, Notification] = {}
+        self.queues: Dict[str, Deque[Hashable]] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.workers: Dict[str, asyncio.Task] = {}
+        self.wakeups: Dict[str, asyncio.Event] = {}
+        self.sequence = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def send_dm(self, member: discord.abc.User, title: str, line: str, color: discord.Color) -> bool:
+        key = ('dm', member.id)
+        notification = self.pending.get(key)
+        if notification is not None:
+            notification.lines.append(line)
+            self.coalesced += 1
+            return True
+
+        notification = Notification('dm', member, title=title, color=color)
+        notification.lines.append(line)
+        return self._enqueue(key, notification)
+
+    def send_channel(self, channel: discord.abc.Messageable, embed: discord.Embed) -> bool:
+        self.sequence += 1
+        key = ('channel', channel.id, self.sequence)
+        return self._enqueue(key, Notification(f"channel:{channel.id}", channel, embed=embed))
+
+    def _enqueue(self, key: Hashable, notification: Notification) -> bool:
+        if len(self.pending) >= self.max_size:
+            self.dropped += 1
+            logger.warning("Notification queue is full, dropped notification (%d dropped so far)", self.dropped, extra={'op': 'notify'})
+            return False
+
+        self.pending[key] = notification
+        route = notification.route
+        queue = self.queues.get(route)
+        if queue is None:
+            queue = self.queues[route] = deque()
+            self.wakeups[route] = asyncio.Event()
+        queue.append(key)
+        self.wakeups[route].set()
+
+        worker = self.workers.get(route)
+        if worker is None or worker.done():
+            self.workers[route] = asyncio.create_task(self.run_route(route))
+        return True
+
+    def get_bucket(self, route: str) -> TokenBucket:
+        bucket = self.buckets.get(route)
+        if bucket is None:
+            limits = self.route_settings.get(route.split(':', 1)[0], self.route_settings['dm'])
+            bucket = self.buckets[route] = TokenBucket(limits['rate_per_second'], limits['burst'])
+        return bucket
+
+    async def run_route(self, route: str):
+        queue = self.queues[route]
+        wakeup = self.wakeups[route]
+        bucket = self.get_bucket(route)
+
+        while True:
+            if not queue:
+                wakeup.clear()
+                await wakeup.wait()
+                continue
+
+            delay = bucket.acquire_delay()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+
+            key = queue.popleft()
+            notification = self.pending.pop(key, None)
+            if notification is not None:
+                await self.deliver(notification)
+
+    async def deliver(self, notification: Notification):
+        embed = notification.build_embed()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                await notification.target.send(embed=embed)
+                self.sent += 1
+                return
+            except (discord.Forbidden, discord.NotFound):
+                logger.warning("Cannot deliver notification to %s", notification.target, extra={'op': 'deliver'})
+                return
+            except discord.HTTPException as e:
+                if attempt == self.max_retries:
+                    logger.error("Giving up on notification to %s: %s", notification.target, e, extra={'op': 'deliver'})
+                    return
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+    def stop(self):
+        for worker in self.workers.values():
+            worker.cancel()
+        self.workers.clear()
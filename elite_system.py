@@ -1,9 +1,12 @@
+import logging
 import discord
 from discord.ext import commands
 from database import Database
 from config import RANKS, ELITE_TYPES
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 
 class EliteSystemModule:
 
@@ -14,21 +17,12 @@ class EliteSystemModule:
         user_id = str(member.id)
         guild_id = str(member.guild.id)
 
-        user_stats = Database.get_user_stats(user_id, guild_id)
-
-        if not user_stats:
-            return False
-
-        if user_stats['rank'] != 5:
-            return False
-
         if elite_type not in ELITE_TYPES:
             return False
 
-        Database.update_user_stats(user_id, guild_id, {
-            'elite_type': elite_type,
-            'is_immune_to_decay': True
-        })
+        outcome = Database.transition_rank(user_id, guild_id, 'elite_type', expected_rank=5, elite_type=elite_type)
+        if not outcome['ok']:
+            return False
 
         await self.update_elite_role(member, elite_type)
 
@@ -46,7 +40,7 @@ class EliteSystemModule:
                     mentionable=True
                 )
             except discord.Forbidden:
-                print(f"Missing permissions to create elite role in {member.guild.name}")
+                logger.warning("Missing permissions to create elite role in %s", member.guild.name, extra={'guild': member.guild.id})
                 return
 
         for et in ELITE_TYPES.keys():
@@ -56,13 +50,13 @@ class EliteSystemModule:
                 try:
                     await member.remove_roles(old_role)
                 except discord.Forbidden:
-                    print(f"Missing permissions to remove role in {member.guild.name}")
+                    logger.warning("Missing permissions to remove role in %s", member.guild.name, extra={'guild': member.guild.id})
 
         if elite_role and elite_role not in member.roles:
             try:
                 await member.add_roles(elite_role)
             except discord.Forbidden:
-                print(f"Missing permissions to add elite role in {member.guild.name}")
+                logger.warning("Missing permissions to add elite role in %s", member.guild.name, extra={'guild': member.guild.id})
 
     def get_elite_members(self, guild_id: str) -> list:
         users = Database.get_users_by_rank(guild_id, 5)
@@ -0,0 +1,291 @@
+import copy
+import json
+import config
+import discord
+from discord.ext import commands
+from config import DECAY_SETTINGS, ONBOARDING_SETTINGS, CONTENT_SETTINGS
+from metrics import metrics
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CONFIG_CACHE = metrics.cache('guild_config')
+
+GUILD_DECAY_KEYS = (
+    'inactive_days',
+    'decay_percentage',
+    'decay_period_hours',
+    'immune_ranks',
+    'demotion_floor_rank',
+    'demotion_max_voice_hours',
+    'demotion_max_messages'
+)
+
+PROMOTION_REQUIREMENT_KEYS = (
+    'wants_to_contribute',
+    'voice_time_hours',
+    'message_count',
+    'invite_count',
+    'reaction_count',
+    'subject_posts',
+    'subject_reactions',
+    'voice_sessions_hosted',
+    'videos_shared',
+    'advisor_validations'
+)
+
+
+def default_settings() -> Dict[str, Dict[str, Any]]:
+    return {
+        'scoring': dict(config.SCORING),
+        'decay': {key: DECAY_SETTINGS[key] for key in GUILD_DECAY_KEYS},
+        'promotion': {str(rank): dict(info['requirements']) for rank, info in config.PROMOTION_REQUIREMENTS.items()},
+        'channels': {
+            'welcome_channel_id': None,
+            'welcome_channels': list(ONBOARDING_SETTINGS['welcome_channels']),
+            'subject_channels': list(CONTENT_SETTINGS['subject_channels'])
+        }
+    }
+
+
+class GuildConfig:
+
+    def __init__(self, guild_id: Optional[str], overrides: Dict[str, Dict[str, Any]]):
+        self.guild_id = guild_id
+        self.overrides = overrides
+
+        settings = default_settings()
+        for section, values in overrides.items():
+            if section == 'promotion':
+                for rank, requirements in values.items():
+                    settings['promotion'].setdefault(rank, {}).update(requirements)
+            elif section in settings:
+                settings[section].update(values)
+
+        self.scoring = settings['scoring']
+        self.decay = settings['decay']
+        self.channels = settings['channels']
+        self.promotion = {}
+        for rank, info in config.PROMOTION_REQUIREMENTS.items():
+            self.promotion[rank] = {**info, 'requirements': settings['promotion'][str(rank)]}
+        self.subject_channels = frozenset(name.lower() for name in self.channels['subject_channels'])
+        self.welcome_channel_id: Optional[int] = None
+        self.welcome_channel_resolved = False
+
+    def score(self, user_stats: Dict[str, Any]) -> float:
+        scoring = self.scoring
+        score = (
+            user_stats.get('voice_time_seconds', 0) / 3600 * scoring['voice_per_hour'] +
+            user_stats.get('message_count', 0) * scoring['message_per_count'] +
+            user_stats.get('invite_count', 0) * scoring['invite_per_count'] +
+            user_stats.get('reaction_count', 0) * scoring['reaction_per_count'] +
+            user_stats.get('videos_shared', 0) * scoring['video_per_count'] +
+            user_stats.get('subject_posts', 0) * scoring['subject_post_per_count'] +
+            user_stats.get('voice_sessions_hosted', 0) * scoring['voice_session_hosted']
+        )
+        return round(score, 2)
+
+
+class GuildConfigStore:
+
+    def __init__(self):
+        self._cache: Dict[str, GuildConfig] = {}
+        self._defaults = GuildConfig(None, {})
+        self.scoring_listeners: List[Callable[[Optional[str]], None]] = []
+
+    def get(self, guild_id: Optional[str]) -> GuildConfig:
+        if not guild_id:
+            return self._defaults
+
+        guild_id = str(guild_id)
+        config = self._cache.get(guild_id)
+        CONFIG_CACHE.record(config is not None)
+        if config is None:
+            from database import Database
+            overrides = Database.get_guild_config(guild_id)
+            if overrides is None:
+                return GuildConfig(guild_id, {})
+            config = self._cache[guild_id] = GuildConfig(guild_id, overrides)
+        return config
+
+    def stored_overrides(self, guild_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        config = self.get(guild_id)
+        if str(guild_id) not in self._cache:
+            return None
+        return copy.deepcopy(config.overrides)
+
+    def invalidate(self, guild_id: Optional[str] = None):
+        if guild_id is None:
+            self._cache.clear()
+            self._defaults = GuildConfig(None, {})
+        else:
+            self._cache.pop(str(guild_id), None)
+
+    def scoring_changed(self, guild_id: Optional[str] = None):
+        for listener in self.scoring_listeners:
+            listener(guild_id)
+
+    def invalidate_channels(self, guild_id: str):
+        config = self._cache.get(str(guild_id))
+        if config is not None:
+            config.welcome_channel_resolved = False
+
+    def set_value(self, guild_id: str, section: str, key: str, raw_value: str) -> Tuple[bool, str]:
+        defaults = default_settings()
+        if section not in defaults:
+            return False, f"Unknown section `{section}`. Valid sections: {', '.join(defaults)}"
+
+        if section == 'promotion':
+            rank, _, requirement = key.partition('.')
+            if rank not in defaults['promotion'] or not requirement or requirement == 'description':
+                return False, "Promotion keys look like `<target_rank>.<requirement>`, e.g. `3.message_count`."
+            if requirement not in PROMOTION_REQUIREMENT_KEYS:
+                return False, f"Unknown requirement `{requirement}`. Valid requirements: {', '.join(PROMOTION_REQUIREMENT_KEYS)}"
+            default = defaults['promotion'][rank].get(requirement, False if requirement == 'wants_to_contribute' else 0)
+        elif key not in defaults[section]:
+            return False, f"Unknown key `{key}`. Valid keys: {', '.join(defaults[section])}"
+        else:
+            default = defaults[section][key]
+
+        value, error = parse_value(raw_value, default)
+        if error is None:
+            error = check_bounds(section, key, value)
+        if error:
+            return False, error
+
+        overrides = self.stored_overrides(guild_id)
+        if overrides is None:
+            return False, "Failed to load guild configuration, nothing was changed."
+        if section == 'promotion':
+            overrides.setdefault('promotion', {}).setdefault(rank, {})[requirement] = value
+        else:
+            overrides.setdefault(section, {})[key] = value
+
+        from database import Database
+        if not Database.upsert_guild_config(str(guild_id), overrides):
+            return False, "Failed to save guild configuration."
+
+        self.invalidate(guild_id)
+        if section == 'scoring':
+            self.scoring_changed(str(guild_id))
+        return True, f"`{section}.{key}` set to `{json.dumps(value)}`."
+
+    def reset(self, guild_id: str, section: Optional[str] = None) -> Tuple[bool, str]:
+        overrides = self.stored_overrides(guild_id)
+        if overrides is None:
+            return False, "Failed to load guild configuration, nothing was changed."
+        rescore = 'scoring' in overrides and section in (None, 'scoring')
+        if section is None:
+            overrides = {}
+        else:
+            overrides.pop(section, None)
+
+        from database import Database
+        if not Database.upsert_guild_config(str(guild_id), overrides):
+            return False, "Failed to save guild configuration."
+
+        self.invalidate(guild_id)
+        if rescore:
+            self.scoring_changed(str(guild_id))
+        return True, f"Reset {'all settings' if section is None else f'`{section}`'} to defaults."
+
+
+def parse_value(raw_value: str, default: Any) -> Tuple[Any, Optional[str]]:
+    if raw_value.startswith('<#') and raw_value.endswith('>'):
+        raw_value = raw_value[2:-1]
+
+    try:
+        value = json.loads(raw_value)
+    except ValueError:
+        value = raw_value
+
+    if default is None:
+        if value is None or isinstance(value, int):
+            return value, None
+        return None, "Expected a channel mention or ID."
+
+    if isinstance(default, bool):
+        if isinstance(value, bool):
+            return value, None
+        return None, "Expected `true` or `false`."
+
+    if isinstance(default, (int, float)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            return None, "Expected a non-negative number."
+        return value, None
+
+    if isinstance(default, list):
+        if isinstance(value, str):
+            value = [item.strip() for item in value.split(',') if item.strip()]
+        if not isinstance(value, list):
+            return None, "Expected a comma-separated list."
+        if default and isinstance(default[0], int):
+            try:
+                value = [int(item) for item in value]
+            except (TypeError, ValueError):
+                return None, "Expected a comma-separated list of numbers."
+        return value, None
+
+    return value, None
+
+
+def check_bounds(section: str, key: str, value: Any) -> Optional[str]:
+    if section != 'decay':
+        return None
+
+    if key == 'decay_percentage' and not 0 < value <= 100:
+        return "`decay_percentage` must be greater than 0 and at most 100."
+    if key == 'decay_period_hours' and value <= 0:
+        return "`decay_period_hours` must be greater than 0."
+    if key == 'demotion_floor_rank' and value not in config.RANKS:
+        return f"`demotion_floor_rank` must be one of the ranks {', '.join(str(rank) for rank in config.RANKS)}."
+    if key == 'immune_ranks' and any(rank not in config.RANKS for rank in value):
+        return f"`immune_ranks` may only contain the ranks {', '.join(str(rank) for rank in config.RANKS)}."
+    return None
+
+
+guild_configs = GuildConfigStore()
+
+
+def setup_guild_config_commands(bot: commands.Bot):
+
+    @bot.command(name='config_show')
+    @commands.has_permissions(administrator=True)
+    async def config_show(ctx):
+        config = guild_configs.get(str(ctx.guild.id))
+
+        embed = discord.Embed(
+            title="Server Configuration",
+            description="Values marked with * are overridden for this server.",
+            color=discord.Color.blue()
+        )
+
+        for section in ('scoring', 'decay', 'channels'):
+            values = getattr(config, section)
+            overridden = config.overrides.get(section, {})
+            lines = [f"{'*' if key in overridden else ''}`{key}`: {json.dumps(value)}" for key, value in values.items()]
+            embed.add_field(name=section.title(), value='\n'.join(lines), inline=False)
+
+        promotion_overrides = config.overrides.get('promotion', {})
+        lines = []
+        for rank, info in config.promotion.items():
+            overridden = promotion_overrides.get(str(rank), {})
+            requirements = ', '.join(
+                f"{'*' if key in overridden else ''}{key}={value}"
+                for key, value in info['requirements'].items() if key != 'description'
+            )
+            if requirements:
+                lines.append(f"`{rank}`: {requirements}")
+        embed.add_field(name="Promotion", value='\n'.join(lines) or "None", inline=False)
+
+        await ctx.send(embed=embed)
+
+    @bot.command(name='config_set')
+    @commands.has_permissions(administrator=True)
+    async def config_set(ctx, section: str, key: str, *, value: str):
+        success, message = guild_configs.set_value(str(ctx.guild.id), section.lower(), key, value)
+        await ctx.send(message if success else f"❌ {message}")
+
+    @bot.command(name='config_reset')
+    @commands.has_permissions(administrator=True)
+    async def config_reset(ctx, section: Optional[str] = None):
+        success, message = guild_configs.reset(str(ctx.guild.id), section.lower() if section else None)
+        await ctx.send(message if success else f"❌ {message}")
@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+from config import JOURNAL_SETTINGS
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.log'
+BASELINES_FILE = 'baselines'
+
+SET_KINDS = ('decay', 'rank', 'baseline')
+
+BASELINE_COLUMNS = (
+    'rank',
+    'voice_time_seconds',
+    'message_count',
+    'invite_count',
+    'reaction_count',
+    'subject_posts',
+    'subject_reactions',
+    'voice_sessions_hosted',
+    'videos_shared',
+    'advisor_validations'
+)
+
+
+class ActivityJournal:
+
+    def __init__(self, directory: str, segment_max_bytes: int, fsync: bool = False):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync = fsync
+        self._file = None
+        self._segment = 0
+        self._size = 0
+        self._baselines: Optional[Set[str]] = None
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        segments = list_segments(self.directory)
+        self._segment = segment_number(segments[-1]) if segments else 1
+        path = segment_path(self.directory, self._segment)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        self.flush()
+        self._file.close()
+        self._segment += 1
+        self._file = open(segment_path(self.directory, self._segment), 'a', encoding='utf-8')
+        self._size = 0
+
+    def append(self, kind: str, guild_id: str, user_id: str, values: Dict[str, int]):
+        if self._file is None:
+            self._open_segment()
+
+        payload = ','.join(f"{key}={int(value)}" for key, value in values.items())
+        line = f"{int(time.time())}\t{kind}\t{guild_id}\t{user_id}\t{payload}\n"
+        self._file.write(line)
+        self._size += len(line)
+
+        if self._size >= self.segment_max_bytes:
+            self._rotate()
+
+    def record_increments(self, guild_id: str, user_id: str, deltas: Dict[str, int]):
+        self.append('inc', guild_id, user_id, deltas)
+
+    def record_decay(self, guild_id: str, user_id: str, new_values: Dict[str, int]):
+        self.append('decay', guild_id, user_id, new_values)
+        self.flush()
+
+    def record_rank(self, guild_id: str, user_id: str, rank: int):
+        self.record_rank_many(guild_id, [user_id], rank)
+
+    def record_rank_many(self, guild_id: str, user_ids: List[str], rank: int):
+        for user_id in user_ids:
+            self.append('rank', guild_id, user_id, {'rank': rank})
+        self.flush()
+
+    def record_baseline(self, guild_id: str, user_id: str, values: Dict[str, int]):
+        self.append('baseline', guild_id, user_id, values)
+
+    def has_baseline(self, guild_id: str) -> bool:
+        if self._baselines is None:
+            self._baselines = read_baselines(self.directory)
+        return guild_id in self._baselines
+
+    def mark_baseline(self, guild_id: str):
+        self.flush()
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, BASELINES_FILE), 'a', encoding='utf-8') as f:
+            f.write(f"{guild_id}\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        if self._baselines is not None:
+            self._baselines.add(guild_id)
+
+    def flush(self):
+        if self._file is None:
+            return
+
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+def segment_path(directory: str, number: int) -> str:
+    return os.path.join(directory, f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}")
+
+
+def segment_number(filename: str) -> int:
+    return int(os.path.basename(filename)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+
+def list_segments(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+
+    names = [name for name in os.listdir(directory) if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)]
+    return [os.path.join(directory, name) for name in sorted(names, key=segment_number)]
+
+
+def read_baselines(directory: str) -> Set[str]:
+    try:
+        with open(os.path.join(directory, BASELINES_FILE), encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def iter_events(directory: str, guild_id: Optional[str] = None) -> Iterator[Tuple[int, str, str, str, str]]:
+    for path in list_segments(directory):
+        with open(path, 'r', encoding='utf-8') as segment:
+            for line in segment:
+                if not line.endswith('\n'):
+                    continue
+                parts = line[:-1].split('\t', 4)
+                if len(parts) != 5 or not parts[0].isdigit():
+                    continue
+                if guild_id is not None and parts[2] != guild_id:
+                    continue
+                yield int(parts[0]), parts[1], parts[2], parts[3], parts[4]
+
+
+def parse_payload(payload: str) -> List[Tuple[str, int]]:
+    values = []
+    for item in payload.split(','):
+        name, _, value = item.partition('=')
+        values.append((name, int(value)))
+    return values
+
+
+def rebuild_counters(directory: str, guild_id: Optional[str] = None) -> Tuple[Dict[Tuple[str, str], Dict[str, int]], int]:
+    counters: Dict[Tuple[str, str], Dict[str, int]] = {}
+    events = 0
+
+    for _, kind, event_guild, user_id, payload in iter_events(directory, guild_id):
+        try:
+            values = parse_payload(payload) if payload else []
+        except ValueError:
+            continue
+
+        events += 1
+        key = (event_guild, user_id)
+        user_counters = counters.get(key)
+        if user_counters is None:
+            user_counters = counters[key] = {}
+
+        if kind in SET_KINDS:
+            for name, value in values:
+                user_counters[name] = value
+        else:
+            for name, value in values:
+                total = user_counters.get(name, 0) + value
+                user_counters[name] = total if total > 0 else 0
+
+    return counters, events
+
+
+journal = ActivityJournal(
+    JOURNAL_SETTINGS['directory'],
+    JOURNAL_SETTINGS['segment_max_bytes'],
+    JOURNAL_SETTINGS['fsync']
+)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('replay', 'rebuild'):
+        print("Usage: python journal.py replay [guild_id] | rebuild <guild_id>")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    target_guild = sys.argv[2] if len(sys.argv) > 2 else None
+
+    if command == 'rebuild' and target_guild is None:
+        print("Usage: python journal.py rebuild <guild_id>")
+        sys.exit(1)
+
+    if command == 'rebuild' and not journal.has_baseline(target_guild):
+        print(f"No baseline snapshot of guild {target_guild} in the journal yet; rebuilding would erase counters "
+              f"from before journaling started. Let the bot run until it has written one.")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    rebuilt, event_count = rebuild_counters(JOURNAL_SETTINGS['directory'], target_guild)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {event_count} events for {len(rebuilt)} users in {elapsed:.2f}s")
+
+    if command == 'rebuild':
+        from database import Database
+
+        for (_, user_id), values in rebuilt.items():
+            if values and not Database.update_user_stats(user_id, target_guild, values):
+                print(f"Failed to rebuild stats for user {user_id}")
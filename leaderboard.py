@@ -0,0 +1,273 @@
+import logging
+import discord
+from discord.ext import commands
+from datetime import datetime, timezone
+from circuit import StaleCache
+from database import Database, stale_notice
+from config import RANKS, ROLLUP_SETTINGS, LEADERBOARD_SETTINGS
+from metrics import metrics
+from progression import ProgressionModule
+from topk import top_scores
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE = metrics.cache('leaderboard_pages')
+
+CATEGORIES = {
+    'all': ('score', "Overall Leaderboard", lambda user: f"{user.get('score', 0):.1f} pts"),
+    'voice': ('voice_time_seconds', "Voice Time Leaderboard", lambda user: f"{user.get('voice_time_seconds', 0) / 3600:.1f}h"),
+    'messages': ('message_count', "Messages Leaderboard", lambda user: f"{user.get('message_count', 0)} msgs"),
+    'invites': ('invite_count', "Invites Leaderboard", lambda user: f"{user.get('invite_count', 0)} invites"),
+    'global': ('score', "Global Leaderboard", lambda user: f"{user.get('score', 0):.1f} pts in {user['guild_name']}")
+}
+
+Cursor = Tuple[str, Any, str]
+
+
+class LeaderboardPage:
+
+    def __init__(self, category: str, start_rank: int, users: List[Dict[str, Any]], stale_at: Optional[str] = None):
+        self.category = category
+        self.start_rank = start_rank
+        self.users = users
+        self.stale_at = stale_at
+
+    def key(self, user: Dict[str, Any]) -> Tuple[Any, str]:
+        return user.get(CATEGORIES[self.category][0], 0), user['discord_user_id']
+
+    @property
+    def first_key(self) -> Optional[Tuple[Any, str]]:
+        return self.key(self.users[0]) if self.users else None
+
+    @property
+    def last_key(self) -> Optional[Tuple[Any, str]]:
+        return self.key(self.users[-1]) if self.users else None
+
+
+class LeaderboardModule:
+
+    def __init__(self, bot: commands.Bot, progression: ProgressionModule, settings: Dict[str, Any] = LEADERBOARD_SETTINGS):
+        self.bot = bot
+        self.progression = progression
+        self.settings = settings
+        self.pages = StaleCache(settings['cached_pages'])
+
+    def fetch_page(self, guild_id: str, category: str, cursor: Optional[Cursor]) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        cache_key = (guild_id, category, cursor)
+        cached = self.pages.get(cache_key)
+        fresh = cached is not None and (datetime.now(timezone.utc) - cached[1]).total_seconds() < self.settings['page_cache_seconds']
+        PAGE_CACHE.record(fresh)
+        if fresh:
+            return cached[0], None
+
+        column = CATEGORIES[category][0]
+        limit = self.settings['page_size']
+        if cursor is None:
+            users = Database.get_leaderboard_page(guild_id, column, limit)
+        else:
+            direction, value, user_id = cursor
+            if direction == 'before':
+                users = Database.get_leaderboard_page(guild_id, column, limit, before=(value, user_id))
+            else:
+                users = Database.get_leaderboard_page(guild_id, column, limit, after=(value, user_id), inclusive=direction == 'from')
+
+        if users is None:
+            if cached is None:
+                return None
+            return cached[0], cached[1].isoformat()
+
+        self.pages.put(cache_key, users)
+        return users, None
+
+    def warm_global(self, guild_id: str) -> bool:
+        rows = Database.get_leaderboard_page(guild_id, 'score', top_scores.k)
+        if rows is None:
+            return False
+        top_scores.load(guild_id, rows)
+        return True
+
+    def global_rows(self) -> List[Dict[str, Any]]:
+        for guild_id in top_scores.stale():
+            self.warm_global(guild_id)
+
+        rows = []
+        for entry in top_scores.top():
+            guild = self.bot.get_guild(int(entry['guild_id']))
+            rows.append({**entry, 'guild_name': guild.name if guild else entry['guild_id']})
+        return rows
+
+    def global_page(self, start_rank: int) -> LeaderboardPage:
+        start = max(start_rank, 1) - 1
+        return LeaderboardPage('global', start + 1, self.global_rows()[start:start + self.settings['page_size']])
+
+    def first_page(self, guild_id: str, category: str) -> Optional[LeaderboardPage]:
+        if category == 'global':
+            return self.global_page(1)
+
+        fetched = self.fetch_page(guild_id, category, None)
+        if fetched is None:
+            return None
+        return LeaderboardPage(category, 1, *fetched)
+
+    def next_page(self, guild_id: str, page: LeaderboardPage) -> Optional[LeaderboardPage]:
+        if page.category == 'global':
+            return self.global_page(page.start_rank + len(page.users))
+
+        fetched = self.fetch_page(guild_id, page.category, ('after', *page.last_key))
+        if fetched is None:
+            return None
+        return LeaderboardPage(page.category, page.start_rank + len(page.users), *fetched)
+
+    def previous_page(self, guild_id: str, page: LeaderboardPage) -> Optional[LeaderboardPage]:
+        if page.category == 'global':
+            return self.global_page(page.start_rank - self.settings['page_size'])
+
+        fetched = self.fetch_page(guild_id, page.category, ('before', *page.first_key))
+        if fetched is None:
+            return None
+        return LeaderboardPage(page.category, max(page.start_rank - len(fetched[0]), 1), *fetched)
+
+    def page_for_member(self, guild_id: str, category: str, member_id: str) -> Tuple[Optional[LeaderboardPage], str]:
+        if category == 'global':
+            for position, row in enumerate(self.global_rows()):
+                if row['discord_user_id'] == member_id:
+                    return self.global_page(position - position % self.settings['page_size'] + 1), ""
+            return None, f"You are not in the global top {top_scores.k}."
+
+        user_stats = Database.get_user_stats(member_id, guild_id, apply_decay=False)
+        if not user_stats:
+            return None, "You are not on the leaderboard yet."
+
+        column = CATEGORIES[category][0]
+        value = user_stats.get(column, 0)
+        ahead = Database.count_ranked_ahead(guild_id, column, value, member_id)
+        if ahead is None:
+            return None, "Leaderboard unavailable right now."
+
+        page_size = self.settings['page_size']
+        offset = ahead % page_size
+        before = self.fetch_page(guild_id, category, ('before', value, member_id)) if offset else ([], None)
+        after = self.fetch_page(guild_id, category, ('from', value, member_id))
+        if before is None or after is None:
+            return None, "Leaderboard unavailable right now."
+
+        users = before[0][-offset:] if offset else []
+        users += after[0][:page_size - len(users)]
+        return LeaderboardPage(category, ahead - offset + 1, users, before[1] or after[1]), ""
+
+    def build_embed(self, guild: discord.Guild, page: LeaderboardPage) -> discord.Embed:
+        _, title, value_fn = CATEGORIES[page.category]
+
+        if not page.users:
+            return discord.Embed(
+                title=title,
+                description="No users found!",
+                color=discord.Color.red()
+            )
+
+        embed = discord.Embed(
+            title=title,
+            color=discord.Color.gold()
+        )
+
+        for position, user in enumerate(page.users, page.start_rank):
+            medal = "🥇" if position == 1 else "🥈" if position == 2 else "🥉" if position == 3 else f"{position}."
+            rank_name = RANKS[user.get('rank', 1)]['name']
+            embed.add_field(
+                name=f"{medal} {user['discord_username']} ({rank_name})",
+                value=value_fn(user),
+                inline=False
+            )
+
+        footer = f"Ranks {page.start_rank}-{page.start_rank + len(page.users) - 1}"
+        if page.stale_at:
+            footer += f" • {stale_notice(page.stale_at)}"
+        embed.set_footer(text=footer)
+
+        return embed
+
+
+class LeaderboardView(discord.ui.View):
+
+    def __init__(self, leaderboard: LeaderboardModule, guild: discord.Guild, author_id: int, page: LeaderboardPage):
+        super().__init__(timeout=leaderboard.settings['view_timeout_seconds'])
+        self.leaderboard = leaderboard
+        self.message: Optional[discord.Message] = None
+        self.guild = guild
+        self.author_id = author_id
+        self.page = page
+        self.update_buttons()
+
+    def update_buttons(self):
+        page_size = self.leaderboard.settings['page_size']
+        self.previous.disabled = self.page.start_rank <= 1
+        self.next.disabled = len(self.page.users) < page_size
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.author_id:
+            return True
+        await interaction.response.send_message("Run `!leaderboard` to browse your own copy.", ephemeral=True)
+        return False
+
+    async def show(self, interaction: discord.Interaction, page: Optional[LeaderboardPage], error: str = "Leaderboard unavailable right now."):
+        if page is None or not page.users:
+            await interaction.response.send_message(error if page is None else "No more users.", ephemeral=True)
+            return
+
+        self.page = page
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.leaderboard.build_embed(self.guild, page), view=self)
+
+    @discord.ui.button(label="Previous", emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.leaderboard.previous_page(str(self.guild.id), self.page))
+
+    @discord.ui.button(label="Next", emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.leaderboard.next_page(str(self.guild.id), self.page))
+
+    @discord.ui.button(label="My position", emoji="📍", style=discord.ButtonStyle.primary)
+    async def me(self, interaction: discord.Interaction, button: discord.ui.Button):
+        page, error = self.leaderboard.page_for_member(str(self.guild.id), self.page.category, str(interaction.user.id))
+        await self.show(interaction, page, error)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+
+def setup_leaderboard_commands(bot: commands.Bot, leaderboard: LeaderboardModule):
+
+    @bot.command(name='leaderboard')
+    async def leaderboard_command(ctx, category: str = 'all'):
+        category = category.lower()
+        if category == 'week':
+            await ctx.send(embed=leaderboard.progression.get_window_leaderboard_embed(ctx.guild, ROLLUP_SETTINGS['leaderboard_days']))
+            return
+
+        if category not in CATEGORIES:
+            await ctx.send(f"Unknown leaderboard. Valid options: {', '.join(CATEGORIES)}, week")
+            return
+
+        page = leaderboard.first_page(str(ctx.guild.id), category)
+        if page is None:
+            await ctx.send("Leaderboard unavailable right now, please try again shortly.")
+            return
+
+        embed = leaderboard.build_embed(ctx.guild, page)
+        if len(page.users) < leaderboard.settings['page_size']:
+            await ctx.send(embed=embed)
+            return
+
+        view = LeaderboardView(leaderboard, ctx.guild, ctx.author.id, page)
+        view.message = await ctx.send(embed=embed, view=view)
+
+    @bot.command(name='refresh_scores')
+    @commands.has_permissions(administrator=True)
+    async def refresh_scores(ctx):
+        updated = await leaderboard.progression.refresh_scores(str(ctx.guild.id))
+        await ctx.send(f"Recomputed leaderboard scores, {updated} changed.")
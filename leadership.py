@@ -1,9 +1,30 @@
+import logging
 import discord
 from discord.ext import commands
 from database import Database
+from journal import journal
 from config import RANKS
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
+TRANSITION_ERRORS = {
+    'advisor': {
+        'not_found': "User stats not found.",
+        'rank_too_low': "User must be at least Elite rank to become an Advisor.",
+        'slots_full': "Maximum number of Advisors ({max_slots}) already reached.",
+        'already_assigned': "User is already an Advisor.",
+        'not_assigned': "User is not an Advisor."
+    },
+    'ruler': {
+        'not_found': "User stats not found.",
+        'rank_too_low': "User must be at least Elite rank to become a Ruler.",
+        'slots_full': "There can only be one Ruler. Remove the current Ruler first.",
+        'already_assigned': "User is already the Ruler.",
+        'not_assigned': "User is not the Ruler."
+    }
+}
+
 
 class LeadershipModule:
 
@@ -13,28 +34,13 @@ class LeadershipModule:
     async def assign_advisor(self, member: discord.Member) -> tuple[bool, str]:
         user_id = str(member.id)
         guild_id = str(member.guild.id)
-
-        current_advisors = Database.get_leadership_roles(guild_id, 'advisor')
         max_advisors = RANKS[6].get('max_slots', 4)
 
-        if len(current_advisors) >= max_advisors:
-            return False, f"Maximum number of Advisors ({max_advisors}) already reached."
+        outcome = Database.transition_rank(user_id, guild_id, 'assign_advisor', max_slots=max_advisors)
+        if not outcome['ok']:
+            return False, TRANSITION_ERRORS['advisor'].get(outcome['error'], "Failed to assign Advisor role in database.").format(max_slots=max_advisors)
 
-        user_stats = Database.get_user_stats(user_id, guild_id)
-        if not user_stats:
-            return False, "User stats not found."
-
-        if user_stats.get('rank', 1) < 5:
-            return False, "User must be at least Elite rank to become an Advisor."
-
-        success = Database.assign_leadership_role(user_id, guild_id, 'advisor')
-        if not success:
-            return False, "Failed to assign Advisor role in database."
-
-        Database.update_user_stats(user_id, guild_id, {
-            'rank': 6,
-            'is_immune_to_decay': True
-        })
+        journal.record_rank(guild_id, user_id, 6)
 
         await self.update_leadership_discord_role(member, 6)
 
@@ -44,26 +50,11 @@ class LeadershipModule:
         user_id = str(member.id)
         guild_id = str(member.guild.id)
 
-        current_rulers = Database.get_leadership_roles(guild_id, 'ruler')
-
-        if len(current_rulers) >= 1:
-            return False, "There can only be one Ruler. Remove the current Ruler first."
+        outcome = Database.transition_rank(user_id, guild_id, 'assign_ruler', max_slots=RANKS[7].get('max_slots', 1))
+        if not outcome['ok']:
+            return False, TRANSITION_ERRORS['ruler'].get(outcome['error'], "Failed to assign Ruler role in database.")
 
-        user_stats = Database.get_user_stats(user_id, guild_id)
-        if not user_stats:
-            return False, "User stats not found."
-
-        if user_stats.get('rank', 1) < 5:
-            return False, "User must be at least Elite rank to become a Ruler."
-
-        success = Database.assign_leadership_role(user_id, guild_id, 'ruler')
-        if not success:
-            return False, "Failed to assign Ruler role in database."
-
-        Database.update_user_stats(user_id, guild_id, {
-            'rank': 7,
-            'is_immune_to_decay': True
-        })
+        journal.record_rank(guild_id, user_id, 7)
 
         await self.update_leadership_discord_role(member, 7)
 
@@ -73,13 +64,11 @@ class LeadershipModule:
         user_id = str(member.id)
         guild_id = str(member.guild.id)
 
-        success = Database.remove_leadership_role(user_id, guild_id, 'advisor')
-        if not success:
-            return False, "Failed to remove Advisor role."
+        outcome = Database.transition_rank(user_id, guild_id, 'remove_advisor')
+        if not outcome['ok']:
+            return False, TRANSITION_ERRORS['advisor'].get(outcome['error'], "Failed to remove Advisor role.")
 
-        Database.update_user_stats(user_id, guild_id, {
-            'rank': 5
-        })
+        journal.record_rank(guild_id, user_id, 5)
 
         await self.update_leadership_discord_role(member, 5)
 
@@ -89,13 +78,11 @@ class LeadershipModule:
         user_id = str(member.id)
         guild_id = str(member.guild.id)
 
-        success = Database.remove_leadership_role(user_id, guild_id, 'ruler')
-        if not success:
-            return False, "Failed to remove Ruler role."
+        outcome = Database.transition_rank(user_id, guild_id, 'remove_ruler')
+        if not outcome['ok']:
+            return False, TRANSITION_ERRORS['ruler'].get(outcome['error'], "Failed to remove Ruler role.")
 
-        Database.update_user_stats(user_id, guild_id, {
-            'rank': 5
-        })
+        journal.record_rank(guild_id, user_id, 5)
 
         await self.update_leadership_discord_role(member, 5)
 
@@ -112,7 +99,7 @@ class LeadershipModule:
                         mentionable=True
                     )
                 except discord.Forbidden:
-                    print(f"Missing permissions to create role in {member.guild.name}")
+                    logger.warning("Missing permissions to create role in %s", member.guild.name, extra={'guild': member.guild.id})
                     continue
 
             if role:
@@ -124,7 +111,7 @@ class LeadershipModule:
                         if role in member.roles:
                             await member.remove_roles(role)
                 except discord.Forbidden:
-                    print(f"Missing permissions to update roles in {member.guild.name}")
+                    logger.warning("Missing permissions to update roles in %s", member.guild.name, extra={'guild': member.guild.id})
 
     async def validate_promotion(self, validator: discord.Member, target: discord.Member) -> tuple[bool, str]:
         validator_id = str(validator.id)
@@ -139,6 +126,8 @@ class LeadershipModule:
         if not success:
             return False, "Failed to add validation."
 
+        journal.record_increments(guild_id, target_id, {'advisor_validations': 1})
+
         return True, f"Validation added for {target.display_name}!"
 
     def get_leadership_embed(self, guild: discord.Guild) -> discord.Embed:
@@ -0,0 +1,122 @@
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from config import LOGGING_SETTINGS
+from typing import Any, Dict, Optional, Tuple
+
+STRUCTURED_FIELDS = ('op', 'guild', 'user', 'duration_ms', 'suppressed')
+
+
+class DedupFilter(logging.Filter):
+
+    def __init__(self, window_seconds: float, max_keys: int):
+        super().__init__()
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self.seen: Dict[Tuple[str, int, Any, Any], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+
+        key = (record.name, record.levelno, record.msg, getattr(record, 'op', None))
+        now = time.monotonic()
+        entry = self.seen.get(key)
+
+        if entry is not None and now - entry[0] < self.window:
+            entry[1] += 1
+            return False
+
+        if entry is not None and entry[1]:
+            record.suppressed = entry[1]
+
+        if entry is None and len(self.seen) >= self.max_keys:
+            self.seen = {k: v for k, v in self.seen.items() if now - v[0] < self.window}
+        self.seen[key] = [now, 0]
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+
+    def __init__(self, as_json: bool = False):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {name: getattr(record, name) for name in STRUCTURED_FIELDS if getattr(record, name, None) is not None}
+        message = record.getMessage()
+        exc = record.exc_text or (self.formatException(record.exc_info) if record.exc_info else None)
+
+        if self.as_json:
+            entry = {
+                'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+                'level': record.levelname,
+                'logger': record.name,
+                'msg': message,
+                **fields
+            }
+            if exc:
+                entry['exc'] = exc
+            return json.dumps(entry, default=str)
+
+        line = f"{self.formatTime(record, '%Y-%m-%d %H:%M:%S')} {record.levelname:<8} {record.name}: {message}"
+        if fields:
+            line += ' ' + ' '.join(f"{name}={value}" for name, value in fields.items())
+        if exc:
+            line += '\n' + exc
+        return line
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(settings: Dict[str, Any] = LOGGING_SETTINGS) -> logging.handlers.QueueListener:
+    global listener
+    if listener is not None:
+        return listener
+
+    formatter = StructuredFormatter(settings['json'])
+    handlers = [logging.StreamHandler()]
+    if settings['file']:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            settings['file'],
+            maxBytes=settings['file_max_bytes'],
+            backupCount=settings['file_backups'],
+            encoding='utf-8'
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(DedupFilter(settings['dedup_window_seconds'], settings['dedup_max_keys']))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(settings['level'])
+    logging.getLogger('discord').setLevel(settings['discord_level'])
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def shutdown_logging():
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
@@ -0,0 +1,67 @@
+import time
+from array import array
+from config import MESSAGE_RATE_SETTINGS
+from metrics import metrics
+from typing import Dict, Hashable, List, Optional
+
+CREDITED_MESSAGES = metrics.counter('messages_total', result='credited')
+UNCREDITED_MESSAGES = metrics.counter('messages_total', result='uncredited')
+
+
+class MessageRateLimiter:
+
+    def __init__(self, settings: Dict = MESSAGE_RATE_SETTINGS):
+        self.rate = settings['messages_per_minute'] / 60
+        self.burst = float(settings['burst'])
+        self.max_users = settings['max_users']
+        self.probes = settings['eviction_probes']
+
+        self.tokens = array('d', bytes(8 * self.max_users))
+        self.updated = array('d', bytes(8 * self.max_users))
+        self.owners: List[Optional[Hashable]] = [None] * self.max_users
+        self.slots: Dict[Hashable, int] = {}
+        self.hand = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def refilled(self, slot: int, now: float) -> float:
+        return min(self.burst, self.tokens[slot] + (now - self.updated[slot]) * self.rate)
+
+    def assign(self, key: Hashable, now: float) -> int:
+        for _ in range(self.probes):
+            slot = self.hand
+            self.hand = (slot + 1) % self.max_users
+            if self.owners[slot] is None or self.refilled(slot, now) >= self.burst:
+                break
+
+        owner = self.owners[slot]
+        if owner is not None:
+            del self.slots[owner]
+        self.owners[slot] = key
+        self.slots[key] = slot
+        self.tokens[slot] = self.burst
+        self.updated[slot] = now
+        return slot
+
+    def allow(self, key: Hashable, now: Optional[float] = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.assign(key, now)
+
+        updated = self.updated
+        tokens = self.tokens[slot] + (now - updated[slot]) * self.rate
+        if tokens > self.burst:
+            tokens = self.burst
+        updated[slot] = now
+        if tokens < 1:
+            self.tokens[slot] = tokens
+            UNCREDITED_MESSAGES.inc()
+            return False
+
+        self.tokens[slot] = tokens - 1
+        CREDITED_MESSAGES.inc()
+        return True
@@ -0,0 +1,231 @@
+import logging
+import bisect
+import functools
+import inspect
+import time
+from collections import deque
+from aiohttp import web
+from config import METRICS_SETTINGS
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Timer:
+    __slots__ = ('labels', 'buckets', 'total', 'count', 'errors')
+
+    def __init__(self, labels: Labels):
+        self.labels = labels
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+
+class Counter:
+    __slots__ = ('labels', 'value')
+
+    def __init__(self, labels: Labels):
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class CacheCounter:
+    __slots__ = ('hits', 'misses')
+
+    def __init__(self, hits: Counter, misses: Counter):
+        self.hits = hits
+        self.misses = misses
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits.value += 1
+        else:
+            self.misses.value += 1
+
+
+class Metrics:
+
+    def __init__(self, settings: Dict[str, Any] = METRICS_SETTINGS):
+        self.settings = settings
+        self.timers: Dict[Labels, Timer] = {}
+        self.counters: Dict[str, Dict[Labels, Counter]] = {}
+        self.gauges: Dict[str, Dict[Labels, Callable[[], float]]] = {}
+        self.slow_threshold = settings['slow_call_ms'] / 1000
+        self.slow_calls = deque(maxlen=settings['slow_call_samples'])
+        self.runner: Optional[web.AppRunner] = None
+
+    def timer(self, kind: str, name: str) -> Timer:
+        labels = (('kind', kind), ('name', name))
+        timer = self.timers.get(labels)
+        if timer is None:
+            timer = self.timers[labels] = Timer(labels)
+        return timer
+
+    def observe(self, timer: Timer, seconds: float, failed: bool = False):
+        timer.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        timer.total += seconds
+        timer.count += 1
+        if failed:
+            timer.errors += 1
+        if seconds >= self.slow_threshold:
+            self.slow_calls.append((time.time(), timer.labels[0][1], timer.labels[1][1], seconds, failed))
+            logger.warning("Slow %s call", timer.labels[0][1], extra={'op': timer.labels[1][1], 'duration_ms': round(seconds * 1000, 1)})
+
+    def counter(self, name: str, **labels: str) -> Counter:
+        key = tuple(sorted(labels.items()))
+        family = self.counters.setdefault(name, {})
+        counter = family.get(key)
+        if counter is None:
+            counter = family[key] = Counter(key)
+        return counter
+
+    def cache(self, cache: str) -> CacheCounter:
+        return CacheCounter(
+            self.counter('cache_requests_total', cache=cache, result='hit'),
+            self.counter('cache_requests_total', cache=cache, result='miss')
+        )
+
+    def gauge(self, name: str, read: Callable[[], float], **labels: str):
+        self.gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = read
+
+    def wrap(self, kind: str, name: str, func: Callable) -> Callable:
+        timer = self.timer(kind, name)
+        observe = self.observe
+        perf_counter = time.perf_counter
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed_async(*args, **kwargs):
+                start = perf_counter()
+                failed = True
+                try:
+                    result = await func(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    observe(timer, perf_counter() - start, failed)
+            return timed_async
+
+        @functools.wraps(func)
+        def timed_sync(*args, **kwargs):
+            start = perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                observe(timer, perf_counter() - start, failed)
+        return timed_sync
+
+    def instrument_class(self, cls: type, kind: str):
+        for name, attribute in list(vars(cls).items()):
+            if isinstance(attribute, staticmethod) and not name.startswith('_'):
+                setattr(cls, name, staticmethod(self.wrap(kind, name, attribute.__func__)))
+
+    def instrument_bot(self, bot):
+        for name, attribute in list(vars(bot).items()):
+            if name.startswith('on_') and inspect.iscoroutinefunction(attribute):
+                setattr(bot, name, self.wrap('event', name, attribute))
+
+        async def before_command(ctx):
+            ctx.metrics_started = time.perf_counter()
+
+        async def after_command(ctx):
+            start = getattr(ctx, 'metrics_started', None)
+            if start is not None and ctx.command is not None:
+                self.observe(self.timer('command', ctx.command.qualified_name), time.perf_counter() - start, ctx.command_failed)
+
+        bot.before_invoke(before_command)
+        bot.after_invoke(after_command)
+
+    def render(self) -> str:
+        lines: List[str] = [
+            '# HELP bot_call_seconds Time spent in database calls, event handlers and commands.',
+            '# TYPE bot_call_seconds histogram'
+        ]
+        for timer in self.timers.values():
+            cumulative = 0
+            for bound, count in zip(BUCKETS, timer.buckets):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"bot_call_seconds_bucket{format_labels(timer.labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"bot_call_seconds_bucket{format_labels(timer.labels, le)} {timer.count}")
+            lines.append(f"bot_call_seconds_sum{format_labels(timer.labels)} {timer.total}")
+            lines.append(f"bot_call_seconds_count{format_labels(timer.labels)} {timer.count}")
+
+        lines.append('# TYPE bot_call_errors_total counter')
+        for timer in self.timers.values():
+            lines.append(f"bot_call_errors_total{format_labels(timer.labels)} {timer.errors}")
+
+        for name, family in self.counters.items():
+            lines.append(f'# TYPE bot_{name} counter')
+            for labels, counter in family.items():
+                lines.append(f"bot_{name}{format_labels(labels)} {counter.value}")
+
+        for name, family in self.gauges.items():
+            lines.append(f'# TYPE bot_{name} gauge')
+            for labels, read in family.items():
+                try:
+                    value = read()
+                except Exception as e:
+                    logger.error("Error reading gauge %s: %s", name, e, extra={'op': 'render'})
+                    continue
+                lines.append(f"bot_{name}{format_labels(labels)} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+    def render_slow_calls(self) -> str:
+        lines = [f"# calls slower than {self.settings['slow_call_ms']}ms, most recent last"]
+        for recorded_at, kind, name, seconds, failed in self.slow_calls:
+            stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(recorded_at))
+            lines.append(f"{stamp} {kind} {name} {seconds * 1000:.1f}ms{' failed' if failed else ''}")
+        return '\n'.join(lines) + '\n'
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type='text/plain')
+
+    async def handle_slow_calls(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render_slow_calls(), content_type='text/plain')
+
+    async def start_server(self):
+        if not self.settings['enabled'] or self.runner is not None:
+            return
+
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        app.router.add_get('/slow', self.handle_slow_calls)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, self.settings['host'], self.settings['port']).start()
+            logger.info("Metrics available on http://%s:%s/metrics", self.settings['host'], self.settings['port'])
+        except OSError as e:
+            logger.error("Could not start metrics server: %s", e)
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def stop_server(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+metrics = Metrics()
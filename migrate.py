@@ -0,0 +1,115 @@
+import hashlib
+import os
+import re
+import sys
+from config import MIGRATION_SETTINGS
+from typing import Dict, List, Optional
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+
+class Migration:
+
+    def __init__(self, version: str, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, encoding='utf-8') as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode('utf-8')).hexdigest()
+
+
+def load_migrations(directory: str = MIGRATION_SETTINGS['directory']) -> List[Migration]:
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(directory, filename)))
+
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def connect(database_url: Optional[str] = None):
+    if psycopg is None:
+        raise RuntimeError("psycopg is required to run migrations: pip install 'psycopg[binary]'")
+
+    database_url = database_url or os.getenv('DATABASE_URL')
+    if not database_url:
+        raise RuntimeError("Set DATABASE_URL to the Postgres connection string (Supabase: Settings > Database)")
+    return psycopg.connect(database_url, autocommit=True)
+
+
+def ensure_migrations_table(conn, table: str = MIGRATION_SETTINGS['table']):
+    with conn.transaction():
+        conn.execute(
+            f"create table if not exists {table} ("
+            "version text primary key, "
+            "name text not null, "
+            "checksum text not null, "
+            "applied_at timestamptz not null default now())"
+        )
+
+
+def applied_migrations(conn, table: str = MIGRATION_SETTINGS['table']) -> Dict[str, str]:
+    return dict(conn.execute(f"select version, checksum from {table}").fetchall())
+
+
+def pending_migrations(conn, migrations: List[Migration], target: Optional[str] = None, table: str = MIGRATION_SETTINGS['table']) -> List[Migration]:
+    applied = applied_migrations(conn, table)
+
+    pending = []
+    for migration in migrations:
+        if target is not None and migration.version > target:
+            break
+        checksum = applied.get(migration.version)
+        if checksum is None:
+            pending.append(migration)
+        elif checksum != migration.checksum:
+            raise ValueError(f"Migration {migration.version}_{migration.name} was edited after it was applied")
+    return pending
+
+
+def migrate(conn, migrations: List[Migration], target: Optional[str] = None, table: str = MIGRATION_SETTINGS['table']) -> List[Migration]:
+    ensure_migrations_table(conn, table)
+    pending = pending_migrations(conn, migrations, target, table)
+
+    for migration in pending:
+        with conn.transaction():
+            conn.execute(migration.sql)
+            conn.execute(
+                f"insert into {table} (version, name, checksum) values (%s, %s, %s)",
+                (migration.version, migration.name, migration.checksum)
+            )
+
+    return pending
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('up', 'status'):
+        print("Usage: python migrate.py up [target_version] | status")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    target_version = sys.argv[2] if len(sys.argv) > 2 else None
+
+    migrations = load_migrations()
+    with connect() as connection:
+        if command == 'status':
+            ensure_migrations_table(connection)
+            applied = applied_migrations(connection)
+            for migration in migrations:
+                state = 'applied' if migration.version in applied else 'pending'
+                print(f"{migration.version}_{migration.name}: {state}")
+        else:
+            applied = migrate(connection, migrations, target_version)
+            for migration in applied:
+                print(f"Applied {migration.version}_{migration.name}")
+            print(f"{len(applied)} migration(s) applied")
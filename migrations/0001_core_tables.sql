@@ -0,0 +1,47 @@
+create table if not exists user_stats (
+    id bigint generated always as identity primary key,
+    guild_id text not null,
+    discord_user_id text not null,
+    discord_username text not null,
+    rank smallint not null default 1 check (rank between 1 and 7),
+    elite_type text,
+    voice_time_seconds bigint not null default 0,
+    message_count integer not null default 0,
+    invite_count integer not null default 0,
+    reaction_count integer not null default 0,
+    subject_posts integer not null default 0,
+    subject_reactions integer not null default 0,
+    voice_sessions_hosted integer not null default 0,
+    videos_shared integer not null default 0,
+    advisor_validations integer not null default 0,
+    wants_to_contribute boolean not null default false,
+    is_immune_to_decay boolean not null default false,
+    last_activity timestamptz not null default now(),
+    created_at timestamptz not null default now()
+);
+
+create unique index if not exists user_stats_guild_user_key
+    on user_stats (guild_id, discord_user_id);
+
+create table if not exists promotion_requests (
+    id uuid primary key default gen_random_uuid(),
+    guild_id text not null,
+    discord_user_id text not null,
+    current_rank smallint not null,
+    target_rank smallint not null,
+    validations_received integer not null default 0,
+    validations_needed integer not null default 0,
+    status text not null default 'pending' check (status in ('pending', 'approved', 'rejected')),
+    created_at timestamptz not null default now()
+);
+
+create table if not exists leadership_roles (
+    id uuid primary key default gen_random_uuid(),
+    guild_id text not null,
+    discord_user_id text not null,
+    role_type text not null check (role_type in ('advisor', 'ruler')),
+    assigned_at timestamptz not null default now()
+);
+
+create unique index if not exists leadership_roles_guild_role_user_key
+    on leadership_roles (guild_id, role_type, discord_user_id);
@@ -0,0 +1,20 @@
+create table if not exists activity_daily (
+    guild_id text not null,
+    discord_user_id text not null,
+    day date not null,
+    voice_time_seconds bigint not null default 0,
+    message_count integer not null default 0,
+    invite_count integer not null default 0,
+    reaction_count integer not null default 0,
+    subject_posts integer not null default 0,
+    subject_reactions integer not null default 0,
+    voice_sessions_hosted integer not null default 0,
+    videos_shared integer not null default 0,
+    primary key (guild_id, discord_user_id, day)
+);
+
+create table if not exists guild_config (
+    guild_id text primary key,
+    overrides jsonb not null default '{}'::jsonb,
+    updated_at timestamptz not null default now()
+);
@@ -0,0 +1,111 @@
+create table if not exists rank_history (
+    id bigint generated always as identity primary key,
+    guild_id text not null,
+    discord_user_id text not null,
+    action text not null,
+    from_rank integer not null,
+    to_rank integer not null,
+    elite_type text,
+    created_at timestamptz not null default now()
+);
+
+create or replace function transition_rank(
+    p_guild_id text,
+    p_user_id text,
+    p_action text,
+    p_to_rank integer default null,
+    p_expected_rank integer default null,
+    p_elite_type text default null,
+    p_max_slots integer default null
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_stats user_stats%rowtype;
+    v_role text;
+    v_to_rank integer;
+    v_holders integer;
+begin
+    select * into v_stats
+    from user_stats
+    where guild_id = p_guild_id and discord_user_id = p_user_id
+    for update;
+
+    if not found then
+        return jsonb_build_object('ok', false, 'error', 'not_found');
+    end if;
+
+    if p_expected_rank is not null and v_stats.rank <> p_expected_rank then
+        return jsonb_build_object('ok', false, 'error', 'wrong_rank', 'rank', v_stats.rank);
+    end if;
+
+    if p_action = 'promote' then
+        v_to_rank := p_to_rank;
+
+    elsif p_action = 'learner' then
+        if not coalesce(v_stats.wants_to_contribute, false) then
+            return jsonb_build_object('ok', false, 'error', 'not_requested', 'rank', v_stats.rank);
+        end if;
+        v_to_rank := 2;
+
+    elsif p_action = 'elite_type' then
+        v_to_rank := v_stats.rank;
+
+    elsif p_action in ('assign_advisor', 'assign_ruler') then
+        v_role := substr(p_action, 8);
+        v_to_rank := case v_role when 'advisor' then 6 else 7 end;
+
+        if v_stats.rank < 5 then
+            return jsonb_build_object('ok', false, 'error', 'rank_too_low', 'rank', v_stats.rank);
+        end if;
+
+        perform pg_advisory_xact_lock(hashtext(p_guild_id || ':' || v_role));
+
+        if exists (
+            select 1 from leadership_roles
+            where guild_id = p_guild_id and discord_user_id = p_user_id and role_type = v_role
+        ) then
+            return jsonb_build_object('ok', false, 'error', 'already_assigned', 'rank', v_stats.rank);
+        end if;
+
+        select count(*) into v_holders
+        from leadership_roles
+        where guild_id = p_guild_id and role_type = v_role;
+
+        if p_max_slots is not null and v_holders >= p_max_slots then
+            return jsonb_build_object('ok', false, 'error', 'slots_full', 'rank', v_stats.rank);
+        end if;
+
+        delete from leadership_roles
+        where guild_id = p_guild_id and discord_user_id = p_user_id;
+
+        insert into leadership_roles (discord_user_id, guild_id, role_type)
+        values (p_user_id, p_guild_id, v_role);
+
+    elsif p_action in ('remove_advisor', 'remove_ruler') then
+        v_role := substr(p_action, 8);
+        v_to_rank := 5;
+
+        delete from leadership_roles
+        where guild_id = p_guild_id and discord_user_id = p_user_id and role_type = v_role;
+
+        if not found then
+            return jsonb_build_object('ok', false, 'error', 'not_assigned', 'rank', v_stats.rank);
+        end if;
+
+    else
+        return jsonb_build_object('ok', false, 'error', 'unknown_action', 'rank', v_stats.rank);
+    end if;
+
+    update user_stats
+    set rank = v_to_rank,
+        elite_type = coalesce(p_elite_type, elite_type),
+        is_immune_to_decay = is_immune_to_decay or v_to_rank >= 5
+    where guild_id = p_guild_id and discord_user_id = p_user_id;
+
+    insert into rank_history (guild_id, discord_user_id, action, from_rank, to_rank, elite_type)
+    values (p_guild_id, p_user_id, p_action, v_stats.rank, v_to_rank, p_elite_type);
+
+    return jsonb_build_object('ok', true, 'from_rank', v_stats.rank, 'rank', v_to_rank);
+end;
+$$;
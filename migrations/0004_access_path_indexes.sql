@@ -0,0 +1,22 @@
+create index if not exists user_stats_guild_rank_idx
+    on user_stats (guild_id, rank);
+
+create index if not exists user_stats_guild_inactive_idx
+    on user_stats (guild_id, last_activity, discord_user_id)
+    where not is_immune_to_decay;
+
+create index if not exists promotion_requests_guild_status_idx
+    on promotion_requests (guild_id, status);
+
+create unique index if not exists promotion_requests_pending_key
+    on promotion_requests (guild_id, discord_user_id)
+    where status = 'pending';
+
+create index if not exists leadership_roles_guild_user_idx
+    on leadership_roles (guild_id, discord_user_id);
+
+create index if not exists activity_daily_guild_day_idx
+    on activity_daily (guild_id, day, discord_user_id);
+
+create index if not exists rank_history_guild_user_idx
+    on rank_history (guild_id, discord_user_id, created_at);
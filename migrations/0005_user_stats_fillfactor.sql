@@ -0,0 +1 @@
+alter table user_stats set (fillfactor = 85);
@@ -0,0 +1,13 @@
+alter table user_stats add column if not exists score double precision not null default 0;
+
+create index if not exists user_stats_guild_score_idx
+    on user_stats (guild_id, score desc, discord_user_id);
+
+create index if not exists user_stats_guild_voice_idx
+    on user_stats (guild_id, voice_time_seconds desc, discord_user_id);
+
+create index if not exists user_stats_guild_messages_idx
+    on user_stats (guild_id, message_count desc, discord_user_id);
+
+create index if not exists user_stats_guild_invites_idx
+    on user_stats (guild_id, invite_count desc, discord_user_id);
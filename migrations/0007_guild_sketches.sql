@@ -0,0 +1,9 @@
+create table if not exists guild_sketches (
+    guild_id text not null,
+    stat text not null,
+    member_count integer not null default 0,
+    sketch jsonb not null,
+    built_at timestamptz not null,
+    updated_at timestamptz not null default now(),
+    primary key (guild_id, stat)
+);
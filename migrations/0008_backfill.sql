@@ -0,0 +1,61 @@
+create table if not exists backfill_runs (
+    guild_id text primary key,
+    state jsonb not null,
+    finished boolean not null default false,
+    updated_at timestamptz not null default now()
+);
+
+create or replace function apply_backfill(
+    p_guild_id text,
+    p_rows jsonb,
+    p_state jsonb,
+    p_finished boolean default false
+) returns integer
+language plpgsql
+as $$
+declare
+    v_written integer;
+begin
+    insert into user_stats as s (
+        guild_id, discord_user_id, discord_username, message_count, reaction_count,
+        subject_posts, subject_reactions, videos_shared, last_activity
+    )
+    select
+        p_guild_id,
+        r.discord_user_id,
+        r.discord_username,
+        coalesce(r.message_count, 0),
+        coalesce(r.reaction_count, 0),
+        coalesce(r.subject_posts, 0),
+        coalesce(r.subject_reactions, 0),
+        coalesce(r.videos_shared, 0),
+        coalesce(r.last_activity, now())
+    from jsonb_to_recordset(p_rows) as r(
+        discord_user_id text,
+        discord_username text,
+        message_count integer,
+        reaction_count integer,
+        subject_posts integer,
+        subject_reactions integer,
+        videos_shared integer,
+        last_activity timestamptz
+    )
+    on conflict (guild_id, discord_user_id) do update
+    set message_count = s.message_count + excluded.message_count,
+        reaction_count = s.reaction_count + excluded.reaction_count,
+        subject_posts = s.subject_posts + excluded.subject_posts,
+        subject_reactions = s.subject_reactions + excluded.subject_reactions,
+        videos_shared = s.videos_shared + excluded.videos_shared;
+
+    get diagnostics v_written = row_count;
+
+    insert into backfill_runs (guild_id, state, finished, updated_at)
+    values (p_guild_id, p_state, p_finished, now())
+    on conflict (guild_id) do update
+    set state = excluded.state,
+        finished = excluded.finished,
+        updated_at = excluded.updated_at;
+
+    return v_written;
+end;
+$$;
@@ -0,0 +1,22 @@
+create or replace function demote_many(
+    p_guild_id text,
+    p_user_ids text[],
+    p_from_rank integer,
+    p_to_rank integer
+) returns table (discord_user_id text)
+language sql
+as $$
+    with demoted as (
+        update user_stats
+        set rank = p_to_rank
+        where guild_id = p_guild_id
+          and user_stats.discord_user_id = any(p_user_ids)
+          and rank = p_from_rank
+        returning user_stats.discord_user_id
+    ), history as (
+        insert into rank_history (guild_id, discord_user_id, action, from_rank, to_rank)
+        select p_guild_id, demoted.discord_user_id, 'demote', p_from_rank, p_to_rank
+        from demoted
+    )
+    select demoted.discord_user_id from demoted;
+$$;
@@ -0,0 +1,38 @@
+create or replace function apply_activity(
+    p_guild_id text,
+    p_rows jsonb
+) returns table (discord_user_id text)
+language sql
+as $$
+    update user_stats as s
+    set discord_username = coalesce(r.discord_username, s.discord_username),
+        voice_time_seconds = coalesce(r.voice_time_seconds, s.voice_time_seconds),
+        message_count = coalesce(r.message_count, s.message_count),
+        invite_count = coalesce(r.invite_count, s.invite_count),
+        reaction_count = coalesce(r.reaction_count, s.reaction_count),
+        subject_posts = coalesce(r.subject_posts, s.subject_posts),
+        subject_reactions = coalesce(r.subject_reactions, s.subject_reactions),
+        voice_sessions_hosted = coalesce(r.voice_sessions_hosted, s.voice_sessions_hosted),
+        videos_shared = coalesce(r.videos_shared, s.videos_shared),
+        advisor_validations = coalesce(r.advisor_validations, s.advisor_validations),
+        last_activity = coalesce(r.last_activity, s.last_activity),
+        score = coalesce(r.score, s.score)
+    from jsonb_to_recordset(p_rows) as r(
+        discord_user_id text,
+        discord_username text,
+        voice_time_seconds bigint,
+        message_count integer,
+        invite_count integer,
+        reaction_count integer,
+        subject_posts integer,
+        subject_reactions integer,
+        voice_sessions_hosted integer,
+        videos_shared integer,
+        advisor_validations integer,
+        last_activity timestamptz,
+        score double precision
+    )
+    where s.guild_id = p_guild_id
+      and s.discord_user_id = r.discord_user_id
+    returning s.discord_user_id;
+$$;
@@ -1,45 +1,136 @@
+import logging
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from database import Database
-from config import RANKS
-from typing import Optional
+from journal import journal
+from dispatch import NotificationDispatcher, RateLimitedQueue
+from stat_buffer import StatBuffer
+from config import RANKS, ONBOARDING_SETTINGS
+from guild_config import GuildConfig, guild_configs
+from metrics import metrics
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RANK_ROLE_CACHE = metrics.cache('rank_roles')
+WELCOME_CHANNEL_CACHE = metrics.cache('welcome_channel')
 
 
 class OnboardingModule:
 
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, dispatcher: NotificationDispatcher, stat_buffer: StatBuffer, role_updates: RateLimitedQueue):
         self.bot = bot
+        self.dispatcher = dispatcher
+        self.stat_buffer = stat_buffer
+        self.role_updates = role_updates
+        self.pending_joins: Dict[int, List[discord.Member]] = {}
+        self.guild_invites: Dict[int, Dict[str, Tuple[int, Optional[discord.abc.User]]]] = {}
+        self.rank_roles: Dict[Tuple[int, int], int] = {}
 
-    async def welcome_member(self, member: discord.Member):
-        user_stats = Database.get_user_stats(str(member.id), str(member.guild.id))
+    def start_tasks(self):
+        self.join_flush_task.start()
 
-        if not user_stats:
-            Database.create_user_stats(str(member.id), member.name, str(member.guild.id))
+    def cog_unload(self):
+        self.join_flush_task.cancel()
 
-        await self.assign_viewer_role(member)
+    def enqueue_join(self, member: discord.Member):
+        self.pending_joins.setdefault(member.guild.id, []).append(member)
 
-        welcome_channel = self.get_welcome_channel(member.guild)
-        if welcome_channel:
-            embed = discord.Embed(
-                title=f"Welcome {member.name}!",
-                description=f"You have been assigned the **{RANKS[1]['name']}** rank.\n\n"
-                           f"{RANKS[1]['description']}\n\n"
-                           f"Complete your onboarding and use `!contribute` when ready to become a Learner!",
-                color=RANKS[1]['color']
-            )
-            await welcome_channel.send(embed=embed)
+    @tasks.loop(seconds=ONBOARDING_SETTINGS['burst_window_seconds'])
+    async def join_flush_task(self):
+        pending, self.pending_joins = self.pending_joins, {}
 
-    async def assign_viewer_role(self, member: discord.Member):
-        viewer_role = discord.utils.get(member.guild.roles, name=RANKS[1]['name'])
+        for members in pending.values():
+            guild = members[0].guild
+            try:
+                await self.process_joins(guild, members)
+            except Exception:
+                logger.exception("Failed to process %d joins", len(members), extra={'op': 'process_joins', 'guild': str(guild.id)})
+
+    @join_flush_task.before_loop
+    async def before_join_flush_task(self):
+        await self.bot.wait_until_ready()
+
+    async def process_joins(self, guild: discord.Guild, members: List[discord.Member]):
+        Database.create_user_stats_many(str(guild.id), [(str(m.id), m.name) for m in members])
+
+        viewer_role = await self.get_rank_role(guild, 1)
+        if viewer_role:
+            for member in members:
+                if viewer_role not in member.roles:
+                    await self.role_updates.put(partial(member.add_roles, viewer_role))
+
+        self.send_welcomes(guild, members)
+
+        await self.track_invites(guild)
+
+    def build_welcome_embed(self, title: str) -> discord.Embed:
+        return discord.Embed(
+            title=title,
+            description=f"You have been assigned the **{RANKS[1]['name']}** rank.\n\n"
+                       f"{RANKS[1]['description']}\n\n"
+                       f"Complete your onboarding and use `!contribute` when ready to become a Learner!",
+            color=RANKS[1]['color']
+        )
 
-        if not viewer_role:
-            viewer_role = await self.create_rank_role(member.guild, 1)
+    def send_welcomes(self, guild: discord.Guild, members: List[discord.Member]):
+        welcome_channel = self.get_welcome_channel(guild)
+        if not welcome_channel:
+            return
 
-        if viewer_role and viewer_role not in member.roles:
-            try:
-                await member.add_roles(viewer_role)
-            except discord.Forbidden:
-                print(f"Missing permissions to assign role in {member.guild.name}")
+        if len(members) <= ONBOARDING_SETTINGS['individual_welcome_limit']:
+            for member in members:
+                self.dispatcher.send_channel(welcome_channel, self.build_welcome_embed(f"Welcome {member.name}!"))
+            return
+
+        shown = ONBOARDING_SETTINGS['welcome_names_shown']
+        names = ', '.join(member.name for member in members[:shown])
+        others = len(members) - shown
+        title = f"Welcome {names} and {others} others!" if others > 0 else f"Welcome {names}!"
+        self.dispatcher.send_channel(welcome_channel, self.build_welcome_embed(title[:256]))
+
+    async def snapshot_invites(self, guild: discord.Guild):
+        try:
+            invites = await guild.invites()
+        except discord.Forbidden:
+            logger.warning("Cannot fetch invites for %s - missing permissions", guild.name, extra={'guild': guild.id})
+            invites = []
+
+        self.guild_invites[guild.id] = {invite.code: (invite.uses or 0, invite.inviter) for invite in invites}
+
+    async def track_invites(self, guild: discord.Guild):
+        old_invites = self.guild_invites.get(guild.id, {})
+
+        try:
+            new_invites = await guild.invites()
+        except discord.Forbidden:
+            logger.warning("Cannot track invites for %s - missing permissions", guild.name, extra={'guild': guild.id})
+            return
+
+        for invite in new_invites:
+            old_uses = old_invites.get(invite.code, (0, None))[0]
+            used = (invite.uses or 0) - old_uses
+            inviter = invite.inviter
+            if used > 0 and inviter and not inviter.bot:
+                self.stat_buffer.add(str(inviter.id), inviter.name, str(guild.id), 'invite_count', used)
+                logger.info("%s invited %d new members", inviter.name, used, extra={'guild': guild.id, 'user': inviter.id})
+
+        self.guild_invites[guild.id] = {invite.code: (invite.uses or 0, invite.inviter) for invite in new_invites}
+
+    async def get_rank_role(self, guild: discord.Guild, rank: int) -> Optional[discord.Role]:
+        role_id = self.rank_roles.get((guild.id, rank))
+        role = guild.get_role(role_id) if role_id else None
+        RANK_ROLE_CACHE.record(role is not None)
+
+        if not role:
+            role = discord.utils.get(guild.roles, name=RANKS[rank]['name'])
+        if not role:
+            role = await self.create_rank_role(guild, rank)
+
+        if role:
+            self.rank_roles[(guild.id, rank)] = role.id
+        return role
 
     async def create_rank_role(self, guild: discord.Guild, rank: int) -> Optional[discord.Role]:
         rank_info = RANKS.get(rank)
@@ -54,17 +145,40 @@ class OnboardingModule:
             )
             return role
         except discord.Forbidden:
-            print(f"Missing permissions to create role in {guild.name}")
+            logger.warning("Missing permissions to create role in %s", guild.name, extra={'guild': guild.id})
             return None
 
     def get_welcome_channel(self, guild: discord.Guild) -> Optional[discord.TextChannel]:
-        welcome_channels = ['welcome', 'general', 'lobby']
-
-        for channel_name in welcome_channels:
-            channel = discord.utils.get(guild.text_channels, name=channel_name)
-            if channel:
+        config = guild_configs.get(str(guild.id))
+        WELCOME_CHANNEL_CACHE.record(config.welcome_channel_resolved)
+        if config.welcome_channel_resolved:
+            return guild.get_channel(config.welcome_channel_id) if config.welcome_channel_id else None
+
+        channel = self.find_welcome_channel(guild, config)
+        config.welcome_channel_id = channel.id if channel else None
+        config.welcome_channel_resolved = True
+        return channel
+
+    def find_welcome_channel(self, guild: discord.Guild, config: GuildConfig) -> Optional[discord.TextChannel]:
+        channel_id = config.channels['welcome_channel_id']
+        if channel_id:
+            channel = guild.get_channel(int(channel_id))
+            if isinstance(channel, discord.TextChannel):
                 return channel
 
+        preferred = config.channels['welcome_channels']
+        best = None
+        best_index = len(preferred)
+
+        for channel in guild.text_channels:
+            if channel.name in preferred:
+                index = preferred.index(channel.name)
+                if index < best_index:
+                    best, best_index = channel, index
+
+        if best:
+            return best
+
         if guild.text_channels:
             return guild.text_channels[0]
 
@@ -92,26 +206,13 @@ class OnboardingModule:
         user_id = str(member.id)
         guild_id = str(member.guild.id)
 
-        user_stats = Database.get_user_stats(user_id, guild_id)
-
-        if not user_stats:
+        outcome = Database.transition_rank(user_id, guild_id, 'learner', expected_rank=1)
+        if not outcome['ok']:
             return False
-
-        if user_stats['rank'] != 1:
-            return False
-
-        if not user_stats.get('wants_to_contribute', False):
-            return False
-
-        Database.update_user_stats(user_id, guild_id, {
-            'rank': 2
-        })
+        journal.record_rank(guild_id, user_id, 2)
 
         viewer_role = discord.utils.get(member.guild.roles, name=RANKS[1]['name'])
-        learner_role = discord.utils.get(member.guild.roles, name=RANKS[2]['name'])
-
-        if not learner_role:
-            learner_role = await self.create_rank_role(member.guild, 2)
+        learner_role = await self.get_rank_role(member.guild, 2)
 
         try:
             if viewer_role and viewer_role in member.roles:
@@ -119,7 +220,7 @@ class OnboardingModule:
             if learner_role:
                 await member.add_roles(learner_role)
         except discord.Forbidden:
-            print(f"Missing permissions to update roles in {member.guild.name}")
+            logger.warning("Missing permissions to update roles in %s", member.guild.name, extra={'guild': member.guild.id, 'user': member.id})
 
         return True
 
@@ -0,0 +1,184 @@
+import cProfile
+import functools
+import inspect
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from collections import deque
+from discord.ext import commands
+from config import PROFILING_SETTINGS
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileTarget:
+
+    def __init__(self, kind: str, name: str, original: Callable, remaining: int, memory: bool):
+        self.kind = kind
+        self.name = name
+        self.original = original
+        self.remaining = remaining
+        self.memory = memory
+        self.captured = 0
+
+
+class Profiler:
+
+    def __init__(self, bot: commands.Bot, settings: Dict[str, Any] = PROFILING_SETTINGS):
+        self.bot = bot
+        self.settings = settings
+        self.armed: Dict[str, ProfileTarget] = {}
+        self.reports = deque(maxlen=settings['reports_kept'])
+        self.active = False
+        self.started_tracemalloc = False
+
+    def resolve(self, name: str) -> Tuple[Optional[str], Optional[Callable]]:
+        if name.startswith('on_'):
+            handler = getattr(self.bot, name, None)
+            if handler is not None and inspect.iscoroutinefunction(handler):
+                return 'event', handler
+            return None, None
+
+        command = self.bot.get_command(name)
+        if command is None:
+            return None, None
+        return 'command', command.callback
+
+    def install(self, target: ProfileTarget, func: Callable):
+        if target.kind == 'event':
+            setattr(self.bot, target.name, func)
+        else:
+            self.bot.get_command(target.name).callback = func
+
+    def arm(self, name: str, count: int, memory: bool) -> Tuple[bool, str]:
+        if name in self.armed:
+            return False, f"`{name}` is already being profiled ({self.armed[name].remaining} invocations left)."
+
+        count = max(1, min(count, self.settings['max_invocations']))
+        kind, original = self.resolve(name)
+        if kind is None:
+            return False, f"No command or event handler named `{name}`."
+
+        target = ProfileTarget(kind, name, original, count, memory)
+        self.install(target, self.wrap(target))
+        self.armed[name] = target
+
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.settings['tracemalloc_frames'])
+            self.started_tracemalloc = True
+
+        return True, f"Profiling the next {count} invocation(s) of {kind} `{name}`{' with memory tracing' if memory else ''}."
+
+    def disarm(self, name: str) -> bool:
+        target = self.armed.pop(name, None)
+        if target is None:
+            return False
+
+        self.install(target, target.original)
+
+        if self.started_tracemalloc and not any(t.memory for t in self.armed.values()):
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+        return True
+
+    def wrap(self, target: ProfileTarget) -> Callable:
+        original = target.original
+
+        @functools.wraps(original)
+        async def profiled(*args, **kwargs):
+            if self.active or self.armed.get(target.name) is not target:
+                return await original(*args, **kwargs)
+
+            self.active = True
+            snapshot = tracemalloc.take_snapshot() if target.memory and tracemalloc.is_tracing() else None
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                profile.disable()
+                elapsed = time.perf_counter() - start
+                self.active = False
+                target.captured += 1
+                target.remaining -= 1
+                self.save_report(target, profile, snapshot, elapsed)
+                if target.remaining <= 0 and self.armed.get(target.name) is target:
+                    self.disarm(target.name)
+
+        return profiled
+
+    def top_frames(self, stats: pstats.Stats, limit: int) -> List[str]:
+        frames = []
+        for func in stats.sort_stats('tottime').fcn_list[:limit]:
+            calls, _, own_time, cumulative, _ = stats.stats[func]
+            filename, line, name = func
+            frames.append(f"{os.path.basename(filename)}:{line} {name} - {own_time * 1000:.1f}ms own, {cumulative * 1000:.1f}ms total, {calls} calls")
+        return frames
+
+    def save_report(self, target: ProfileTarget, profile: cProfile.Profile, snapshot, elapsed: float):
+        directory = self.settings['directory']
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        base = os.path.join(directory, f"{target.kind}-{target.name}-{stamp}-{target.captured}")
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            profile.dump_stats(base + '.prof')
+
+            output = io.StringIO()
+            stats = pstats.Stats(profile, stream=output)
+            summary = self.top_frames(stats, self.settings['summary_frames'])
+
+            output.write(f"{target.kind} {target.name}: {elapsed * 1000:.1f}ms wall time\n")
+            output.write("Note: time spent awaiting includes other tasks that ran on the event loop meanwhile.\n\n")
+            stats.sort_stats('cumulative').print_stats(self.settings['top_frames'])
+            stats.sort_stats('tottime').print_stats(self.settings['top_frames'])
+
+            if snapshot is not None:
+                output.write("Memory allocated during the call (top lines):\n")
+                for stat in tracemalloc.take_snapshot().compare_to(snapshot, 'lineno')[:self.settings['top_frames']]:
+                    output.write(f"{stat}\n")
+
+            with open(base + '.txt', 'w', encoding='utf-8') as f:
+                f.write(output.getvalue())
+        except OSError as e:
+            logger.error("Could not save profile for %s: %s", target.name, e, extra={'op': 'profile'})
+            return
+
+        self.reports.append((base + '.txt', elapsed, summary))
+        logger.info("Saved profile %s.txt", base, extra={'op': target.name, 'duration_ms': round(elapsed * 1000, 1)})
+
+
+def setup_profiling_commands(bot: commands.Bot, profiler: Profiler):
+
+    @bot.command(name='profile')
+    @commands.has_permissions(administrator=True)
+    async def profile(ctx, name: str, count: int = 1, memory: str = ''):
+        success, message = profiler.arm(name, count, memory.lower() == 'memory')
+        await ctx.send(message if success else f"❌ {message}")
+
+    @bot.command(name='profile_stop')
+    @commands.has_permissions(administrator=True)
+    async def profile_stop(ctx, name: str):
+        if profiler.disarm(name):
+            await ctx.send(f"Stopped profiling `{name}`.")
+        else:
+            await ctx.send(f"❌ `{name}` is not being profiled.")
+
+    @bot.command(name='profile_status')
+    @commands.has_permissions(administrator=True)
+    async def profile_status(ctx):
+        lines = [f"Profiling `{t.name}` ({t.kind}): {t.remaining} left" for t in profiler.armed.values()]
+        if not lines:
+            lines.append("Nothing is being profiled.")
+
+        for path, elapsed, summary in list(profiler.reports)[-3:]:
+            lines.append(f"\n**{os.path.basename(path)}** ({elapsed * 1000:.1f}ms)")
+            lines.extend(f"`{frame}`" for frame in summary)
+
+        await ctx.send('\n'.join(lines)[:2000])
@@ -1,35 +1,93 @@
+import asyncio
+import logging
 import discord
+import heapq
 from discord.ext import commands
-from database import Database
-from config import RANKS, PROMOTION_REQUIREMENTS, SCORING
-from typing import Optional, Dict, Any, List
+from database import Database, stale_notice
+from journal import journal
+from config import RANKS, LEADERBOARD_SETTINGS
+from decay_model import apply_decay_projection
+from guild_config import guild_configs
+from rollups import rollups
+from sketches import sketches
+from topk import top_scores
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
 
 
 class ProgressionModule:
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-
-    def calculate_user_score(self, user_stats: Dict[str, Any]) -> float:
-        voice_hours = user_stats.get('voice_time_seconds', 0) / 3600
-        messages = user_stats.get('message_count', 0)
-        invites = user_stats.get('invite_count', 0)
-        reactions = user_stats.get('reaction_count', 0)
-        videos = user_stats.get('videos_shared', 0)
-        subjects = user_stats.get('subject_posts', 0)
-        sessions = user_stats.get('voice_sessions_hosted', 0)
-
-        score = (
-            voice_hours * SCORING['voice_per_hour'] +
-            messages * SCORING['message_per_count'] +
-            invites * SCORING['invite_per_count'] +
-            reactions * SCORING['reaction_per_count'] +
-            videos * SCORING['video_per_count'] +
-            subjects * SCORING['subject_post_per_count'] +
-            sessions * SCORING['voice_session_hosted']
-        )
-
-        return round(score, 2)
+        self.refresh_tasks: Dict[Optional[str], asyncio.Task] = {}
+
+    def calculate_user_score(self, user_stats: Dict[str, Any], guild_id: Optional[str] = None) -> float:
+        return guild_configs.get(guild_id or user_stats.get('guild_id')).score(user_stats)
+
+    def schedule_refresh(self, guild_id: Optional[str]):
+        task = self.refresh_tasks.get(guild_id)
+        if task is not None and not task.done():
+            task.cancel()
+        self.refresh_tasks[guild_id] = asyncio.create_task(self.refresh_scores(guild_id))
+
+    async def refresh_scores(self, guild_id: Optional[str], users: Optional[List[Dict[str, Any]]] = None) -> int:
+        if guild_id is None:
+            refreshed = 0
+            for guild in self.bot.guilds:
+                refreshed += await self.refresh_scores(str(guild.id))
+            return refreshed
+
+        page_size = LEADERBOARD_SETTINGS['score_refresh_page_size']
+        refreshed = seen = 0
+        if users is not None:
+            for i in range(0, len(users), page_size):
+                refreshed += self.refresh_page(guild_id, users[i:i + page_size])
+                await asyncio.sleep(0)
+            seen = len(users)
+        else:
+            after: Optional[Tuple[str, str]] = None
+            while True:
+                page = Database.get_user_stats_page(after, guild_id, page_size)
+                if page is None:
+                    break
+                refreshed += self.refresh_page(guild_id, [apply_decay_projection(row) for row in page])
+                seen += len(page)
+                if len(page) < page_size:
+                    break
+                after = (guild_id, page[-1]['discord_user_id'])
+                await asyncio.sleep(0)
+
+        if refreshed:
+            logger.info("Refreshed %d of %d scores", refreshed, seen, extra={'op': 'refresh_scores', 'guild': guild_id})
+        return refreshed
+
+    def refresh_page(self, guild_id: str, users: List[Dict[str, Any]]) -> int:
+        config = guild_configs.get(guild_id)
+        rows, previous = [], {}
+        for user in users:
+            score = config.score(user)
+            if score != user.get('score'):
+                previous[user['discord_user_id']] = user
+                rows.append({
+                    'guild_id': guild_id,
+                    'discord_user_id': user['discord_user_id'],
+                    'discord_username': user['discord_username'],
+                    'score': score
+                })
+
+        written = Database.upsert_user_stats_many(guild_id, rows)
+        by_id = {row['discord_user_id']: row for row in rows}
+        for user_id in written:
+            sketches.observe(guild_id, previous[user_id], by_id[user_id])
+            top_scores.observe(guild_id, previous[user_id], by_id[user_id])
+        return len(written)
+
+    def get_standing(self, guild_id: str, score: float) -> Optional[str]:
+        top = sketches.top_percent(guild_id, 'score', score)
+        if top is None:
+            return None
+        return f"Top {top}% of {sketches.get(guild_id, 'score').count:,} members"
 
     def check_promotion_eligibility(self, user_stats: Dict[str, Any]) -> tuple[bool, int, Dict[str, Any]]:
         current_rank = user_stats.get('rank', 1)
@@ -38,7 +96,7 @@ class ProgressionModule:
             return False, current_rank, {}
 
         target_rank = current_rank + 1
-        requirements = PROMOTION_REQUIREMENTS.get(target_rank)
+        requirements = guild_configs.get(user_stats.get('guild_id')).promotion.get(target_rank)
 
         if not requirements:
             return False, current_rank, {}
@@ -79,10 +137,10 @@ class ProgressionModule:
         user_id = str(member.id)
         guild_id = str(member.guild.id)
 
-        Database.update_user_stats(user_id, guild_id, {'rank': new_rank})
-
-        if new_rank == 5:
-            Database.update_user_stats(user_id, guild_id, {'is_immune_to_decay': True})
+        outcome = Database.transition_rank(user_id, guild_id, 'promote', to_rank=new_rank, expected_rank=new_rank - 1)
+        if not outcome['ok']:
+            return False
+        journal.record_rank(guild_id, user_id, new_rank)
 
         await self.update_user_roles(member, new_rank)
 
@@ -100,7 +158,7 @@ class ProgressionModule:
                         if role in member.roles:
                             await member.remove_roles(role)
                 except discord.Forbidden:
-                    print(f"Missing permissions to update roles in {member.guild.name}")
+                    logger.warning("Missing permissions to update roles in %s", member.guild.name, extra={'guild': member.guild.id, 'user': member.id})
 
     def get_progress_embed(self, user_stats: Dict[str, Any], member: discord.Member) -> discord.Embed:
         current_rank = user_stats.get('rank', 1)
@@ -115,6 +173,13 @@ class ProgressionModule:
         score = self.calculate_user_score(user_stats)
         embed.add_field(name="Overall Score", value=f"{score} points", inline=False)
 
+        standing = self.get_standing(str(member.guild.id), score)
+        if standing:
+            embed.add_field(name="Standing", value=standing, inline=False)
+
+        if user_stats.get('stale_at'):
+            embed.set_footer(text=stale_notice(user_stats['stale_at']))
+
         if current_rank >= 5:
             embed.add_field(
                 name="Status",
@@ -123,7 +188,7 @@ class ProgressionModule:
             )
             return embed
 
-        requirements = PROMOTION_REQUIREMENTS.get(target_rank)
+        requirements = guild_configs.get(user_stats.get('guild_id')).promotion.get(target_rank)
         if not requirements:
             return embed
 
@@ -155,47 +220,35 @@ class ProgressionModule:
 
         return embed
 
-    def get_leaderboard_embed(self, guild: discord.Guild, category: str = 'all') -> discord.Embed:
+    def get_window_leaderboard_embed(self, guild: discord.Guild, days: int) -> discord.Embed:
         guild_id = str(guild.id)
-        users = Database.get_all_users_in_guild(guild_id)
 
-        if not users:
+        scores = []
+        for user_id, totals in rollups.iter_window_totals(guild_id, days):
+            score = self.calculate_user_score(totals, guild_id)
+            if score > 0:
+                scores.append((score, user_id))
+
+        if not scores:
             return discord.Embed(
                 title="Leaderboard",
-                description="No users found!",
+                description=f"No activity in the last {days} days!",
                 color=discord.Color.red()
             )
 
-        if category == 'voice':
-            users.sort(key=lambda x: x.get('voice_time_seconds', 0), reverse=True)
-            title = "Voice Time Leaderboard"
-            value_fn = lambda x: f"{x.get('voice_time_seconds', 0) / 3600:.1f}h"
-        elif category == 'messages':
-            users.sort(key=lambda x: x.get('message_count', 0), reverse=True)
-            title = "Messages Leaderboard"
-            value_fn = lambda x: f"{x.get('message_count', 0)} msgs"
-        elif category == 'invites':
-            users.sort(key=lambda x: x.get('invite_count', 0), reverse=True)
-            title = "Invites Leaderboard"
-            value_fn = lambda x: f"{x.get('invite_count', 0)} invites"
-        else:
-            for user in users:
-                user['score'] = self.calculate_user_score(user)
-            users.sort(key=lambda x: x.get('score', 0), reverse=True)
-            title = "Overall Leaderboard"
-            value_fn = lambda x: f"{x.get('score', 0):.1f} pts"
-
         embed = discord.Embed(
-            title=title,
+            title=f"Last {days} Days Leaderboard",
             color=discord.Color.gold()
         )
 
-        for i, user in enumerate(users[:10], 1):
+        top = heapq.nlargest(10, scores)
+        for i, (score, user_id) in enumerate(top, 1):
             medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
-            rank_name = RANKS[user.get('rank', 1)]['name']
+            member = guild.get_member(int(user_id))
+            name = member.name if member else f"User {user_id}"
             embed.add_field(
-                name=f"{medal} {user['discord_username']} ({rank_name})",
-                value=value_fn(user),
+                name=f"{medal} {name}",
+                value=f"{score:.1f} pts",
                 inline=False
             )
 
@@ -209,7 +262,7 @@ def setup_progression_commands(bot: commands.Bot, progression: ProgressionModule
         if member is None:
             member = ctx.author
 
-        user_stats = Database.get_user_stats(str(member.id), str(ctx.guild.id))
+        user_stats = Database.get_user_stats(str(member.id), str(ctx.guild.id), allow_stale=True)
 
         if not user_stats:
             await ctx.send(f"No stats found for {member.display_name}")
@@ -218,11 +271,6 @@ def setup_progression_commands(bot: commands.Bot, progression: ProgressionModule
         embed = progression.get_progress_embed(user_stats, member)
         await ctx.send(embed=embed)
 
-    @bot.command(name='leaderboard')
-    async def leaderboard(ctx, category: str = 'all'):
-        embed = progression.get_leaderboard_embed(ctx.guild, category)
-        await ctx.send(embed=embed)
-
     @bot.command(name='promote')
     @commands.has_permissions(administrator=True)
     async def promote_command(ctx, member: discord.Member):
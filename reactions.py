@@ -0,0 +1,67 @@
+from discord.ext import commands
+from config import REACTION_SETTINGS
+from metrics import metrics
+from stat_buffer import StatBuffer
+from typing import Optional, Dict
+
+SUBJECT_POST_CACHE = metrics.cache('subject_posts')
+
+
+class SubjectPostIndex:
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._authors: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._authors)
+
+    def add(self, message_id: int, author_id: int):
+        if message_id in self._authors:
+            return
+
+        if len(self._authors) >= self.max_entries:
+            del self._authors[next(iter(self._authors))]
+
+        self._authors[message_id] = author_id
+
+    def remove(self, message_id: int):
+        self._authors.pop(message_id, None)
+
+    def get_author(self, message_id: int) -> Optional[int]:
+        return self._authors.get(message_id)
+
+
+class ReactionModule:
+
+    def __init__(self, bot: commands.Bot, stat_buffer: StatBuffer):
+        self.bot = bot
+        self.stat_buffer = stat_buffer
+        self.subject_posts = SubjectPostIndex(REACTION_SETTINGS['subject_post_index_size'])
+
+    def register_subject_post(self, message_id: int, author_id: int):
+        self.subject_posts.add(message_id, author_id)
+
+    def forget_subject_post(self, message_id: int):
+        self.subject_posts.remove(message_id)
+
+    def get_cached_username(self, guild_id: int, user_id: int) -> Optional[str]:
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return None
+
+        member = guild.get_member(user_id)
+        return member.name if member else None
+
+    def handle_reaction(self, guild_id: int, message_id: int, user_id: int, username: Optional[str], amount: int):
+        guild_key = str(guild_id)
+
+        self.stat_buffer.add(str(user_id), username, guild_key, 'reaction_count', amount)
+
+        author_id = self.subject_posts.get_author(message_id)
+        SUBJECT_POST_CACHE.record(author_id is not None)
+        if author_id is None or author_id == user_id:
+            return
+
+        author_name = self.get_cached_username(guild_id, author_id)
+        self.stat_buffer.add(str(author_id), author_name, guild_key, 'subject_reactions', amount)
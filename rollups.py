@@ -0,0 +1,151 @@
+import time
+from array import array
+from datetime import date, timedelta
+from config import ROLLUP_SETTINGS
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+EPOCH = date(1970, 1, 1)
+
+
+def current_day(now: Optional[float] = None) -> int:
+    return int((time.time() if now is None else now) // 86400)
+
+
+def day_to_date(day: int) -> str:
+    return (EPOCH + timedelta(days=day)).isoformat()
+
+
+def date_to_day(value: str) -> int:
+    return (date.fromisoformat(value[:10]) - EPOCH).days
+
+
+class UserRollup:
+
+    __slots__ = ('last_day', 'buckets')
+
+    def __init__(self, days: int, stat_count: int, last_day: int):
+        self.last_day = last_day
+        self.buckets = array('i', bytes(4 * days * stat_count))
+
+
+class ActivityRollups:
+
+    def __init__(self, days: int, stats: List[str]):
+        self.days = days
+        self.stats = tuple(stats)
+        self.stat_index = {name: i for i, name in enumerate(self.stats)}
+        self._guilds: Dict[str, Dict[str, UserRollup]] = {}
+        self._loaded: Set[str] = set()
+        self._dirty: Set[Tuple[str, str, int]] = set()
+
+    def loaded(self, guild_id: str) -> bool:
+        return guild_id in self._loaded
+
+    def mark_loaded(self, guild_id: str):
+        self._loaded.add(guild_id)
+
+    def _advance(self, rollup: UserRollup, day: int):
+        if day <= rollup.last_day:
+            return
+
+        width = len(self.stats)
+        for skipped in range(rollup.last_day + 1, min(day, rollup.last_day + self.days) + 1):
+            offset = (skipped % self.days) * width
+            for i in range(width):
+                rollup.buckets[offset + i] = 0
+        rollup.last_day = day
+
+    def _get(self, guild_id: str, user_id: str, day: int, create: bool) -> Optional[UserRollup]:
+        users = self._guilds.get(guild_id)
+        if users is None:
+            if not create:
+                return None
+            users = self._guilds[guild_id] = {}
+
+        rollup = users.get(user_id)
+        if rollup is None:
+            if not create:
+                return None
+            rollup = users[user_id] = UserRollup(self.days, len(self.stats), day)
+        return rollup
+
+    def record(self, guild_id: str, user_id: str, deltas: Dict[str, int], now: Optional[float] = None):
+        day = current_day(now)
+        rollup = self._get(guild_id, user_id, day, create=True)
+        self._advance(rollup, day)
+
+        offset = (day % self.days) * len(self.stats)
+        for stat_name, amount in deltas.items():
+            index = self.stat_index.get(stat_name)
+            if index is None:
+                continue
+            value = rollup.buckets[offset + index] + amount
+            rollup.buckets[offset + index] = value if value > 0 else 0
+
+        self._dirty.add((guild_id, user_id, day))
+
+    def load(self, guild_id: str, user_id: str, day: int, values: Dict[str, Any], today: Optional[int] = None):
+        today = current_day() if today is None else today
+        if day <= today - self.days or day > today:
+            return
+
+        rollup = self._get(guild_id, user_id, today, create=True)
+        self._advance(rollup, today)
+
+        offset = (day % self.days) * len(self.stats)
+        for i, stat_name in enumerate(self.stats):
+            rollup.buckets[offset + i] = int(values.get(stat_name) or 0)
+
+    def window_totals(self, guild_id: str, user_id: str, days: int, now: Optional[float] = None) -> Dict[str, int]:
+        totals = dict.fromkeys(self.stats, 0)
+        today = current_day(now)
+        rollup = self._get(guild_id, user_id, today, create=False)
+        if rollup is None:
+            return totals
+
+        width = len(self.stats)
+        first_day = max(today - min(days, self.days) + 1, rollup.last_day - self.days + 1)
+        for day in range(first_day, min(today, rollup.last_day) + 1):
+            offset = (day % self.days) * width
+            for i, stat_name in enumerate(self.stats):
+                totals[stat_name] += rollup.buckets[offset + i]
+        return totals
+
+    def iter_window_totals(self, guild_id: str, days: int, now: Optional[float] = None) -> Iterator[Tuple[str, Dict[str, int]]]:
+        for user_id in list(self._guilds.get(guild_id, {})):
+            yield user_id, self.window_totals(guild_id, user_id, days, now)
+
+    def drain_dirty(self) -> List[Dict[str, Any]]:
+        dirty, self._dirty = self._dirty, set()
+        today = current_day()
+
+        rows = []
+        width = len(self.stats)
+        for guild_id, user_id, day in dirty:
+            rollup = self._get(guild_id, user_id, today, create=False)
+            if rollup is None or day <= rollup.last_day - self.days:
+                continue
+
+            offset = (day % self.days) * width
+            row = {'guild_id': guild_id, 'discord_user_id': user_id, 'day': day_to_date(day)}
+            for i, stat_name in enumerate(self.stats):
+                row[stat_name] = rollup.buckets[offset + i]
+            rows.append(row)
+        return rows
+
+    def restore_dirty(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            self._dirty.add((row['guild_id'], row['discord_user_id'], date_to_day(row['day'])))
+
+    def prune(self, now: Optional[float] = None) -> int:
+        cutoff = current_day(now) - self.days
+        removed = 0
+        for users in self._guilds.values():
+            stale = [user_id for user_id, rollup in users.items() if rollup.last_day <= cutoff]
+            for user_id in stale:
+                del users[user_id]
+            removed += len(stale)
+        return removed
+
+
+rollups = ActivityRollups(ROLLUP_SETTINGS['days'], ROLLUP_SETTINGS['stats'])
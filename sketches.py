@@ -0,0 +1,246 @@
+import bisect
+import math
+import discord
+from datetime import datetime
+from discord.ext import commands
+from config import SKETCH_SETTINGS
+from typing import Any, Dict, List, Optional, Set
+
+
+class QuantileSketch:
+
+    __slots__ = ('relative_accuracy', 'gamma_log', 'max_buckets', 'buckets', 'zero_count', 'count', 'floor', '_keys', '_above')
+
+    def __init__(self, relative_accuracy: float, max_buckets: int):
+        self.relative_accuracy = relative_accuracy
+        self.gamma_log = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.max_buckets = max_buckets
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.floor: Optional[int] = None
+        self._keys: Optional[List[int]] = None
+        self._above: List[int] = []
+
+    def key(self, value: float) -> Optional[int]:
+        if value <= 0:
+            return None
+        key = math.ceil(math.log(value) / self.gamma_log)
+        return key if self.floor is None else max(key, self.floor)
+
+    def value(self, key: Optional[int]) -> float:
+        if key is None:
+            return 0.0
+        gamma = math.exp(self.gamma_log)
+        return 2 * gamma ** key / (gamma + 1)
+
+    def add(self, value: float, weight: int = 1):
+        key = self.key(value)
+        if key is None:
+            self.zero_count += weight
+        else:
+            self.buckets[key] = self.buckets.get(key, 0) + weight
+            if len(self.buckets) > self.max_buckets:
+                self.collapse()
+        self.count += weight
+        self._keys = None
+
+    def remove(self, value: float):
+        key = self.key(value)
+        if key is None:
+            if self.zero_count <= 0:
+                return
+            self.zero_count -= 1
+        else:
+            current = self.buckets.get(key, 0)
+            if current <= 0:
+                return
+            if current == 1:
+                del self.buckets[key]
+            else:
+                self.buckets[key] = current - 1
+        self.count -= 1
+        self._keys = None
+
+    def collapse(self):
+        keys = sorted(self.buckets)
+        excess = len(keys) - self.max_buckets
+        self.floor = keys[excess]
+        for key in keys[:excess]:
+            self.buckets[self.floor] += self.buckets.pop(key)
+
+    def merge(self, other: 'QuantileSketch'):
+        self.zero_count += other.zero_count
+        for key, count in other.buckets.items():
+            if self.floor is not None:
+                key = max(key, self.floor)
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += other.count
+        if len(self.buckets) > self.max_buckets:
+            self.collapse()
+        self._keys = None
+
+    def index(self):
+        self._keys = sorted(self.buckets)
+        self._above = [0] * (len(self._keys) + 1)
+        for i in range(len(self._keys) - 1, -1, -1):
+            self._above[i] = self._above[i + 1] + self.buckets[self._keys[i]]
+
+    def fraction_above(self, value: float) -> float:
+        if not self.count:
+            return 0.0
+        if self._keys is None:
+            self.index()
+
+        key = self.key(value)
+        if key is None:
+            return self._above[0] / self.count
+        return self._above[bisect.bisect_right(self._keys, key)] / self.count
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        if self._keys is None:
+            self.index()
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        seen = self.zero_count
+        for key in self._keys:
+            seen += self.buckets[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(self._keys[-1])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'zero_count': self.zero_count,
+            'floor': self.floor,
+            'buckets': [[key, count] for key, count in self.buckets.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_buckets: int) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'], max_buckets)
+        sketch.zero_count = data['zero_count']
+        sketch.floor = data.get('floor')
+        sketch.buckets = {int(key): int(count) for key, count in data['buckets']}
+        sketch.count = sketch.zero_count + sum(sketch.buckets.values())
+        return sketch
+
+
+class GuildSketches:
+
+    def __init__(self, stats: List[str], relative_accuracy: float, max_buckets: int):
+        self.stats = tuple(stats)
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._guilds: Dict[str, Dict[str, QuantileSketch]] = {}
+        self._built: Dict[str, str] = {}
+        self._dirty: Set[str] = set()
+
+    def new_sketch(self) -> QuantileSketch:
+        return QuantileSketch(self.relative_accuracy, self.max_buckets)
+
+    def loaded(self, guild_id: str) -> bool:
+        return guild_id in self._guilds
+
+    def get(self, guild_id: str, stat: str) -> Optional[QuantileSketch]:
+        return self._guilds.get(guild_id, {}).get(stat)
+
+    def build(self, guild_id: str, users: List[Dict[str, Any]]):
+        sketches = {stat: self.new_sketch() for stat in self.stats}
+        for user in users:
+            for stat, sketch in sketches.items():
+                sketch.add(user.get(stat) or 0)
+        self._guilds[guild_id] = sketches
+        self._built[guild_id] = datetime.utcnow().isoformat()
+        self._dirty.add(guild_id)
+
+    def load(self, guild_id: str, rows: List[Dict[str, Any]]) -> bool:
+        sketches = {}
+        for row in rows:
+            sketch = row['sketch']
+            if row['stat'] in self.stats and sketch.get('relative_accuracy') == self.relative_accuracy:
+                sketches[row['stat']] = QuantileSketch.from_dict(sketch, self.max_buckets)
+
+        if len(sketches) < len(self.stats):
+            return False
+        self._guilds[guild_id] = sketches
+        self._built[guild_id] = min(row['built_at'] for row in rows)
+        return True
+
+    def observe(self, guild_id: str, old: Optional[Dict[str, Any]], new: Dict[str, Any]):
+        sketches = self._guilds.get(guild_id)
+        if sketches is None:
+            return
+
+        for stat, sketch in sketches.items():
+            if old is None:
+                sketch.add(new.get(stat) or 0)
+                continue
+            if stat not in new:
+                continue
+
+            previous = old.get(stat) or 0
+            if previous != new[stat]:
+                sketch.remove(previous)
+                sketch.add(new[stat] or 0)
+        self._dirty.add(guild_id)
+
+    def top_percent(self, guild_id: str, stat: str, value: float) -> Optional[int]:
+        sketch = self.get(guild_id, stat)
+        if sketch is None or not sketch.count:
+            return None
+        return max(1, math.ceil(100 * sketch.fraction_above(value)))
+
+    def drain_dirty(self) -> List[Dict[str, Any]]:
+        dirty, self._dirty = self._dirty, set()
+        rows = []
+        for guild_id in dirty:
+            for stat, sketch in self._guilds.get(guild_id, {}).items():
+                rows.append({
+                    'guild_id': guild_id,
+                    'stat': stat,
+                    'member_count': sketch.count,
+                    'sketch': sketch.to_dict(),
+                    'built_at': self._built[guild_id]
+                })
+        return rows
+
+    def restore_dirty(self, rows: List[Dict[str, Any]]):
+        self._dirty.update(row['guild_id'] for row in rows)
+
+
+sketches = GuildSketches(SKETCH_SETTINGS['stats'], SKETCH_SETTINGS['relative_accuracy'], SKETCH_SETTINGS['max_buckets'])
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+def setup_sketch_commands(bot: commands.Bot):
+
+    @bot.command(name='distribution')
+    @commands.has_permissions(administrator=True)
+    async def distribution(ctx, stat: str = 'score'):
+        if stat not in sketches.stats:
+            await ctx.send(f"Unknown stat. Valid options: {', '.join(sketches.stats)}")
+            return
+
+        sketch = sketches.get(str(ctx.guild.id), stat)
+        if sketch is None or not sketch.count:
+            await ctx.send("No distribution available for this server yet.")
+            return
+
+        embed = discord.Embed(
+            title=f"Distribution of {stat.replace('_', ' ')}",
+            description=f"{sketch.count} members, values within ±{sketch.relative_accuracy:.0%}",
+            color=discord.Color.blue()
+        )
+        for q in QUANTILES:
+            embed.add_field(name=f"p{round(q * 100)}", value=f"{sketch.quantile(q):.1f}", inline=True)
+        embed.add_field(name="Zero", value=f"{sketch.zero_count / sketch.count:.0%}", inline=True)
+
+        await ctx.send(embed=embed)
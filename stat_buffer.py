@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from discord.ext import commands, tasks
+from database import Database
+from config import STAT_BUFFER_SETTINGS, SKETCH_SETTINGS
+from journal import BASELINE_COLUMNS, journal
+from metrics import metrics
+from rollups import rollups, current_day, date_to_day, day_to_date
+from sketches import sketches
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+SpoolEntry = Tuple[str, str, Optional[str], Dict[str, int]]
+
+logger = logging.getLogger(__name__)
+
+COALESCE_CACHE = metrics.cache('stat_buffer')
+
+
+class StatSpool:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = self.count_entries()
+
+    def count_entries(self) -> int:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return sum(1 for _ in f)
+        except FileNotFoundError:
+            return 0
+
+    def write(self, entries: Iterable[SpoolEntry]):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for guild_id, user_id, username, deltas in entries:
+                f.write(json.dumps({'guild': guild_id, 'user': user_id, 'name': username, 'deltas': deltas}) + '\n')
+                self.entries += 1
+
+    def drain(self) -> List[SpoolEntry]:
+        entries = []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    entries.append((entry['guild'], entry['user'], entry['name'], entry['deltas']))
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.entries = 0
+        return entries
+
+
+async def rebuild_sketches(guild_id: str) -> bool:
+    page_size = SKETCH_SETTINGS['rebuild_page_size']
+    users = []
+    after = None
+    while True:
+        page = Database.get_user_stats_page(after, guild_id, page_size)
+        if page is None:
+            return False
+        users.extend({stat: row.get(stat) for stat in sketches.stats} for row in page)
+        if len(page) < page_size:
+            break
+        after = (guild_id, page[-1]['discord_user_id'])
+        await asyncio.sleep(0)
+
+    sketches.build(guild_id, users)
+    return True
+
+
+class UsernameCache:
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._names: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        return self._names.get(key)
+
+    def put(self, key: Tuple[str, str], username: str):
+        self._names[key] = username
+        self._names.move_to_end(key)
+        if len(self._names) > self.max_entries:
+            self._names.popitem(last=False)
+
+
+class StatBuffer:
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.pending: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self.usernames: Dict[Tuple[str, str], str] = {}
+        self.known_usernames = UsernameCache(STAT_BUFFER_SETTINGS['known_usernames_size'])
+        self.rollup_day = current_day()
+        self.sketches_saved = time.monotonic()
+        self.spool = StatSpool(STAT_BUFFER_SETTINGS['spool_path'])
+        self.warming_sketches: Set[str] = set()
+
+    def start_tasks(self):
+        self.replay_spool()
+        self.flush_task.start()
+
+    def cog_unload(self):
+        self.flush_task.cancel()
+        self.flush()
+        self.flush_sketches()
+
+    def add(self, user_id: str, username: Optional[str], guild_id: str, stat_name: str, amount: int = 1):
+        self.add_many(user_id, username, guild_id, {stat_name: amount})
+
+    def add_many(self, user_id: str, username: Optional[str], guild_id: str, deltas: Dict[str, int]):
+        journal.record_increments(guild_id, user_id, deltas)
+        self._merge(user_id, username, guild_id, deltas)
+
+    def _merge(self, user_id: str, username: Optional[str], guild_id: str, deltas: Dict[str, int]):
+        key = (guild_id, user_id)
+        pending = self.pending.get(key)
+        COALESCE_CACHE.record(pending is not None)
+        if pending is None:
+            pending = self.pending[key] = {}
+
+        for stat_name, amount in deltas.items():
+            pending[stat_name] = pending.get(stat_name, 0) + amount
+
+        if username and self.known_usernames.get(key) != username:
+            self.usernames[key] = username
+
+    @tasks.loop(seconds=STAT_BUFFER_SETTINGS['flush_interval_seconds'])
+    async def flush_task(self):
+        self.flush()
+        await self.write_baselines()
+
+    async def write_baselines(self):
+        for guild in self.bot.guilds:
+            guild_id = str(guild.id)
+            if journal.has_baseline(guild_id):
+                continue
+
+            after = None
+            while True:
+                if self.spool.entries:
+                    return
+                rows = Database.get_user_stats_page(after, guild_id, STAT_BUFFER_SETTINGS['baseline_page_size'])
+                if rows is None:
+                    return
+                for row in rows:
+                    pending = self.pending.get((guild_id, row['discord_user_id']), {})
+                    values = {
+                        column: row[column] + pending.get(column, 0)
+                        for column in BASELINE_COLUMNS if row.get(column) is not None
+                    }
+                    journal.record_baseline(guild_id, row['discord_user_id'], values)
+                if len(rows) < STAT_BUFFER_SETTINGS['baseline_page_size']:
+                    break
+                after = (guild_id, rows[-1]['discord_user_id'])
+                await asyncio.sleep(0)
+
+            journal.mark_baseline(guild_id)
+            logger.info("Wrote journal baseline", extra={'op': 'write_baselines', 'guild': guild_id})
+
+    def flush(self) -> int:
+        journal.flush()
+        if self.spool.entries and Database.available():
+            self.replay_spool()
+
+        pending, self.pending = self.pending, {}
+        usernames, self.usernames = self.usernames, {}
+
+        if pending and not Database.available():
+            self.spool.write((guild_id, user_id, usernames.get((guild_id, user_id)), deltas) for (guild_id, user_id), deltas in pending.items())
+            logger.warning("Database unavailable, spooled stats for %d users", len(pending), extra={'op': 'flush'})
+            return 0
+
+        entries: Dict[str, Dict[str, Tuple[Optional[str], Dict[str, int]]]] = {}
+        for (guild_id, user_id), deltas in pending.items():
+            deltas = {stat_name: amount for stat_name, amount in deltas.items() if amount}
+            if deltas:
+                entries.setdefault(guild_id, {})[user_id] = (usernames.get((guild_id, user_id)), deltas)
+
+        failed: List[SpoolEntry] = []
+        for guild_id, guild_entries in entries.items():
+            written = set(Database.increment_stats_many(guild_id, guild_entries))
+            for user_id, (username, deltas) in guild_entries.items():
+                if user_id not in written:
+                    failed.append((guild_id, user_id, username, deltas))
+                    continue
+
+                if username:
+                    self.known_usernames.put((guild_id, user_id), username)
+                rollups.record(guild_id, user_id, deltas)
+
+        journal.flush()
+
+        if failed and not Database.available():
+            self.spool.write(failed)
+            logger.warning("Database unavailable, spooled stats for %d users", len(failed), extra={'op': 'flush'})
+        elif failed:
+            for guild_id, user_id, username, deltas in failed:
+                self._merge(user_id, username, guild_id, deltas)
+            logger.warning("Failed to flush stats for %d users, retrying next interval", len(failed), extra={'op': 'flush'})
+
+        self.flush_rollups()
+        if time.monotonic() - self.sketches_saved >= SKETCH_SETTINGS['persist_interval_seconds']:
+            self.flush_sketches()
+
+        return len(pending) - len(failed)
+
+    def replay_spool(self):
+        entries = self.spool.drain()
+        for guild_id, user_id, username, deltas in entries:
+            self._merge(user_id, username, guild_id, deltas)
+        if entries:
+            logger.info("Replaying %d spooled stat entries", len(entries), extra={'op': 'flush'})
+
+    def flush_rollups(self):
+        rows = rollups.drain_dirty()
+        if not Database.upsert_daily_rollups(rows):
+            rollups.restore_dirty(rows)
+
+        today = current_day()
+        if today != self.rollup_day:
+            self.rollup_day = today
+            rollups.prune()
+
+    def flush_sketches(self):
+        self.sketches_saved = time.monotonic()
+        rows = sketches.drain_dirty()
+        if not Database.upsert_guild_sketches(rows):
+            sketches.restore_dirty(rows)
+
+    async def warm_sketches(self, guild_id: str):
+        if sketches.loaded(guild_id) or guild_id in self.warming_sketches:
+            return
+
+        self.warming_sketches.add(guild_id)
+        try:
+            rows = Database.get_guild_sketches(guild_id)
+            if rows is None:
+                return
+
+            cutoff = (datetime.utcnow() - timedelta(days=SKETCH_SETTINGS['rebuild_after_days'])).isoformat()
+            if rows and min(row['built_at'] for row in rows) >= cutoff and sketches.load(guild_id, rows):
+                return
+
+            if await rebuild_sketches(guild_id):
+                logger.info("Rebuilt distribution sketches", extra={'op': 'warm_sketches', 'guild': guild_id})
+        finally:
+            self.warming_sketches.discard(guild_id)
+
+    def warm_rollups(self, guild_id: str):
+        if rollups.loaded(guild_id):
+            return
+
+        today = current_day()
+        since_day = day_to_date(today - rollups.days + 1)
+
+        for row in Database.get_daily_rollups(guild_id, since_day):
+            rollups.load(guild_id, row['discord_user_id'], date_to_day(row['day']), row, today)
+        rollups.mark_loaded(guild_id)
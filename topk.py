@@ -0,0 +1,106 @@
+import heapq
+from config import LEADERBOARD_SETTINGS
+from typing import Any, Dict, List, Optional, Set
+
+
+def rank_key(row: Dict[str, Any]):
+    return -row['score'], row['discord_user_id']
+
+
+class GuildTopK:
+
+    def __init__(self, k: int):
+        self.k = k
+        self._guilds: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._floors: Dict[str, Optional[float]] = {}
+        self._sorted: Dict[str, List[Dict[str, Any]]] = {}
+        self._stale: Set[str] = set()
+        self._merged: Optional[List[Dict[str, Any]]] = None
+
+    def guilds(self) -> List[str]:
+        return list(self._guilds)
+
+    def stale(self) -> List[str]:
+        return list(self._stale)
+
+    def load(self, guild_id: str, rows: List[Dict[str, Any]]):
+        entries = {}
+        for row in rows[:self.k]:
+            entries[row['discord_user_id']] = {
+                'guild_id': guild_id,
+                'discord_user_id': row['discord_user_id'],
+                'discord_username': row['discord_username'],
+                'rank': row.get('rank', 1),
+                'score': row.get('score') or 0
+            }
+        self._guilds[guild_id] = entries
+        self._stale.discard(guild_id)
+        self._changed(guild_id)
+
+    def drop(self, guild_id: str):
+        self._guilds.pop(guild_id, None)
+        self._floors.pop(guild_id, None)
+        self._sorted.pop(guild_id, None)
+        self._stale.discard(guild_id)
+        self._merged = None
+
+    def _changed(self, guild_id: str):
+        entries = self._guilds[guild_id]
+        self._floors[guild_id] = min(entry['score'] for entry in entries.values()) if len(entries) >= self.k else None
+        self._sorted.pop(guild_id, None)
+        self._merged = None
+
+    def observe(self, guild_id: str, old: Optional[Dict[str, Any]], new: Dict[str, Any]):
+        entries = self._guilds.get(guild_id)
+        if entries is None or 'score' not in new:
+            return
+
+        user_id = new['discord_user_id']
+        score = new['score']
+        entry = entries.get(user_id)
+        if entry is None:
+            floor = self._floors.get(guild_id)
+            if floor is not None and score <= floor:
+                return
+            if floor is not None:
+                del entries[min(entries.values(), key=lambda e: (e['score'], e['discord_user_id']))['discord_user_id']]
+            previous = old or {}
+            entry = entries[user_id] = {
+                'guild_id': guild_id,
+                'discord_user_id': user_id,
+                'discord_username': previous.get('discord_username') or user_id,
+                'rank': previous.get('rank', 1),
+                'score': score
+            }
+        elif score == entry['score']:
+            return
+        elif score < entry['score'] and self._floors.get(guild_id) is not None:
+            self._stale.add(guild_id)
+
+        entry['score'] = score
+        for column in ('discord_username', 'rank'):
+            if new.get(column):
+                entry[column] = new[column]
+        self._changed(guild_id)
+
+    def top(self) -> List[Dict[str, Any]]:
+        if self._merged is not None:
+            return self._merged
+
+        for guild_id, entries in self._guilds.items():
+            if guild_id not in self._sorted:
+                self._sorted[guild_id] = sorted(entries.values(), key=rank_key)
+
+        merged, seen = [], set()
+        for entry in heapq.merge(*self._sorted.values(), key=rank_key):
+            if entry['discord_user_id'] in seen:
+                continue
+            seen.add(entry['discord_user_id'])
+            merged.append(entry)
+            if len(merged) == self.k:
+                break
+        self._merged = merged
+        return merged
+
+
+top_scores = GuildTopK(LEADERBOARD_SETTINGS['global_top_k'])